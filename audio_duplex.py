@@ -0,0 +1,235 @@
+# audio_duplex.py
+import queue
+import threading
+import logging
+import numpy as np
+import sounddevice as sd
+
+# ================= CONFIGURACIÓN DEL DISPOSITIVO =================
+SAMPLERATE = 16000
+DURACION_TRAMA = 0.03        # 30 ms por bloque de entrada y de salida
+MAX_SALIDA = 60.0            # Segundos de mensaje que caben en el buffer de reproducción
+ANILLO_ENTRADA = 30.0        # Segundos de micrófono que guarda el anillo de tramas
+LATENCIA_ECO = 0.12          # Tiempo que tarda en apagarse el eco de la salida
+FRECUENCIA_PITIDO = 1000
+DURACION_PITIDO = 0.2
+VOLUMEN_PITIDO = 0.4
+
+
+class _Reproduccion:
+    """Un mensaje en curso; el callback lo lee por una sola referencia"""
+    __slots__ = ('buffer', 'longitud', 'posicion', 'fin')
+
+    def __init__(self, buffer, longitud):
+        self.buffer = buffer
+        self.longitud = longitud
+        self.posicion = 0
+        self.fin = threading.Event()
+        if not longitud:
+            self.fin.set()
+
+
+class AudioDuplex:
+    """Un único stream de entrada/salida abierto durante toda la vida del proceso.
+
+    La reproducción (mensajes y pitido) y la captura comparten el dispositivo y
+    usan buffers reservados al arrancar: no se asigna memoria por turno.
+    """
+
+    def __init__(self, samplerate=SAMPLERATE, duracion_trama=DURACION_TRAMA):
+        self.samplerate = samplerate
+        self.tamano_trama = int(samplerate * duracion_trama)
+        self.duracion_trama = self.tamano_trama / samplerate
+        self._stream = None
+        self._lock = threading.Lock()
+
+        # Salida: dos buffers fijos; se escribe en el que no suena y se publica
+        # el mensaje nuevo cambiando una sola referencia (_actual)
+        self._buffers = [np.zeros(int(MAX_SALIDA * samplerate), dtype=np.float32) for _ in range(2)]
+        self._siguiente_buffer = 0
+        self._lock_salida = threading.Lock()
+        self._actual = None
+        self._niveles = np.zeros(max(1, int(LATENCIA_ECO / self.duracion_trama)), dtype=np.float32)
+        self._bloques = 0
+        self._bloques_sin_salida = len(self._niveles) + 1
+
+        # Entrada: anillo de tramas; la cola solo transporta índices y no guarda
+        # más tramas que el anillo (sin captura activa se descartan las viejas)
+        self._entrada = np.zeros((int(ANILLO_ENTRADA / self.duracion_trama), self.tamano_trama), dtype=np.float32)
+        self._indice = 0
+        self._tramas = queue.Queue(maxsize=len(self._entrada))
+
+        self._pitidos = {}
+        self.pitido_defecto = self._generar_pitido(FRECUENCIA_PITIDO, DURACION_PITIDO)
+
+    def _callback(self, indata, outdata, frames, tiempo, status):
+        if status:
+            logging.warning(f"Estado del stream de audio: {status}")
+
+        # Salida
+        actual = self._actual
+        n = 0
+        if actual is not None:
+            n = min(frames, max(0, actual.longitud - actual.posicion))
+            if n:
+                outdata[:n, 0] = actual.buffer[actual.posicion:actual.posicion + n]
+                actual.posicion += n
+            if actual.posicion >= actual.longitud:
+                actual.fin.set()
+        outdata[n:, 0] = 0.0
+
+        bloque = outdata[:, 0]
+        self._niveles[self._bloques % len(self._niveles)] = np.sqrt(np.dot(bloque, bloque) / frames)
+        self._bloques += 1
+        self._bloques_sin_salida = 0 if n else self._bloques_sin_salida + 1
+
+        # Entrada
+        ranura = self._indice % len(self._entrada)
+        self._entrada[ranura, :frames] = indata[:frames, 0]
+        self._indice += 1
+        try:
+            self._tramas.put_nowait((ranura, self.salida_reciente()))
+        except queue.Full:
+            # Nadie está leyendo: se descarta la trama más antigua
+            try:
+                self._tramas.get_nowait()
+            except queue.Empty:
+                pass
+            self._tramas.put_nowait((ranura, self.salida_reciente()))
+
+    def iniciar(self):
+        """Abre el dispositivo una sola vez"""
+        with self._lock:
+            if self._stream is not None:
+                return
+            self._stream = sd.Stream(
+                samplerate=self.samplerate,
+                blocksize=self.tamano_trama,
+                channels=1,
+                dtype='float32',
+                callback=self._callback
+            )
+            self._stream.start()
+            logging.info("Stream de audio dúplex iniciado")
+
+    def detener(self):
+        """Cierra el dispositivo"""
+        with self._lock:
+            if self._stream is None:
+                return
+            self._stream.stop()
+            self._stream.close()
+            self._stream = None
+            logging.info("Stream de audio dúplex detenido")
+
+    # ---------------- Salida ----------------
+
+    def reproducir(self, partes, pausa=0.0, esperar=True):
+        """Copia las partes (float32 a SAMPLERATE) al buffer de salida y las reproduce"""
+        self.iniciar()
+        hueco = int(pausa * self.samplerate)
+        with self._lock_salida:
+            # Se escribe en el buffer que no está sonando
+            buffer = self._buffers[self._siguiente_buffer]
+            self._siguiente_buffer ^= 1
+            posicion = 0
+            for parte in partes:
+                n = min(parte.size, buffer.size - posicion)
+                buffer[posicion:posicion + n] = parte[:n]
+                posicion += n
+                m = min(hueco, buffer.size - posicion)
+                buffer[posicion:posicion + m] = 0.0
+                posicion += m
+            if posicion >= buffer.size:
+                logging.warning("Mensaje recortado: supera el buffer de reproducción")
+
+            reproduccion = _Reproduccion(buffer, posicion)
+            anterior, self._actual = self._actual, reproduccion
+        # Lo que sonaba queda cortado: quien lo esperaba deja de esperar
+        if anterior is not None:
+            anterior.fin.set()
+        if esperar:
+            reproduccion.fin.wait()
+
+    def detener_reproduccion(self):
+        with self._lock_salida:
+            anterior, self._actual = self._actual, None
+        if anterior is not None:
+            anterior.fin.set()
+
+    def esperar_reproduccion(self, timeout=None):
+        actual = self._actual
+        return actual is None or actual.fin.wait(timeout)
+
+    def reproduciendo(self):
+        actual = self._actual
+        return actual is not None and actual.posicion < actual.longitud
+
+    def tiempo_reproduccion(self):
+        """Segundos reproducidos del mensaje actual"""
+        actual = self._actual
+        return actual.posicion / self.samplerate if actual is not None else 0.0
+
+    def salida_reciente(self):
+        """Indica si la salida sonó hace menos de LATENCIA_ECO (su eco puede seguir llegando)"""
+        return self._bloques_sin_salida <= len(self._niveles)
+
+    def nivel_salida(self):
+        """Nivel de lo reproducido en los últimos LATENCIA_ECO segundos; None si no suena nada"""
+        if not self.salida_reciente():
+            return None
+        return float(self._niveles.max())
+
+    def _generar_pitido(self, frecuencia, duracion):
+        t = np.arange(int(duracion * self.samplerate), dtype=np.float32) / self.samplerate
+        tono = VOLUMEN_PITIDO * np.sin(2 * np.pi * frecuencia * t)
+        # Rampa de 5 ms para evitar clics
+        rampa = min(int(0.005 * self.samplerate), tono.size // 2)
+        if rampa:
+            envolvente = np.linspace(0.0, 1.0, rampa, dtype=np.float32)
+            tono[:rampa] *= envolvente
+            tono[-rampa:] *= envolvente[::-1]
+        return tono.astype(np.float32)
+
+    def pitido(self, frecuencia=FRECUENCIA_PITIDO, duracion=DURACION_PITIDO):
+        """Emite el pitido por el mismo stream, sin bloquear"""
+        clave = (frecuencia, duracion)
+        if clave not in self._pitidos:
+            self._pitidos[clave] = self._generar_pitido(frecuencia, duracion)
+        self.reproducir([self._pitidos[clave]], esperar=False)
+
+    # ---------------- Entrada ----------------
+
+    def descartar_pendientes(self):
+        """Vacía las tramas acumuladas antes de empezar a escuchar"""
+        while True:
+            try:
+                self._tramas.get_nowait()
+            except queue.Empty:
+                return
+
+    def siguiente_trama(self, timeout=None):
+        """Siguiente trama de micrófono como vista float32 del anillo y si sonaba la salida.
+
+        La vista es válida hasta que el anillo da la vuelta (ANILLO_ENTRADA segundos).
+        """
+        ranura, con_salida = self._tramas.get(timeout=timeout)
+        return self._entrada[ranura], con_salida
+
+
+_audio = None
+_lock_audio = threading.Lock()
+
+
+def obtener_audio():
+    """Devuelve el stream dúplex compartido del proceso"""
+    global _audio
+    with _lock_audio:
+        if _audio is None:
+            _audio = AudioDuplex()
+        return _audio
+
+
+def emitir_pitido(frecuencia=FRECUENCIA_PITIDO, duracion_ms=DURACION_PITIDO * 1000):
+    """Pitido que indica que el sistema empieza a escuchar"""
+    obtener_audio().pitido(frecuencia, duracion_ms / 1000)
@@ -0,0 +1,223 @@
+# benchmark_asr.py
+"""Banco de pruebas de precisión y velocidad del reconocimiento de voz.
+
+Recorre un directorio de grabaciones WAV etiquetadas (etiquetas.json) por el
+mismo camino que Logica.escuchar: preproceso, transcripción con la pregunta y
+conversión de la respuesta. Funciona sin conexión y en CPU.
+
+El repositorio solo incluye las etiquetas: las grabaciones se generan con
+--sintetizar (voz del sistema, la misma que usa la aplicación) o se copian
+grabaciones reales con los nombres de etiquetas.json. Si falta alguna el
+banco termina con error en lugar de medir un corpus incompleto.
+
+Uso: python benchmark_asr.py benchmark/corpus [--tamano tiny] [--motor whisper]
+                             [--beam-size 2] [--salida informe.json] [--sintetizar]
+"""
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import resource
+from pathlib import Path
+
+# Permite importar Logica sin dispositivo de sonido
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+
+VERSION_INFORME = 1
+CONFIG_PREGUNTAS = Path("config/preguntas_config.json")
+
+
+def cargar_preguntas_config(ruta=CONFIG_PREGUNTAS):
+    """Preguntas de referencia por id, sin acceder a la base de datos"""
+    if not ruta.exists():
+        return {}
+    with open(ruta, 'r', encoding='utf-8') as f:
+        datos = json.load(f)
+    return {p['id']: p for lista in datos.values() for p in lista}
+
+
+def cargar_corpus(directorio):
+    """Lee etiquetas.json y resuelve las preguntas referenciadas por id"""
+    directorio = Path(directorio)
+    with open(directorio / "etiquetas.json", 'r', encoding='utf-8') as f:
+        casos = json.load(f)
+
+    preguntas = cargar_preguntas_config()
+    for caso in casos:
+        caso['ruta'] = directorio / caso['archivo']
+        if 'pregunta_id' in caso and 'pregunta' not in caso:
+            caso['pregunta'] = preguntas.get(caso['pregunta_id'])
+    return casos
+
+
+def sintetizar_corpus(casos):
+    """Genera con el motor de voz las grabaciones que faltan, a partir del texto de cada caso"""
+    import pyttsx3
+    from config_voz import VELOCIDAD, VOZ
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', VELOCIDAD)
+    engine.setProperty('voice', VOZ)
+    for caso in casos:
+        if not caso['ruta'].exists():
+            engine.save_to_file(caso['texto'], str(caso['ruta']))
+    engine.runAndWait()
+
+
+def palabras(texto):
+    return re.findall(r"[a-záéíóúüñ0-9]+", (texto or '').lower())
+
+
+def distancia_palabras(referencia, hipotesis):
+    """Distancia de edición entre listas de palabras"""
+    anterior = list(range(len(hipotesis) + 1))
+    for i, r in enumerate(referencia, 1):
+        actual = [i] + [0] * len(hipotesis)
+        for j, h in enumerate(hipotesis, 1):
+            actual[j] = min(anterior[j] + 1, actual[j - 1] + 1, anterior[j - 1] + (r != h))
+        anterior = actual
+    return anterior[-1]
+
+
+def percentil(valores, p):
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    k = (len(ordenados) - 1) * p / 100
+    inferior = int(k)
+    superior = min(inferior + 1, len(ordenados) - 1)
+    return ordenados[inferior] + (ordenados[superior] - ordenados[inferior]) * (k - inferior)
+
+
+def interpretar(caso, texto):
+    """Respuesta que la aplicación extraería del texto reconocido"""
+    from logica import Logica
+    from indice_nombres import indice_opciones
+
+    categoria = caso['categoria']
+    if not texto:
+        return None
+    if categoria == 'confirmacion':
+        return Logica.confirmacion_reconocida(texto, 'confirmar')
+    if categoria == 'apiario':
+        return indice_opciones(tuple(caso.get('apiarios', []))).mejor(texto)
+    if caso.get('pregunta'):
+        respuestas = {}
+        Logica.procesar_respuesta_pregunta(caso['pregunta'], texto, 2, respuestas)
+        return respuestas.get(caso['pregunta']['id'])
+    return texto
+
+
+def ejecutar(casos, modelo):
+    """Transcribe cada caso y mide tiempos y aciertos"""
+    from decodificacion_audio import decodificar_audio, SAMPLERATE
+    from preproceso import preparar_audio
+    from transcriptor import transcribir
+
+    resultados = []
+    for caso in casos:
+        with open(caso['ruta'], 'rb') as f:
+            audio_np = decodificar_audio(f.read())
+        duracion = audio_np.size / SAMPLERATE
+
+        inicio = time.perf_counter()
+        preparado = preparar_audio(audio_np)
+        texto = ''
+        if preparado is not None:
+            texto = transcribir(modelo, preparado, caso.get('pregunta'))["text"].strip().lower()
+        latencia = time.perf_counter() - inicio
+
+        referencia = palabras(caso.get('texto'))
+        respuesta = interpretar(caso, texto)
+        resultados.append({
+            'archivo': caso['archivo'],
+            'categoria': caso['categoria'],
+            'texto': texto,
+            'duracion_audio': round(duracion, 3),
+            'latencia': round(latencia, 4),
+            'errores_palabra': distancia_palabras(referencia, palabras(texto)),
+            'palabras_referencia': len(referencia),
+            'respuesta': respuesta,
+            'acierto': respuesta == caso.get('esperado')
+        })
+    return resultados
+
+
+def resumir(resultados):
+    """Métricas agregadas de un conjunto de resultados"""
+    validos = [r for r in resultados if 'error' not in r]
+    latencias = [r['latencia'] for r in validos]
+    audio = sum(r['duracion_audio'] for r in validos)
+    referencia = sum(r['palabras_referencia'] for r in validos)
+    return {
+        'casos': len(resultados),
+        'errores': len(resultados) - len(validos),
+        'rtf': round(sum(latencias) / audio, 4) if audio else None,
+        'latencia_p50': round(percentil(latencias, 50), 4) if latencias else None,
+        'latencia_p95': round(percentil(latencias, 95), 4) if latencias else None,
+        'wer': round(sum(r['errores_palabra'] for r in validos) / referencia, 4) if referencia else None,
+        'precision_respuesta': round(sum(r['acierto'] for r in validos) / len(validos), 4) if validos else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Precisión y velocidad del ASR sobre un corpus etiquetado")
+    parser.add_argument('corpus', help="Directorio con etiquetas.json y las grabaciones WAV")
+    parser.add_argument('--tamano', default=None, help="Tamaño del modelo (por defecto WHISPER_MODEL)")
+    parser.add_argument('--motor', default=None, help="Motor ASR (por defecto ASR_MOTOR)")
+    parser.add_argument('--beam-size', type=int, default=None)
+    parser.add_argument('--salida', help="Ruta del informe JSON")
+    parser.add_argument('--sintetizar', action='store_true',
+                        help="Genera con el motor de voz las grabaciones que falten")
+    args = parser.parse_args()
+
+    import transcriptor
+    from modelos_asr import obtener_modelo, WHISPER_MODEL, ASR_MOTOR
+
+    if args.beam_size is not None:
+        transcriptor.OPCIONES_BASE['beam_size'] = args.beam_size
+
+    casos = cargar_corpus(args.corpus)
+    if args.sintetizar:
+        sintetizar_corpus(casos)
+    faltan = [c['archivo'] for c in casos if not c['ruta'].exists()]
+    if faltan:
+        print(f"Faltan {len(faltan)} de {len(casos)} grabaciones en {args.corpus}: {', '.join(faltan)}\n"
+              f"Genérelas con --sintetizar o copie las grabaciones reales.", file=sys.stderr)
+        sys.exit(2)
+
+    modelo = obtener_modelo(args.tamano, motor=args.motor)
+
+    resultados = ejecutar(casos, modelo)
+    categorias = sorted({r['categoria'] for r in resultados})
+    informe = {
+        'version': VERSION_INFORME,
+        'configuracion': {
+            'tamano': args.tamano or WHISPER_MODEL,
+            'motor': args.motor or ASR_MOTOR,
+            'decodificacion': dict(transcriptor.OPCIONES_BASE),
+            'vocabulario_cerrado': transcriptor.VOCABULARIO_CERRADO
+        },
+        'resumen': resumir(resultados),
+        'por_categoria': {c: resumir([r for r in resultados if r['categoria'] == c]) for c in categorias},
+        'memoria_pico_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'casos': resultados
+    }
+
+    salida = json.dumps(informe, ensure_ascii=False, indent=2, sort_keys=True)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(salida + "\n")
+    else:
+        print(salida)
+
+    resumen = informe['resumen']
+    print(f"RTF {resumen['rtf']} | p50 {resumen['latencia_p50']}s | p95 {resumen['latencia_p95']}s | "
+          f"WER {resumen['wer']} | aciertos {resumen['precision_respuesta']} | "
+          f"pico {informe['memoria_pico_mb']} MB", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
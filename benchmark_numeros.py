@@ -0,0 +1,51 @@
+# benchmark_numeros.py
+"""Micro-benchmark del intérprete de números en español (numeros_es).
+
+Mide el coste por llamada de palabras_a_numero sobre frases típicas de las
+respuestas: exactas, pegadas por el reconocedor, mal escritas, con decimales
+y las que se rechazan por ambiguas.
+
+Uso: python benchmark_numeros.py [--repeticiones 20000]
+"""
+import time
+import argparse
+
+from numeros_es import palabras_a_numero, _corregir
+
+CASOS = {
+    'exacta': ["cinco", "veinticinco", "cien", "mil"],
+    'compuesta': ["ciento veinticinco", "dos mil trescientos cuarenta y cinco", "diez y seis"],
+    'pegada': ["cientoveinticinco", "diezyseis", "dosmil"],
+    'corregida': ["sinco", "katorse", "beinte"],
+    'decimal': ["dos coma cinco", "tres coma cinco", "dos y medio", "2,5"],
+    'frase': ["son cinco colmenas", "la opción número dos"],
+    # Deben devolver None: se mide aparte para no mezclar fallos con decimales
+    'rechazada': ["tres con cincuenta", "población media", "5 10"],
+}
+
+
+def medir(frases, repeticiones):
+    """Microsegundos por llamada"""
+    inicio = time.perf_counter()
+    for _ in range(repeticiones):
+        for frase in frases:
+            palabras_a_numero(frase)
+    return (time.perf_counter() - inicio) / (repeticiones * len(frases)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Coste por llamada de palabras_a_numero")
+    parser.add_argument('--repeticiones', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'caso':<12}{'µs/llamada':>12}  ejemplo")
+    for caso, frases in CASOS.items():
+        _corregir.cache_clear()
+        frio = medir(frases, 1)
+        caliente = medir(frases, args.repeticiones)
+        ejemplo = f"{frases[0]!r} -> {palabras_a_numero(frases[0])!r}"
+        print(f"{caso:<12}{caliente:>12.2f}  {ejemplo}  (primera llamada {frio:.1f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# cache_preguntas.py
+"""Caché en memoria de la configuración de preguntas, por versión.
+
+La configuración cambia muy de vez en cuando y se lee en cada GET de
+/api/preguntas y al empezar cada sesión de voz. Aquí se guarda ya convertida
+(con las opciones decodificadas) junto con su ETag. Cada escritura sube un
+sello de versión en la BD: el proceso que escribe descarta la caché al
+momento, y los demás procesos comparan el sello como mucho cada
+PREGUNTAS_REVALIDAR segundos, con una lectura de una fila en vez de la
+configuración completa.
+"""
+import os
+import time
+import threading
+from collections import namedtuple
+
+from interpretes import version_config
+
+# ================= CONFIGURACIÓN =================
+REVALIDAR = float(os.getenv('PREGUNTAS_REVALIDAR', '30'))   # Segundos entre comprobaciones del sello
+
+# preguntas es compartida entre peticiones: no se modifica
+ConfigPreguntas = namedtuple('ConfigPreguntas', 'preguntas etag sello')
+
+
+class CachePreguntas:
+    """Lectura a través de caché de la configuración de preguntas"""
+
+    def __init__(self, cargar, leer_sello, revalidar=REVALIDAR):
+        self.cargar = cargar              # cargar(activas) -> lista de preguntas o None
+        self.leer_sello = leer_sello      # leer_sello() -> versión en la BD o None
+        self.revalidar = revalidar
+        self._lock = threading.Lock()
+        self._entradas = {}               # activas -> ConfigPreguntas
+        self._sello = None
+        self._comprobado = 0.0
+        self._generacion = 0
+
+    def _comprobar_sello(self):
+        """Descarta lo guardado si otro proceso cambió la configuración"""
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._comprobado < self.revalidar:
+                return self._sello, self._generacion
+        sello = self.leer_sello()
+        with self._lock:
+            self._comprobado = ahora
+            # Sin BD se sigue sirviendo lo que haya en memoria
+            if sello is not None and sello != self._sello:
+                self._entradas.clear()
+                self._sello = sello
+                self._generacion += 1
+            return self._sello, self._generacion
+
+    def obtener(self, activas=True):
+        """ConfigPreguntas vigente; None si no hay caché y la BD no responde"""
+        sello, generacion = self._comprobar_sello()
+        with self._lock:
+            entrada = self._entradas.get(activas)
+        if entrada is not None:
+            return entrada
+
+        preguntas = self.cargar(activas)
+        if preguntas is None:
+            return None
+        entrada = ConfigPreguntas(preguntas, version_config(preguntas), sello)
+        with self._lock:
+            # Si hubo una escritura durante la carga, lo leído puede ser anterior a ella
+            if generacion == self._generacion:
+                self._entradas[activas] = entrada
+        return entrada
+
+    def invalidar(self):
+        """Descarta la configuración en memoria y obliga a leer el sello en la siguiente consulta"""
+        with self._lock:
+            self._entradas.clear()
+            self._comprobado = 0.0
+            self._generacion += 1
+
+
+_lock = threading.Lock()
+_cache = None
+
+
+def cache_preguntas(cargar=None, leer_sello=None):
+    """Caché de preguntas del proceso; se crea con las funciones de carga la primera vez"""
+    global _cache
+    with _lock:
+        if _cache is None and cargar is not None:
+            _cache = CachePreguntas(cargar, leer_sello or (lambda: None))
+        return _cache
+
+
+def preguntas_modificadas():
+    """Aviso tras una escritura de preguntas en este proceso"""
+    with _lock:
+        cache = _cache
+    if cache is not None:
+        cache.invalidar()
@@ -0,0 +1,190 @@
+# cache_voz.py
+import os
+import json
+import hashlib
+import threading
+import logging
+from pathlib import Path
+from collections import OrderedDict
+import numpy as np
+import soundfile as sf
+
+from decodificacion_audio import remuestrear
+
+# ================= CONFIGURACIÓN DE LA CACHÉ =================
+DIR_CACHE = Path(os.getenv('CACHE_VOZ_DIR', 'cache_voz'))
+PAUSA_SEGMENTOS = 0.15       # Silencio entre segmentos de un mensaje compuesto
+MEMORIA_MAX = int(float(os.getenv('CACHE_VOZ_MEMORIA_MB', '64')) * 1024 * 1024)  # Bytes de audio en memoria
+DISCO_MAX = int(float(os.getenv('CACHE_VOZ_DISCO_MB', '256')) * 1024 * 1024)     # Bytes de WAV en el directorio
+
+# Con CACHE_VOZ=0 se sintetiza cada mensaje en el momento, como antes
+CACHE_VOZ = os.getenv('CACHE_VOZ', '1') != '0'
+
+
+class TextoVariable(str):
+    """Segmento que cambia en cada mensaje (un valor, un error): se sintetiza sin guardarlo"""
+
+
+class CacheVoz:
+    """Mensajes de voz renderizados una vez a WAV, por texto, voz y velocidad"""
+
+    def __init__(self, engine, directorio=DIR_CACHE, memoria_max=MEMORIA_MAX, disco_max=DISCO_MAX):
+        self.engine = engine
+        self.directorio = Path(directorio)
+        self.directorio.mkdir(exist_ok=True)
+        self._lock = threading.Lock()
+        self._ruta_indice = self.directorio / "indice.json"
+        self._indice = self._cargar_indice()
+        # LRU de muestras ya decodificadas, limitada a memoria_max bytes
+        self._memoria = OrderedDict()
+        self._bytes_memoria = 0
+        self.memoria_max = memoria_max
+        self.disco_max = disco_max
+
+    def _cargar_indice(self):
+        """Claves renderizadas por etiqueta (p. ej. el id de la pregunta)"""
+        try:
+            with open(self._ruta_indice, 'r', encoding='utf-8') as f:
+                return {k: set(v) for k, v in json.load(f).items()}
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def _guardar_indice(self):
+        with open(self._ruta_indice, 'w', encoding='utf-8') as f:
+            json.dump({k: sorted(v) for k, v in self._indice.items()}, f)
+
+    def clave(self, texto):
+        voz = self.engine.getProperty('voice')
+        velocidad = self.engine.getProperty('rate')
+        return hashlib.sha1(f"{voz}|{velocidad}|{texto}".encode('utf-8')).hexdigest()
+
+    def ruta(self, texto, etiqueta=None):
+        """Ruta del WAV del mensaje, sintetizándolo si aún no existe"""
+        clave = self.clave(texto)
+        ruta = self.directorio / f"{clave}.wav"
+        with self._lock:
+            if not ruta.exists():
+                # Nombre por proceso: varios trabajadores de síntesis comparten el directorio
+                temporal = ruta.with_suffix(f".{os.getpid()}.tmp.wav")
+                self.engine.save_to_file(texto, str(temporal))
+                self.engine.runAndWait()
+                os.replace(temporal, ruta)
+                logging.info(f"Mensaje de voz renderizado en caché: {texto[:40]}")
+                self._recortar_disco(ruta)
+            else:
+                # La fecha de modificación hace de último uso para el recorte
+                os.utime(ruta)
+            if etiqueta is not None and clave not in self._indice.get(etiqueta, set()):
+                self._indice.setdefault(etiqueta, set()).add(clave)
+                self._guardar_indice()
+        return ruta
+
+    def _recortar_disco(self, conservar):
+        """Borra los WAV usados hace más tiempo hasta quedar por debajo de disco_max (con el lock tomado)"""
+        archivos = []
+        for ruta in self.directorio.glob("*.wav"):
+            if ruta.name.endswith(".tmp.wav") or ruta == conservar:
+                continue
+            try:
+                estado = ruta.stat()
+            except FileNotFoundError:
+                continue
+            archivos.append((estado.st_mtime, estado.st_size, ruta))
+        total = sum(tamano for _, tamano, _ in archivos) + conservar.stat().st_size
+        if total <= self.disco_max:
+            return
+
+        borradas = set()
+        for _, tamano, ruta in sorted(archivos, key=lambda a: a[0]):
+            if total <= self.disco_max:
+                break
+            try:
+                ruta.unlink()
+            except FileNotFoundError:
+                pass
+            total -= tamano
+            borradas.add(ruta.stem)
+        for claves in self._indice.values():
+            claves -= borradas
+        for memo in [m for m in self._memoria if m[0] in borradas]:
+            self._bytes_memoria -= self._memoria.pop(memo).nbytes
+        self._guardar_indice()
+        logging.info(f"Caché de voz recortada: {len(borradas)} mensajes borrados")
+
+    def efimero(self, texto, samplerate=None):
+        """Muestras de un texto que no se guarda: se sintetiza, se lee y se borra"""
+        temporal = self.directorio / f"efimero.{os.getpid()}.{threading.get_ident()}.tmp.wav"
+        with self._lock:
+            self.engine.save_to_file(texto, str(temporal))
+            self.engine.runAndWait()
+        try:
+            datos, sr = sf.read(str(temporal), dtype='float32', always_2d=True)
+        finally:
+            temporal.unlink(missing_ok=True)
+        datos = datos[:, 0]
+        if samplerate and sr != samplerate:
+            datos = remuestrear(datos, sr, samplerate).astype(np.float32)
+        return datos
+
+    def audio(self, texto, etiqueta=None):
+        """Muestras float32 y frecuencia de muestreo del mensaje"""
+        datos, samplerate = sf.read(str(self.ruta(texto, etiqueta)), dtype='float32', always_2d=True)
+        return datos[:, 0], samplerate
+
+    def muestras(self, texto, etiqueta=None, samplerate=None):
+        """Muestras float32 del mensaje al samplerate pedido, memorizadas en memoria"""
+        clave = self.clave(texto)
+        memo = (clave, samplerate)
+        with self._lock:
+            datos = self._memoria.get(memo)
+            if datos is not None:
+                self._memoria.move_to_end(memo)
+        if datos is None:
+            datos, sr = self.audio(texto, etiqueta)
+            if samplerate and sr != samplerate:
+                datos = remuestrear(datos, sr, samplerate).astype(np.float32)
+            self._memorizar(memo, datos)
+        elif etiqueta is not None and clave not in self._indice.get(etiqueta, set()):
+            self.ruta(texto, etiqueta)
+        return datos
+
+    def _memorizar(self, memo, datos):
+        """Guarda las muestras y descarta las menos usadas si se supera memoria_max"""
+        with self._lock:
+            anterior = self._memoria.pop(memo, None)
+            if anterior is not None:
+                self._bytes_memoria -= anterior.nbytes
+            if datos.nbytes > self.memoria_max:
+                return
+            self._memoria[memo] = datos
+            self._bytes_memoria += datos.nbytes
+            while self._bytes_memoria > self.memoria_max:
+                _, viejo = self._memoria.popitem(last=False)
+                self._bytes_memoria -= viejo.nbytes
+
+    def segmentos(self, segmentos, etiqueta=None, samplerate=None, guardar=True):
+        """Partes de un mensaje dinámico listas para copiar al buffer de reproducción.
+
+        Los segmentos TextoVariable (o todos, con guardar=False) no se guardan en la caché.
+        """
+        return [
+            self.muestras(segmento, etiqueta, samplerate)
+            if guardar and not isinstance(segmento, TextoVariable)
+            else self.efimero(segmento, samplerate)
+            for segmento in segmentos
+        ]
+
+    def invalidar(self, etiqueta):
+        """Elimina los mensajes renderizados para una etiqueta"""
+        with self._lock:
+            claves = self._indice.pop(etiqueta, set())
+            for memo in [m for m in self._memoria if m[0] in claves]:
+                self._bytes_memoria -= self._memoria.pop(memo).nbytes
+            for clave in claves:
+                try:
+                    (self.directorio / f"{clave}.wav").unlink()
+                except FileNotFoundError:
+                    pass
+            self._guardar_indice()
+        if claves:
+            logging.info(f"Invalidados {len(claves)} mensajes de voz de '{etiqueta}'")
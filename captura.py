@@ -0,0 +1,223 @@
+# captura.py
+import os
+import queue
+import threading
+import numpy as np
+import sounddevice as sd
+import logging
+from audio_duplex import obtener_audio
+
+# ================= CONFIGURACIÓN DE CAPTURA =================
+SAMPLERATE = 16000
+DURACION_TRAMA = 0.03        # 30 ms por trama
+SILENCIO_FINAL = 0.6         # Segundos de silencio que cierran el enunciado
+ESPERA_INICIO = 3.0          # Segundos máximos esperando que el usuario empiece a hablar
+PRE_ROLL = 0.2               # Audio previo al inicio de la voz que se conserva
+UMBRAL_MINIMO = 0.01         # RMS mínimo para considerar una trama como voz
+FACTOR_RUIDO = 3.0           # Veces sobre el ruido de fondo para considerar voz
+
+# Permite volver a la grabación de duración fija con CAPTURA_STREAMING=0
+CAPTURA_STREAMING = os.getenv('CAPTURA_STREAMING', '1') != '0'
+
+# ================= INTERRUPCIÓN DEL MENSAJE (BARGE-IN) =================
+# Con BARGE_IN=1 se escucha mientras suena el mensaje y la voz del usuario lo corta
+BARGE_IN = os.getenv('BARGE_IN', '0') == '1'
+CALIBRACION_ECO = 0.3        # Segundos iniciales del mensaje usados para medir el eco
+GANANCIA_ECO = 0.5           # Acoplamiento altavoz-micrófono si no se pudo medir
+FACTOR_ECO = 2.5             # Veces sobre el eco esperado para considerar voz del usuario
+TRAMAS_INTERRUPCION = 5      # Tramas seguidas con voz (150 ms) para cortar el mensaje
+
+
+class CapturaVoz:
+    """Captura continua del micrófono con detección de fin de habla por energía.
+
+    Las tramas llegan del stream dúplex compartido, que también reproduce los
+    mensajes y el pitido; cada trama indica si la salida estaba sonando.
+    """
+
+    def __init__(self, audio=None):
+        self.audio = audio or obtener_audio()
+        self.samplerate = self.audio.samplerate
+        self.tamano_trama = self.audio.tamano_trama
+        self.duracion_trama = self.audio.duracion_trama
+        self._lock = threading.Lock()
+        self._ruido = UMBRAL_MINIMO / FACTOR_RUIDO
+        self._enunciado = np.zeros(0, dtype=np.float32)
+
+    def iniciar(self):
+        self.audio.iniciar()
+
+    def detener(self):
+        self.audio.detener()
+
+    def _descartar_pendientes(self):
+        self.audio.descartar_pendientes()
+
+    def _siguiente(self, timeout):
+        try:
+            return self.audio.siguiente_trama(timeout=timeout)
+        except queue.Empty:
+            logging.warning("El stream de captura no entrega audio")
+            return None, False
+
+    def _unir(self, tramas):
+        """Copia las tramas al buffer reservado del enunciado (válido hasta la siguiente captura)"""
+        total = len(tramas) * self.tamano_trama
+        if self._enunciado.size < total:
+            self._enunciado = np.zeros(total, dtype=np.float32)
+        for i, trama in enumerate(tramas):
+            self._enunciado[i * self.tamano_trama:(i + 1) * self.tamano_trama] = trama
+        return self._enunciado[:total]
+
+    def _umbral(self):
+        return max(UMBRAL_MINIMO, self._ruido * FACTOR_RUIDO)
+
+    def grabar_enunciado(self, duracion_max=5, espera_inicio=ESPERA_INICIO, silencio_final=SILENCIO_FINAL):
+        """Graba hasta que el usuario deja de hablar o se alcanza duracion_max.
+
+        Devuelve el enunciado recortado como float32; vacío si no se detectó voz.
+        """
+        with self._lock:
+            self.iniciar()
+            self._descartar_pendientes()
+            return self._grabar(duracion_max, espera_inicio, silencio_final)
+
+    def _grabar(self, duracion_max, espera_inicio, silencio_final, inicio=None):
+        """Bucle de detección de fin de habla; inicio son tramas de voz ya capturadas"""
+        max_tramas = int(duracion_max / self.duracion_trama)
+        tramas_espera = int(min(espera_inicio, duracion_max) / self.duracion_trama)
+        tramas_silencio = max(1, int(silencio_final / self.duracion_trama))
+        tramas_pre_roll = int(PRE_ROLL / self.duracion_trama)
+
+        pre_roll = []
+        voz = list(inicio or [])
+        silencio = 0
+        hablando = bool(voz)
+        timeout = self.duracion_trama * 10
+
+        for i in range(len(voz), max_tramas):
+            trama, con_salida = self._siguiente(timeout)
+            if trama is None:
+                break
+
+            # Mientras suena el pitido (y su eco) no se busca el inicio de la voz
+            if con_salida and not hablando:
+                continue
+
+            rms = float(np.sqrt(np.dot(trama, trama) / trama.size))
+            es_voz = rms > self._umbral()
+
+            if not hablando:
+                if es_voz:
+                    hablando = True
+                    voz.extend(pre_roll)
+                    voz.append(trama)
+                else:
+                    # Seguimiento lento del ruido de fondo mientras no hay voz
+                    self._ruido = 0.95 * self._ruido + 0.05 * rms
+                    pre_roll.append(trama)
+                    if len(pre_roll) > tramas_pre_roll:
+                        pre_roll.pop(0)
+                    if i >= tramas_espera:
+                        break
+                continue
+
+            voz.append(trama)
+            silencio = 0 if es_voz else silencio + 1
+            if silencio >= tramas_silencio:
+                break
+
+        if not voz:
+            return np.zeros(0, dtype=np.float32)
+
+        # Quitar el silencio final que cerró el enunciado
+        if silencio:
+            voz = voz[:len(voz) - silencio]
+        return self._unir(voz)
+
+    def grabar_durante_reproduccion(self, salida, duracion_max=5, silencio_final=SILENCIO_FINAL):
+        """Escucha mientras suena un mensaje; si el usuario habla, corta el mensaje y graba.
+
+        El eco del propio mensaje se descarta comparando cada trama con el nivel
+        que el stream dúplex acaba de reproducir, escalado por el acoplamiento
+        medido al inicio del mensaje. Devuelve None si el mensaje terminó sin interrupción.
+        """
+        with self._lock:
+            self.iniciar()
+            self._descartar_pendientes()
+
+            tramas_pre_roll = int(PRE_ROLL / self.duracion_trama)
+            pre_roll = []
+            acoplamientos = []
+            consecutivas = 0
+            timeout = self.duracion_trama * 10
+
+            while salida.hablando():
+                trama, _ = self._siguiente(timeout)
+                if trama is None:
+                    return None
+
+                pre_roll.append(trama)
+                if len(pre_roll) > tramas_pre_roll + TRAMAS_INTERRUPCION:
+                    pre_roll.pop(0)
+
+                referencia = self.audio.nivel_salida()
+                if referencia is None:
+                    # Síntesis en vivo o entre mensajes: no hay referencia para distinguir el eco
+                    consecutivas = 0
+                    continue
+
+                rms = float(np.sqrt(np.dot(trama, trama) / trama.size))
+                if self.audio.tiempo_reproduccion() < CALIBRACION_ECO:
+                    if referencia > UMBRAL_MINIMO:
+                        acoplamientos.append(rms / referencia)
+                    continue
+
+                ganancia = float(np.median(acoplamientos)) if acoplamientos else GANANCIA_ECO
+                eco = ganancia * referencia
+                es_voz = rms > max(self._umbral(), FACTOR_ECO * eco)
+                consecutivas = consecutivas + 1 if es_voz else 0
+
+                if consecutivas >= TRAMAS_INTERRUPCION:
+                    logging.info("Mensaje interrumpido por la voz del usuario")
+                    salida.cancelar()
+                    return self._grabar(duracion_max, 0, silencio_final, inicio=list(pre_roll))
+
+            return None
+
+
+_captura = None
+
+
+def obtener_captura():
+    """Devuelve la instancia compartida de captura del proceso"""
+    global _captura
+    if _captura is None:
+        _captura = CapturaVoz()
+    return _captura
+
+
+def grabar_fijo(duracion, samplerate=SAMPLERATE):
+    """Graba un bloque de duración fija con sd.rec"""
+    audio = sd.rec(
+        int(duracion * samplerate),
+        samplerate=samplerate,
+        channels=1,
+        dtype='float32'
+    )
+    sd.wait()
+    return audio.flatten()
+
+
+def capturar_con_interrupcion(salida, duracion=5, silencio_final=SILENCIO_FINAL):
+    """Captura la respuesta dicha encima del mensaje; None si el mensaje terminó sin interrupción"""
+    if not (BARGE_IN and CAPTURA_STREAMING):
+        return None
+    return obtener_captura().grabar_durante_reproduccion(salida, duracion, silencio_final)
+
+
+def capturar_audio(duracion=5, silencio_final=SILENCIO_FINAL):
+    """Captura un enunciado; duracion es el tope máximo en modo streaming"""
+    if CAPTURA_STREAMING:
+        return obtener_captura().grabar_enunciado(duracion_max=duracion, silencio_final=silencio_final)
+    return grabar_fijo(duracion)
@@ -0,0 +1,105 @@
+# comparar_asr.py
+"""Compara factor de tiempo real y memoria de los motores ASR.
+
+Uso: python comparar_asr.py audio.wav [--tamanos tiny small] [--motores whisper ctranslate2]
+"""
+import argparse
+import json
+import time
+import resource
+import multiprocessing as mp
+
+from decodificacion_audio import decodificar_audio, SAMPLERATE
+
+
+def memoria_rss_mb():
+    """Memoria residente actual del proceso en MB"""
+    try:
+        with open('/proc/self/statm') as f:
+            paginas = int(f.read().split()[1])
+        return paginas * resource.getpagesize() / (1024 * 1024)
+    except OSError:
+        return None
+
+
+def memoria_pico_mb():
+    """Pico de memoria residente del proceso en MB (ru_maxrss está en KB en Linux)"""
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _medir(motor, tamano, audio_np, repeticiones, cola):
+    # Cada combinación corre en su propio proceso para que la memoria no se mezcle
+    from modelos_asr import obtener_modelo
+    from transcriptor import transcribir
+
+    rss_inicial = memoria_rss_mb()
+    inicio = time.perf_counter()
+    modelo = obtener_modelo(tamano, motor=motor)
+    carga = time.perf_counter() - inicio
+    rss_modelo = memoria_rss_mb()
+
+    # Primera pasada de calentamiento, fuera de la medición
+    texto = transcribir(modelo, audio_np)["text"].strip()
+
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        transcribir(modelo, audio_np)
+        tiempos.append(time.perf_counter() - inicio)
+
+    duracion_audio = audio_np.size / SAMPLERATE
+    medio = sum(tiempos) / len(tiempos)
+    cola.put({
+        'motor': motor,
+        'tamano': tamano,
+        'carga_s': round(carga, 3),
+        'transcripcion_s': round(medio, 3),
+        'rtf': round(medio / duracion_audio, 3),
+        'memoria_modelo_mb': round(rss_modelo - rss_inicial, 1) if rss_inicial is not None else None,
+        'memoria_pico_mb': round(memoria_pico_mb(), 1),
+        'texto': texto
+    })
+
+
+def comparar(audio_np, motores, tamanos, repeticiones=3):
+    """Mide cada (motor, tamano) sobre el mismo audio en procesos separados"""
+    contexto = mp.get_context('spawn')
+    resultados = []
+    for motor in motores:
+        for tamano in tamanos:
+            cola = contexto.Queue()
+            proceso = contexto.Process(target=_medir, args=(motor, tamano, audio_np, repeticiones, cola))
+            proceso.start()
+            proceso.join()
+            if proceso.exitcode == 0 and not cola.empty():
+                resultados.append(cola.get())
+            else:
+                resultados.append({'motor': motor, 'tamano': tamano, 'error': f"código de salida {proceso.exitcode}"})
+    return resultados
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara motores ASR en RTF y memoria")
+    parser.add_argument('audio', help="Archivo WAV, FLAC u Ogg con una respuesta de ejemplo")
+    parser.add_argument('--motores', nargs='+', default=['whisper', 'ctranslate2'])
+    parser.add_argument('--tamanos', nargs='+', default=['tiny', 'small'])
+    parser.add_argument('--repeticiones', type=int, default=3)
+    args = parser.parse_args()
+
+    with open(args.audio, 'rb') as f:
+        audio_np = decodificar_audio(f.read())
+
+    resultados = comparar(audio_np, args.motores, args.tamanos, args.repeticiones)
+
+    print(f"{'Motor':<12} {'Tamaño':<8} {'Carga s':>8} {'ASR s':>8} {'RTF':>7} {'Modelo MB':>10} {'Pico MB':>9}")
+    for r in resultados:
+        if 'error' in r:
+            print(f"{r['motor']:<12} {r['tamano']:<8} error: {r['error']}")
+            continue
+        print(f"{r['motor']:<12} {r['tamano']:<8} {r['carga_s']:>8} {r['transcripcion_s']:>8} "
+              f"{r['rtf']:>7} {r['memoria_modelo_mb']:>10} {r['memoria_pico_mb']:>9}")
+    print(json.dumps(resultados, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+# config_voz.py
+"""Voz y velocidad del motor pyttsx3, compartidas por la salida local y los
+procesos de síntesis (que así no importan el stream de audio)."""
+
+# ================= CONFIGURACIÓN DE LA VOZ =================
+VELOCIDAD = 180
+VOZ = 'spanish'
@@ -1,72 +1,124 @@
 # controlador.py (modificado)
-from flask import Flask, request, jsonify
-from modelo import DatabaseModel
+from flask import Flask, request, jsonify, Response
+from modelo import DatabaseModel, PreguntaNoEncontrada, PreguntaDuplicada, ConflictoVersion, CUALQUIER_VERSION
 from logica import Logica
-import whisper
-import sounddevice as sd
-import numpy as np
-import pyttsx3
-import threading
-import pygame  
+from captura import capturar_audio, capturar_con_interrupcion, BARGE_IN, SILENCIO_FINAL
+from preproceso import preparar_audio
+from decodificacion_audio import decodificar_audio, leer_flujo, AudioDemasiadoGrande, SAMPLERATE
+from transcriptor import transcribir, transcribir_escalonado, ESCALONADO
+from trabajador_asr import obtener_trabajador
+from numeros_es import palabras_a_numero
+from indice_nombres import indice_apiarios, indice_colmenas
+from interpretes import compilar, interprete, texto_pregunta
+from sesion_voz import EjecutorSesion, medir, obtener_informe, informes, preguntas_lentas
+from salida_voz import obtener_salida_voz
+from cache_voz import TextoVariable
+from dictado import DICTADO, DURACION_DICTADO, SILENCIO_DICTADO, extraer_respuestas
+from sintesis_voz import obtener_pool_sintesis
+from cache_preguntas import cache_preguntas
+from concurrent.futures import TimeoutError as TiempoAgotado
+import audio_duplex
 from datetime import datetime
 import json
+import os
+import time
+import wave
 
 # ================= CONFIGURACIÓN INICIAL =================
 app = Flask(_name_)
 
-# Configuración para síntesis de voz
-engine = pyttsx3.init()
-engine.setProperty('rate', 180)
-engine.setProperty('voice', 'spanish')
+# Síntesis de voz: un único hilo dueño del motor (el mismo que usa Logica)
+salida_voz = obtener_salida_voz()
 
-# Configuración para reconocimiento de voz
-WHISPER_MODEL = "tiny"
-model = whisper.load_model(WHISPER_MODEL)
+# Configuración para reconocimiento de voz (mismo modelo compartido que Logica)
+model = Logica.model
 
-# Inicializar pygame.mixer
-pygame.mixer.init()
-BEEP_SOUND = pygame.mixer.Sound("beep.wav")  # 👈 Archivo WAV para el pitido
+# Con ASR_LOTES=0 cada petición transcribe en su propio hilo, sin agrupar sesiones
+ASR_LOTES = os.getenv('ASR_LOTES', '1') != '0'
 
 # ================= FUNCIONES AUXILIARES =================
 def emitir_pitido(frecuencia=1000, duracion=200):
-    """Emite un pitido usando pygame.mixer"""
-    BEEP_SOUND.play()
+    """Emite el pitido por el stream de audio compartido, sin bloquear"""
+    audio_duplex.emitir_pitido(frecuencia, duracion)
 
 def procesar_respuesta_numerica(respuesta):
     """Convierte respuesta de voz a número"""
-    try:
-        return int(''.join(filter(str.isdigit, respuesta)))
-    except:
+    return palabras_a_numero(respuesta)
+
+def respuesta_valida(pregunta):
+    """Función que indica si un texto es una respuesta válida para la pregunta"""
+    if not pregunta or pregunta['tipo'] not in ('opcion', 'numero'):
         return None
+    return interprete(pregunta).es_valida
+
+def decodificar(modelo, audio_np, pregunta=None):
+    """Transcribe con un modelo por el trabajador por lotes o en línea"""
+    if ASR_LOTES:
+        return obtener_trabajador(modelo).transcribir(audio_np, pregunta)
+    return transcribir(modelo, audio_np, pregunta)
 
-def validar_opcion(respuesta, opciones_validas):
-    """Valida que la respuesta coincida con las opciones"""
-    respuesta = respuesta.lower()
-    for opcion in opciones_validas:
-        if opcion.lower() in respuesta:
-            return opcion
-    return None
+def transcribir_buffer(audio_np, pregunta=None):
+    """Transcribe un buffer float32 a 16 kHz, escalando de modelo si está activado"""
+    if ESCALONADO:
+        return transcribir_escalonado(audio_np, pregunta, respuesta_valida(pregunta), decodificar)
+    return decodificar(model, audio_np, pregunta)
 
-def validar_numero(respuesta, min_val=None, max_val=None):
-    """Valida y ajusta números dentro de rangos"""
+def configuracion_preguntas(activas=True):
+    """Configuración de preguntas desde la caché del proceso (None si la BD no responde)"""
+    cache = cache_preguntas(
+        DatabaseModel.cargar_preguntas_desde_bd,
+        DatabaseModel.sello_preguntas
+    )
+    return cache.obtener(activas)
+
+def invalidar_voz_pregunta(pregunta_id):
+    """Descarta los mensajes de voz en caché de una pregunta modificada"""
     try:
-        num = int(''.join(filter(str.isdigit, respuesta)))
-        if min_val is not None and num < min_val:
-            return min_val
-        if max_val is not None and num > max_val:
-            return max_val
-        return num
-    except:
-        return None
+        salida_voz.invalidar(pregunta_id)
+    except Exception as e:
+        print(f"Error al invalidar la caché de voz: {str(e)}")
 
 # ================= RUTAS PARA PREGUNTAS =================
 @app.route('/api/preguntas', methods=['GET'])
 def obtener_preguntas():
-    """Obtiene todas las preguntas configuradas"""
-    preguntas = DatabaseModel.cargar_preguntas_desde_bd()
-    if preguntas is None:
+    """Obtiene las preguntas configuradas (?todas=1 incluye las desactivadas).
+
+    Con If-None-Match y la configuración sin cambios responde 304 sin cuerpo.
+    """
+    config = configuracion_preguntas(request.args.get('todas') != '1')
+    if config is None:
         return jsonify({'error': 'No se pudieron cargar las preguntas desde el get'}), 500
-    return jsonify(preguntas)
+    respuesta = jsonify(config.preguntas)
+    respuesta.set_etag(config.etag)
+    # El cliente puede guardarla pero debe revalidarla con el ETag en cada uso
+    respuesta.headers['Cache-Control'] = 'no-cache'
+    return respuesta.make_conditional(request)
+
+@app.route('/api/preguntas/<string:pregunta_id>', methods=['GET'])
+def obtener_pregunta(pregunta_id):
+    """Obtiene una pregunta con su versión actual"""
+    pregunta = DatabaseModel.obtener_pregunta(pregunta_id)
+    if pregunta is None:
+        return jsonify({'error': 'Error al obtener la pregunta'}), 500
+    if not pregunta:
+        return jsonify({'error': 'Pregunta no encontrada'}), 404
+    return jsonify(pregunta)
+
+def version_solicitada(data=None):
+    """Versión de la pregunta que el cliente leyó (cabecera If-Match o campo version).
+
+    If-Match: * exige que la pregunta exista, sin fijar versión.
+    """
+    version = request.headers.get('If-Match') or (data or {}).get('version')
+    if version is None:
+        return None
+    version = str(version).strip()
+    if version == '*':
+        return CUALQUIER_VERSION
+    return int(version.strip('"W/ '))
+
+def respuesta_conflicto(error):
+    return jsonify({'error': 'La pregunta fue modificada por otro usuario', 'version': error.actual}), 409
 
 @app.route('/api/preguntas', methods=['POST'])
 def crear_pregunta():
@@ -74,55 +126,81 @@ def crear_pregunta():
     data = request.get_json()
     if not data:
         return jsonify({'error': 'Datos no proporcionados'}), 400
+    if not data.get('id') or not data.get('pregunta') or not data.get('tipo'):
+        return jsonify({'error': 'Se requieren id, pregunta y tipo'}), 400
     
-    preguntas = DatabaseModel.cargar_preguntas_desde_bd()
-    if preguntas is None:
-        return jsonify({'error': 'No se pudieron cargar las preguntas desde el post'}), 500
-    
-    if any(p['id'] == data.get('id') for p in preguntas):
+    try:
+        pregunta = DatabaseModel.crear_pregunta(data)
+    except PreguntaDuplicada:
         return jsonify({'error': 'El ID de pregunta ya existe'}), 400
-    
-    preguntas.append(data)
-    if not DatabaseModel.aplicar_cambios_preguntas(preguntas):
+    if pregunta is None:
         return jsonify({'error': 'Error al guardar en la base de datos'}), 500
     
-    return jsonify(data), 201
+    return jsonify(pregunta), 201
 
 @app.route('/api/preguntas/<string:pregunta_id>', methods=['PUT'])
 def actualizar_pregunta(pregunta_id):
-    """Actualiza una pregunta existente"""
+    """Crea o reemplaza una pregunta (con If-Match solo si no cambió desde que se leyó)"""
     data = request.get_json()
     if not data:
         return jsonify({'error': 'Datos no proporcionados'}), 400
+    if not data.get('pregunta') or not data.get('tipo'):
+        return jsonify({'error': 'Se requieren pregunta y tipo'}), 400
+    
+    try:
+        version = version_solicitada(data)
+        pregunta, creada = DatabaseModel.guardar_pregunta(dict(data, id=pregunta_id), version)
+    except ValueError:
+        return jsonify({'error': 'Versión no válida'}), 400
+    except PreguntaNoEncontrada:
+        return jsonify({'error': 'Pregunta no encontrada'}), 404
+    except ConflictoVersion as e:
+        return respuesta_conflicto(e)
+    if pregunta is None:
+        return jsonify({'error': 'Error al guardar en la base de datos'}), 500
     
-    preguntas = DatabaseModel.cargar_preguntas_desde_bd()
-    if preguntas is None:
-        return jsonify({'error': 'No se pudieron cargar las preguntas desde el put'}), 500
+    invalidar_voz_pregunta(pregunta_id)
+    return jsonify(pregunta), 201 if creada else 200
+
+@app.route('/api/preguntas/<string:pregunta_id>', methods=['PATCH'])
+def modificar_pregunta(pregunta_id):
+    """Cambia solo los campos enviados de una pregunta"""
+    data = request.get_json()
+    if not data:
+        return jsonify({'error': 'Datos no proporcionados'}), 400
     
-    for i, p in enumerate(preguntas):
-        if p['id'] == pregunta_id:
-            preguntas[i] = data
-            if not DatabaseModel.aplicar_cambios_preguntas(preguntas):
-                return jsonify({'error': 'Error al guardar en la base de datos'}), 500
-            return jsonify(data)
+    try:
+        version = version_solicitada(data)
+        pregunta = DatabaseModel.modificar_pregunta(pregunta_id, data, version)
+    except ValueError:
+        return jsonify({'error': 'Versión no válida'}), 400
+    except PreguntaNoEncontrada:
+        return jsonify({'error': 'Pregunta no encontrada'}), 404
+    except ConflictoVersion as e:
+        return respuesta_conflicto(e)
+    if pregunta is None:
+        return jsonify({'error': 'Error al guardar en la base de datos'}), 500
     
-    return jsonify({'error': 'Pregunta no encontrada'}), 404
+    invalidar_voz_pregunta(pregunta_id)
+    return jsonify(pregunta)
 
 @app.route('/api/preguntas/<string:pregunta_id>', methods=['DELETE'])
 def eliminar_pregunta(pregunta_id):
     """Elimina (desactiva) una pregunta"""
-    preguntas = DatabaseModel.cargar_preguntas_desde_bd()
-    if preguntas is None:
-        return jsonify({'error': 'No se pudieron cargar las preguntas desde delete'}), 500
-    
-    for p in preguntas:
-        if p['id'] == pregunta_id:
-            p['activa'] = False
-            if not DatabaseModel.aplicar_cambios_preguntas(preguntas):
-                return jsonify({'error': 'Error al guardar en la base de datos'}), 500
-            return jsonify({'message': 'Pregunta desactivada correctamente'})
+    try:
+        version = version_solicitada(request.get_json(silent=True))
+        pregunta = DatabaseModel.desactivar_pregunta(pregunta_id, version)
+    except ValueError:
+        return jsonify({'error': 'Versión no válida'}), 400
+    except PreguntaNoEncontrada:
+        return jsonify({'error': 'Pregunta no encontrada'}), 404
+    except ConflictoVersion as e:
+        return respuesta_conflicto(e)
+    if pregunta is None:
+        return jsonify({'error': 'Error al guardar en la base de datos'}), 500
     
-    return jsonify({'error': 'Pregunta no encontrada'}), 404
+    invalidar_voz_pregunta(pregunta_id)
+    return jsonify({'message': 'Pregunta desactivada correctamente', 'version': pregunta['version']})
 
 # ================= RUTAS PARA APIARIOS =================
 @app.route('/api/apiarios', methods=['GET'])
@@ -267,8 +345,25 @@ def obtener_monitoreos_pendientes():
 
 @app.route('/api/monitoreos', methods=['GET'])
 def obtener_monitoreos():
-    """Obtiene todos los monitoreos registrados"""
-    monitoreos = DatabaseModel.obtener_monitoreos()
+    """Historial de monitoreos (filtros: colmena, apiario, desde, hasta, limite)"""
+    try:
+        monitoreos = DatabaseModel.obtener_monitoreos(
+            id_colmena=request.args.get('colmena', type=int),
+            id_apiario=request.args.get('apiario', type=int),
+            desde=request.args.get('desde'),
+            hasta=request.args.get('hasta'),
+            limite=request.args.get('limite', 100, type=int)
+        )
+    except ValueError:
+        return jsonify({'error': 'Las fechas deben ir en formato ISO (AAAA-MM-DD)'}), 400
+    if monitoreos is None:
+        return jsonify({'error': 'No se pudieron obtener los monitoreos'}), 500
+    return jsonify(monitoreos)
+
+@app.route('/api/apiarios/<int:apiario_id>/monitoreos/ultimos', methods=['GET'])
+def obtener_ultimos_monitoreos(apiario_id):
+    """Último monitoreo de cada colmena de un apiario"""
+    monitoreos = DatabaseModel.obtener_ultimos_monitoreos(apiario_id)
     if monitoreos is None:
         return jsonify({'error': 'No se pudieron obtener los monitoreos'}), 500
     return jsonify(monitoreos)
@@ -292,47 +387,57 @@ def iniciar_monitoreo_voz():
         hablar_texto({"texto": "Bienvenido al sistema de monitoreo de colmenas por voz. Yo soy Maya, te asistiré durante este monitoreo."})
         
         # Obtener preguntas activas
-        preguntas = DatabaseModel.cargar_preguntas_desde_bd()
-        if not preguntas:
+        config = configuracion_preguntas()
+        if config is None or not config.preguntas:
             return jsonify({'error': 'No se pudieron cargar las preguntas'}), 500
+        preguntas = config.preguntas
             
         preguntas_activas = [p for p in preguntas if p.get('activa', True)]
         preguntas_activas.sort(key=lambda x: x.get('orden', 0))
+        # Los intérpretes de respuesta solo se reconstruyen si la configuración cambió
+        compilar(preguntas, config.etag)
+        
+        # La primera pregunta se prepara mientras se eligen apiario y colmena
+        sesion = EjecutorSesion(model, texto_pregunta)
+        if preguntas_activas:
+            sesion.preparar(preguntas_activas[0])
         
         # Seleccionar apiario
         apiarios = DatabaseModel.obtener_apiarios()
         if not apiarios:
             return jsonify({'error': 'No hay apiarios registrados'}), 400
             
-        hablar_texto({"texto": "Por favor indique el apiario a monitorear. Las opciones son: " + ", ".join(a['nombre'] for a in apiarios)})
+        hablar_texto({"segmentos": ["Por favor indique el apiario a monitorear. Las opciones son:"] + [a['nombre'] for a in apiarios]})
         
-        apiario_audio = escuchar_audio()
+        with sesion.cronometro.medir("escucha", pregunta="apiario"):
+            apiario_audio, _ = escuchar_respuesta()
         if 'error' in apiario_audio:
             return jsonify({'error': 'Error al capturar audio del apiario'}), 400
             
-        apiario_id = None
-        for a in apiarios:
-            if a['nombre'].lower() in apiario_audio.get('texto', '').lower():
-                apiario_id = a['id']
-                break
+        apiario = indice_apiarios(lambda: apiarios).mejor(apiario_audio.get('texto', ''))
+        apiario_id = apiario['id'] if apiario else None
                 
         if not apiario_id:
             return jsonify({'error': 'Apiario no reconocido'}), 400
+        sesion.cronometro.etiquetar(apiario=apiario_id)
             
         # Seleccionar colmena
-        colmenas = DatabaseModel.obtener_colmenas_apiario(apiario_id)
+        colmenas = indice_colmenas(apiario_id, lambda: DatabaseModel.obtener_colmenas_apiario(apiario_id))
         if not colmenas:
             return jsonify({'error': 'No hay colmenas en este apiario'}), 400
             
-        hablar_texto({"texto": f"Por favor indique el número de colmena a monitorear. Las opciones son: {', '.join(str(c['numero_colmena']) for c in colmenas)}"})
+        hablar_texto({"segmentos": ["Por favor indique el número de colmena a monitorear. Las opciones son:"] + [str(n) for n in colmenas.numeros()]})
         
-        colmena_audio = escuchar_audio()
+        with sesion.cronometro.medir("escucha", pregunta="colmena"):
+            colmena_audio, _ = escuchar_respuesta()
         if 'error' in colmena_audio:
             return jsonify({'error': 'Error al capturar audio de la colmena'}), 400
             
-        numero_colmena = procesar_respuesta_numerica(colmena_audio.get('texto', ''))
-        if not numero_colmena or not any(c['numero_colmena'] == numero_colmena for c in colmenas):
+        colmena = colmenas.mejor(colmena_audio.get('texto', ''))
+        numero_colmena = colmena['numero_colmena'] if colmena else None
+        if not numero_colmena:
             return jsonify({'error': 'Número de colmena no válido'}), 400
+        sesion.cronometro.etiquetar(colmena=numero_colmena)
             
         # Procesar preguntas
         respuestas = {
@@ -342,7 +447,22 @@ def iniciar_monitoreo_voz():
             'respuestas': {}
         }
         
-        for pregunta in preguntas_activas:
+        if DICTADO:
+            # Informe completo en un solo enunciado; después solo se pregunta lo que falte
+            hablar_texto({"texto": "Dicte el estado de la colmena, por ejemplo: población alta, actividad media.", "esperar": True})
+            with sesion.cronometro.medir("escucha", pregunta="dictado"):
+                informe_audio, _ = escuchar_respuesta(duracion=DURACION_DICTADO, silencio_final=SILENCIO_DICTADO)
+            if 'error' not in informe_audio:
+                with sesion.cronometro.medir("interpretacion", pregunta="dictado"):
+                    extraccion = extraer_respuestas(informe_audio.get('texto', ''), preguntas_activas)
+                respuestas['respuestas'].update(extraccion.respuestas)
+        
+        for indice, pregunta in enumerate(preguntas_activas):
+            siguiente = preguntas_activas[indice + 1] if indice + 1 < len(preguntas_activas) else None
+            
+            if pregunta['id'] in respuestas['respuestas']:
+                continue
+            
             if pregunta.get('depende_de'):
                 # Verificar dependencia
                 pass
@@ -353,49 +473,61 @@ def iniciar_monitoreo_voz():
             while not pregunta_respondida and intentos < 2:
                 intentos += 1
                 
-                texto_pregunta = pregunta['pregunta']
-                if pregunta['tipo'] == 'opcion':
-                    opciones = " o ".join(pregunta['opciones'])
-                    texto_pregunta += f". Opciones: {opciones}"
-                    
-                hablar_texto({"texto": texto_pregunta})
+                with sesion.cronometro.medir("tts", pregunta=pregunta['id']):
+                    # Con barge-in no se espera: la respuesta puede empezar durante el mensaje
+                    hablar_texto({"texto": sesion.texto(pregunta), "etiqueta": pregunta['id'], "esperar": not BARGE_IN})
+                
+                # La siguiente pregunta se prepara mientras se captura y transcribe esta respuesta
+                sesion.preparar(siguiente)
                 
-                respuesta_audio = escuchar_audio()
+                with sesion.cronometro.medir("escucha", pregunta=pregunta['id']):
+                    respuesta_audio, _ = escuchar_respuesta(pregunta)
                 if 'error' in respuesta_audio:
                     continue
                     
                 respuesta_texto = respuesta_audio.get('texto', '')
                 
-                # Procesar según tipo
-                if pregunta['tipo'] == 'opcion':
-                    respuesta_validada = validar_opcion(respuesta_texto, pregunta['opciones'])
-                elif pregunta['tipo'] == 'numero':
-                    respuesta_validada = validar_numero(respuesta_texto, pregunta.get('min'), pregunta.get('max'))
-                else:
-                    respuesta_validada = respuesta_texto
+                with sesion.cronometro.medir("interpretacion", pregunta=pregunta['id']):
+                    resultado = interprete(pregunta).interpretar(respuesta_texto)
+                respuesta_validada = resultado.valor
                     
-                if respuesta_validada:
+                if resultado.valido:
                     respuestas['respuestas'][pregunta['id']] = respuesta_validada
                     pregunta_respondida = True
                     
                     # Confirmación
-                    hablar_texto({"texto": f"Has respondido: {respuesta_validada}. ¿Es correcto? Diga 'sí' para confirmar o 'no' para repetir"})
+                    with sesion.cronometro.medir("tts", pregunta=pregunta['id'], fase="confirmacion"):
+                        # Solo el valor se sintetiza cada vez; el resto sale de la caché
+                        hablar_texto({"segmentos": [
+                            "Has respondido:",
+                            TextoVariable(respuesta_validada),
+                            "¿Es correcto? Diga 'sí' para confirmar o 'no' para repetir"
+                        ], "esperar": not BARGE_IN})
                     
-                    confirmacion_audio = escuchar_audio()
+                    with sesion.cronometro.medir("escucha", pregunta=pregunta['id'], fase="confirmacion"):
+                        confirmacion_audio, _ = escuchar_respuesta()
                     if confirmacion_audio.get('texto', '').lower().startswith('no'):
                         pregunta_respondida = False
                         respuestas['respuestas'].pop(pregunta['id'], None)
         
         # Guardar monitoreo
         if Logica.es_dispositivo_movil():
-            if Logica.guardar_monitoreo_temp(respuestas):
+            with sesion.cronometro.medir("guardado"):
+                guardado = Logica.guardar_monitoreo_temp(respuestas)
+            sesion.cerrar()
+            respuestas['tiempos'] = sesion.cronometro.informe()
+            if guardado:
                 hablar_texto({"texto": "Monitoreo guardado localmente para sincronización posterior"})
                 return jsonify(respuestas), 201
             else:
                 hablar_texto({"texto": "Error al guardar el monitoreo localmente"})
                 return jsonify({'error': 'Error al guardar localmente'}), 500
         else:
-            if DatabaseModel.guardar_respuestas(respuestas):
+            with sesion.cronometro.medir("guardado"):
+                guardado = DatabaseModel.guardar_respuestas(respuestas)
+            sesion.cerrar()
+            respuestas['tiempos'] = sesion.cronometro.informe()
+            if guardado:
                 hablar_texto({"texto": "Monitoreo completado y guardado exitosamente"})
                 return jsonify(respuestas), 201
             else:
@@ -403,60 +535,182 @@ def iniciar_monitoreo_voz():
                 return jsonify({'error': 'Error al guardar'}), 500
                 
     except Exception as e:
-        hablar_texto({"texto": f"Ocurrió un error durante el monitoreo: {str(e)}"})
+        hablar_texto({"texto": f"Ocurrió un error durante el monitoreo: {str(e)}", "cachear": False})
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/monitoreo/tiempos', methods=['GET'])
+def obtener_tiempos_sesiones():
+    """Resumen de tiempos de las sesiones de voz recientes y las preguntas más lentas"""
+    filtros = {k: request.args[k] for k in ('apiario', 'colmena') if k in request.args}
+    return jsonify({
+        'sesiones': informes(**filtros),
+        'preguntas_lentas': preguntas_lentas(
+            limite=request.args.get('limite', 10, type=int),
+            paso=request.args.get('paso', 'escucha')
+        )
+    })
+
+@app.route('/api/monitoreo/pool', methods=['GET'])
+def obtener_metricas_pool():
+    """Estado del pool de conexiones a la base de datos"""
+    metricas = DatabaseModel.metricas_pool()
+    if metricas is None:
+        return jsonify({'error': 'Pool de conexiones no inicializado'}), 503
+    return jsonify(metricas)
+
+@app.route('/api/monitoreo/tiempos/<string:sesion_id>', methods=['GET'])
+def obtener_tiempos_sesion(sesion_id):
+    """Pasos medidos de una sesión de voz"""
+    informe = obtener_informe(sesion_id)
+    if informe is None:
+        return jsonify({'error': 'Sesión no encontrada'}), 404
+    return jsonify(informe)
+
 # ================= RUTAS PARA INTERACCIÓN POR VOZ =================
 @app.route('/api/voz/hablar', methods=['POST'])
-def hablar_texto():
-    """Sintetiza voz a partir de texto"""
-    data = request.get_json()
-    if not data or not data.get('texto'):
+def hablar_texto(data=None):
+    """Encola texto o segmentos para síntesis de voz; solo espera si se pide 'esperar'"""
+    data = data or request.get_json()
+    if not data or not (data.get('texto') or data.get('segmentos')):
         return jsonify({'error': 'Texto no proporcionado'}), 400
     
-    texto = data['texto']
-    threading.Thread(target=engine.say, args=(texto,)).start()
-    engine.runAndWait()
-    return jsonify({'message': 'Texto enviado para síntesis de voz'})
+    with medir("tts"):
+        locucion = salida_voz.decir(
+            texto=data.get('texto'),
+            segmentos=data.get('segmentos'),
+            etiqueta=data.get('etiqueta'),
+            esperar=bool(data.get('esperar', False)),
+            cachear=bool(data.get('cachear', True))
+        )
+    return jsonify({'message': 'Texto enviado para síntesis de voz', 'terminado': locucion.terminada()})
+
+@app.route('/api/voz/sintetizar', methods=['POST'])
+def sintetizar_texto():
+    """Renderiza un mensaje a WAV u Ogg/Opus para que lo reproduzca el cliente"""
+    data = request.get_json(silent=True) or {}
+    texto = data.get('texto', request.args.get('texto'))
+    formato = data.get('formato', request.args.get('formato', 'wav'))
+    
+    try:
+        datos, tipo = obtener_pool_sintesis().sintetizar(texto, formato)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except TiempoAgotado:
+        return jsonify({'error': 'La síntesis tardó demasiado'}), 503
+    except Exception as e:
+        return jsonify({'error': f"Error al sintetizar: {str(e)}"}), 500
+    
+    return Response(datos, mimetype=tipo)
+
+@app.route('/api/voz/cancelar', methods=['POST'])
+def cancelar_voz():
+    """Interrumpe el mensaje en curso y descarta los pendientes"""
+    salida_voz.cancelar()
+    return jsonify({'message': 'Síntesis de voz cancelada'})
+
+def escuchar_respuesta(pregunta=None, duracion=5, silencio_final=SILENCIO_FINAL):
+    """Captura audio hasta el fin del habla (duracion es el tope) y lo transcribe.
+
+    Devuelve (datos, estado HTTP): datos lleva 'texto' o 'error'. El flujo de
+    monitoreo usa los datos; la ruta /api/voz/escuchar los envía como JSON.
+    """
+    try:
+        # Con barge-in la respuesta puede empezar mientras suena el mensaje
+        with medir("captura", barge_in=True):
+            audio_np = capturar_con_interrupcion(salida_voz, duracion, silencio_final)
+        if audio_np is None:
+            # No se graba mientras suena un mensaje del asistente
+            with medir("tts"):
+                salida_voz.esperar()
+            with medir("pitido"):
+                emitir_pitido()
+            
+            print("\n[ESCUCHANDO...]")
+            with medir("captura"):
+                audio_np = capturar_audio(duracion, silencio_final)
+        
+        with medir("asr"):
+            # Las capturas sin voz se descartan aquí sin pasar por el modelo
+            audio_np = preparar_audio(audio_np)
+            if audio_np is None:
+                return {'error': 'No se detectó voz'}, 400
+            
+            result = transcribir_buffer(audio_np, pregunta)
+        
+        texto = result["text"].strip()
+        if texto:
+            return {'texto': texto.lower(), 'latencia': result.get('latencia')}, 200
+        return {'error': 'No se detectó voz'}, 400
+        
+    except Exception as e:
+        return {'error': f"Error al escuchar: {str(e)}"}, 500
 
 @app.route('/api/voz/escuchar', methods=['POST'])
 def escuchar_audio():
-    """Captura audio y lo transcribe"""
+    """Escucha una respuesta; el cuerpo puede indicar la 'duracion' máxima"""
     data = request.get_json(silent=True)
     duracion = data.get('duracion', 5) if data else 5
+    datos, estado = escuchar_respuesta(duracion=duracion)
+    return jsonify(datos), estado
+
+@app.route('/api/voz/transcribir', methods=['POST'])
+def transcribir_audio_cliente():
+    """Transcribe audio grabado en el cliente (WAV, PCM 16 bits u Ogg/Opus, subido o por trozos)"""
+    inicio = time.perf_counter()
+    tiempos = {}
     
     try:
-        samplerate = 16000
-        threading.Thread(target=emitir_pitido).start()
+        if request.mimetype == 'multipart/form-data':
+            archivo = request.files.get('audio')
+            if archivo is None:
+                return jsonify({'error': "Falta el archivo 'audio'"}), 400
+            datos = leer_flujo(archivo.stream)
+            tipo = archivo.mimetype
+        else:
+            datos = leer_flujo(request.stream)
+            tipo = request.mimetype
         
-        print("\n[ESCUCHANDO...]")
-        audio = sd.rec(
-            int(duracion * samplerate),
-            samplerate=samplerate,
-            channels=1,
-            dtype='float32'
+        audio_np = decodificar_audio(
+            datos,
+            tipo,
+            samplerate=request.args.get('samplerate', SAMPLERATE, type=int),
+            canales=request.args.get('canales', 1, type=int)
         )
+    except AudioDemasiadoGrande as e:
+        return jsonify({'error': str(e)}), 413
+    except (ValueError, RuntimeError, EOFError, wave.Error) as e:
+        return jsonify({'error': f"Audio no válido: {str(e)}"}), 400
+    tiempos['decodificacion_audio'] = time.perf_counter() - inicio
+    
+    try:
+        pregunta = None
+        pregunta_id = request.args.get('pregunta_id')
+        if pregunta_id:
+            config = configuracion_preguntas()
+            preguntas = config.preguntas if config else []
+            pregunta = next((p for p in preguntas if p['id'] == pregunta_id), None)
         
-        sd.wait()
-        
-        audio_np = audio.flatten()
-        audio_np = audio_np / np.max(np.abs(audio_np))
-        
-        result = model.transcribe(
-            audio_np.astype(np.float32),
-            language="es",
-            temperature=0.0,
-            best_of=1,
-            beam_size=2
-        )
+        marca = time.perf_counter()
+        duracion_audio = audio_np.size / SAMPLERATE
+        audio_np = preparar_audio(audio_np)
+        tiempos['preproceso'] = time.perf_counter() - marca
+        if audio_np is None:
+            tiempos['total'] = time.perf_counter() - inicio
+            return jsonify({'error': 'No se detectó voz', 'tiempos': tiempos}), 400
         
-        texto = result["text"].strip()
-        if texto:
-            return jsonify({'texto': texto.lower()})
-        return jsonify({'error': 'No se detectó voz'}), 400
+        marca = time.perf_counter()
+        result = transcribir_buffer(audio_np, pregunta)
+        tiempos['transcripcion'] = time.perf_counter() - marca
+        tiempos['total'] = time.perf_counter() - inicio
         
+        return jsonify({
+            'texto': result["text"].strip().lower(),
+            'duracion_audio': duracion_audio,
+            'tiempos': tiempos,
+            'latencia': result.get('latencia')
+        })
     except Exception as e:
-        return jsonify({'error': f"Error al escuchar: {str(e)}"}), 500
+        return jsonify({'error': f"Error al transcribir: {str(e)}"}), 500
 
 # ================= INICIO DE LA APLICACIÓN =================
 # Cambia la parte final del archivo a:
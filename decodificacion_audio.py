@@ -0,0 +1,91 @@
+# decodificacion_audio.py
+import io
+import wave
+import numpy as np
+
+SAMPLERATE = 16000
+TAMANO_BLOQUE = 64 * 1024
+TAMANO_MAXIMO = 10 * 1024 * 1024     # ~5 minutos de PCM 16 bits a 16 kHz
+
+TIPOS_PCM = ('audio/l16', 'audio/pcm', 'audio/raw', 'application/octet-stream')
+TIPOS_WAV = ('audio/wav', 'audio/x-wav', 'audio/wave', 'audio/vnd.wave')
+TIPOS_COMPRIMIDOS = ('audio/ogg', 'audio/opus', 'audio/flac')
+
+
+class AudioDemasiadoGrande(ValueError):
+    """El cuerpo recibido supera TAMANO_MAXIMO"""
+
+
+def leer_flujo(flujo, tamano_maximo=TAMANO_MAXIMO):
+    """Lee un cuerpo (posiblemente enviado por trozos) en memoria"""
+    datos = bytearray()
+    while True:
+        bloque = flujo.read(TAMANO_BLOQUE)
+        if not bloque:
+            break
+        datos.extend(bloque)
+        if len(datos) > tamano_maximo:
+            raise AudioDemasiadoGrande(f"El audio supera {tamano_maximo} bytes")
+    return bytes(datos)
+
+
+def _pcm_a_float(datos, ancho):
+    """Convierte muestras PCM little-endian a float32 en [-1, 1]"""
+    if ancho == 2:
+        return np.frombuffer(datos, dtype='<i2').astype(np.float32) / 32768.0
+    if ancho == 4:
+        return np.frombuffer(datos, dtype='<i4').astype(np.float32) / 2147483648.0
+    if ancho == 1:
+        return (np.frombuffer(datos, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    raise ValueError(f"Ancho de muestra no soportado: {ancho} bytes")
+
+
+def _mono(audio_np, canales):
+    if canales > 1:
+        return audio_np.reshape(-1, canales).mean(axis=1)
+    return audio_np
+
+
+def remuestrear(audio_np, samplerate, destino=SAMPLERATE):
+    if samplerate == destino:
+        return audio_np
+    from math import gcd
+    from scipy.signal import resample_poly
+    divisor = gcd(samplerate, destino)
+    return resample_poly(audio_np, destino // divisor, samplerate // divisor)
+
+
+def _decodificar_wav(datos):
+    with wave.open(io.BytesIO(datos), 'rb') as wav:
+        canales = wav.getnchannels()
+        ancho = wav.getsampwidth()
+        samplerate = wav.getframerate()
+        muestras = wav.readframes(wav.getnframes())
+    audio_np = _pcm_a_float(muestras[:len(muestras) - len(muestras) % (ancho * canales)], ancho)
+    return _mono(audio_np, canales), samplerate
+
+
+def _decodificar_comprimido(datos):
+    import soundfile as sf
+    audio_np, samplerate = sf.read(io.BytesIO(datos), dtype='float32', always_2d=True)
+    return audio_np.mean(axis=1), samplerate
+
+
+def decodificar_audio(datos, tipo_contenido=None, samplerate=SAMPLERATE, canales=1):
+    """Decodifica WAV, PCM 16 bits u Ogg/Opus a float32 mono a 16 kHz, sin archivos temporales"""
+    if not datos:
+        return np.zeros(0, dtype=np.float32)
+
+    tipo = (tipo_contenido or '').split(';')[0].strip().lower()
+
+    if tipo in TIPOS_WAV or datos[:4] == b'RIFF':
+        audio_np, samplerate = _decodificar_wav(datos)
+    elif tipo in TIPOS_COMPRIMIDOS or datos[:4] in (b'OggS', b'fLaC'):
+        audio_np, samplerate = _decodificar_comprimido(datos)
+    elif tipo in TIPOS_PCM or not tipo:
+        datos = datos[:len(datos) - len(datos) % (2 * canales)]
+        audio_np = _mono(_pcm_a_float(datos, 2), canales)
+    else:
+        raise ValueError(f"Formato de audio no soportado: {tipo}")
+
+    return remuestrear(audio_np, samplerate).astype(np.float32)
@@ -0,0 +1,104 @@
+# dictado.py
+"""Modo dictado: todas las respuestas de una colmena en un solo enunciado.
+
+"población alta, actividad media, reina presente" se reparte entre las
+preguntas buscando en el texto las palabras clave de cada pregunta (su
+enunciado y sus alias) y pasando lo que sigue a cada una a su intérprete.
+Solo se vuelve a preguntar lo que falte o no quede claro.
+"""
+import os
+from collections import namedtuple, Counter
+
+from numeros_es import normalizar
+from indice_nombres import clave_fonetica
+from interpretes import interprete
+
+# ================= CONFIGURACIÓN DEL DICTADO =================
+# Con MONITOREO_DICTADO=1 la inspección empieza pidiendo el informe completo
+DICTADO = os.getenv('MONITOREO_DICTADO', '0') == '1'
+DURACION_DICTADO = 30        # Segundos máximos del informe dictado
+SILENCIO_DICTADO = 1.5       # Pausa que cierra el informe (más larga que entre respuestas)
+
+PALABRAS_VACIAS = {
+    'de', 'del', 'la', 'el', 'los', 'las', 'en', 'y', 'a', 'al', 'con', 'por', 'para',
+    'que', 'es', 'esta', 'son', 'hay', 'un', 'una', 'su', 'sus', 'lo', 'le', 'se',
+}
+
+Extraccion = namedtuple('Extraccion', 'respuestas ambiguas')
+
+
+def _clave(palabra):
+    """Clave fonética sin plural, para que "abejas" y "abeja" coincidan"""
+    clave = clave_fonetica(palabra)
+    return clave[:-1] if len(clave) > 3 and clave.endswith('s') else clave
+
+
+def _pistas(preguntas):
+    """Clave de palabra -> ids de las preguntas que la mencionan"""
+    pistas = {}
+    for pregunta in preguntas:
+        textos = [pregunta['pregunta']] + list(pregunta.get('alias') or [])
+        for texto in textos:
+            for palabra in normalizar(texto).split():
+                palabra = palabra.strip(',.')
+                if palabra not in PALABRAS_VACIAS and len(palabra) > 2:
+                    pistas.setdefault(_clave(palabra), set()).add(pregunta['id'])
+    return pistas
+
+
+def extraer_respuestas(texto, preguntas, respondidas=()):
+    """Respuestas que se pueden sacar de un informe dictado.
+
+    Devuelve Extraccion(respuestas={id: valor}, ambiguas=[ids]); las preguntas
+    ya respondidas no se buscan.
+    """
+    preguntas = [p for p in preguntas if p['id'] not in respondidas]
+    por_id = {p['id']: p for p in preguntas}
+    pistas = _pistas(preguntas)
+    # Las comas y puntos pegados a una palabra son pausas; "2,5" se conserva
+    originales = [p.strip(',.') for p in normalizar(texto or "").split()]
+    originales = [p for p in originales if p]
+    palabras = [_clave(p) for p in originales]
+
+    # Tramos de palabras clave: (inicio, fin, votos por pregunta)
+    tramos = []
+    i = 0
+    while i < len(palabras):
+        if palabras[i] not in pistas:
+            i += 1
+            continue
+        votos = Counter()
+        fin = i
+        j = i
+        while j < len(palabras):
+            ids = pistas.get(palabras[j])
+            if ids:
+                votos.update(ids)
+                fin = j + 1
+            elif originales[j] not in PALABRAS_VACIAS:
+                break
+            j += 1
+        tramos.append((i, fin, votos))
+        i = fin
+
+    respuestas = {}
+    ambiguas = []
+    for n, (inicio, fin, votos) in enumerate(tramos):
+        siguiente = tramos[n + 1][0] if n + 1 < len(tramos) else len(palabras)
+        valor = " ".join(originales[fin:siguiente])
+        ordenados = votos.most_common()
+        empatadas = [pid for pid, v in ordenados if v == ordenados[0][1]]
+
+        validas = []
+        for pid in empatadas:
+            resultado = interprete(por_id[pid]).interpretar(valor)
+            if resultado.valido:
+                validas.append((pid, resultado.valor))
+        # Con empate solo se acepta si el valor encaja en una única pregunta
+        if len(validas) == 1 and validas[0][0] not in respuestas:
+            respuestas[validas[0][0]] = validas[0][1]
+        else:
+            ambiguas.extend(pid for pid in empatadas if pid not in ambiguas)
+
+    ambiguas = [pid for pid in ambiguas if pid not in respuestas]
+    return Extraccion(respuestas, ambiguas)
@@ -0,0 +1,184 @@
+# esquema.py
+"""Metadatos de las tablas (columnas, tipos y valores ENUM) cargados una sola vez.
+
+Guardar un monitoreo, validar sus valores y sembrar las preguntas necesitan
+saber qué columnas tiene una tabla. En lugar de un SHOW COLUMNS por operación,
+las columnas de todas las tablas conocidas se leen con una única consulta a
+information_schema y se guardan en el proceso hasta que se invalidan (tras un
+cambio de estructura) o cambia la versión del esquema.
+"""
+import os
+import re
+import logging
+import threading
+from decimal import Decimal, InvalidOperation
+from collections import namedtuple
+
+# ================= CONFIGURACIÓN =================
+# Cambiar ESQUEMA_VERSION (p. ej. al desplegar una migración) descarta lo cargado
+ESQUEMA_VERSION = os.getenv('ESQUEMA_VERSION', '1')
+TABLAS = ('apiarios', 'colmenas', 'monitoreos', 'config_preguntas')
+
+Columna = namedtuple('Columna', 'nombre tipo tipo_columna nula valores posicion')
+
+_TIPOS_ENTEROS = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'}
+_TIPOS_DECIMALES = {'decimal', 'numeric', 'float', 'double'}
+_VALOR_ENUM = re.compile(r"'((?:[^']|'')*)'")
+_ER_DUP_FIELDNAME = 1060     # errorcode.ER_DUP_FIELDNAME de MySQL
+
+
+def valores_enum(tipo_columna):
+    """Valores de un tipo "enum('a','b')" en su orden de declaración"""
+    if not tipo_columna.lower().startswith(('enum', 'set')):
+        return None
+    return tuple(v.replace("''", "'") for v in _VALOR_ENUM.findall(tipo_columna))
+
+
+class EsquemaTabla:
+    """Columnas de una tabla en su orden de creación"""
+
+    def __init__(self, nombre, columnas):
+        self.nombre = nombre
+        self.columnas = {c.nombre: c for c in sorted(columnas, key=lambda c: c.posicion)}
+        # Los ENUM de MySQL comparan sin distinguir mayúsculas
+        self._enum = {c.nombre: {v.lower(): v for v in c.valores} for c in columnas if c.valores}
+
+    def __contains__(self, columna):
+        return columna in self.columnas
+
+    def __iter__(self):
+        return iter(self.columnas.values())
+
+    def valido(self, columna, valor):
+        """Indica si el valor cabe en la columna (ENUM, entero o decimal)"""
+        definicion = self.columnas.get(columna)
+        if definicion is None:
+            return False
+        if valor is None:
+            return definicion.nula
+        if columna in self._enum:
+            return str(valor).lower() in self._enum[columna]
+        if definicion.tipo in _TIPOS_ENTEROS:
+            try:
+                return Decimal(str(valor)) == int(Decimal(str(valor)))
+            except (InvalidOperation, ValueError):
+                return False
+        if definicion.tipo in _TIPOS_DECIMALES:
+            try:
+                Decimal(str(valor))
+                return True
+            except InvalidOperation:
+                return False
+        return True
+
+    def admite_decimales(self, columna):
+        """Indica si la columna es DECIMAL/FLOAT (las enteras rechazan 3,5)"""
+        definicion = self.columnas.get(columna)
+        return definicion is not None and definicion.tipo in _TIPOS_DECIMALES
+
+    def normalizar(self, columna, valor):
+        """Valor con la grafía exacta del ENUM ("alta" -> "Alta")"""
+        if columna in self._enum and valor is not None:
+            return self._enum[columna].get(str(valor).lower(), valor)
+        return valor
+
+    def filtrar(self, datos, excluir=()):
+        """Columnas y valores de datos que existen en la tabla y son válidos.
+
+        Devuelve (columnas, valores, descartadas); las claves que no son
+        columnas se ignoran y las que no validan se devuelven en descartadas.
+        """
+        columnas, valores, descartadas = [], [], []
+        for clave, valor in datos.items():
+            if clave in excluir or clave not in self.columnas or valor is None:
+                continue
+            if not self.valido(clave, valor):
+                descartadas.append(clave)
+                continue
+            columnas.append(clave)
+            valores.append(self.normalizar(clave, valor))
+        return columnas, valores, descartadas
+
+
+_lock = threading.Lock()
+_tablas = {}
+_version = None
+
+
+def _cargar(conn, tablas):
+    """Una sola consulta a information_schema para todas las tablas pedidas"""
+    marcas = ', '.join(['%s'] * len(tablas))
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+        SELECT TABLE_NAME, COLUMN_NAME, DATA_TYPE, COLUMN_TYPE, IS_NULLABLE, ORDINAL_POSITION
+        FROM information_schema.COLUMNS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({marcas})
+        """, tuple(tablas))
+        filas = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    columnas = {}
+    for tabla, nombre, tipo, tipo_columna, nula, posicion in filas:
+        tipo_columna = tipo_columna.decode() if isinstance(tipo_columna, (bytes, bytearray)) else tipo_columna
+        columnas.setdefault(tabla, []).append(Columna(
+            nombre, tipo.lower(), tipo_columna, nula == 'YES', valores_enum(tipo_columna), posicion
+        ))
+    return {tabla: EsquemaTabla(tabla, cols) for tabla, cols in columnas.items()}
+
+
+def esquema(conn, tabla):
+    """Esquema de una tabla; la primera vez carga todas las tablas conocidas con conn"""
+    global _version
+    with _lock:
+        if _version != ESQUEMA_VERSION:
+            _tablas.clear()
+            _version = ESQUEMA_VERSION
+        if tabla in _tablas:
+            return _tablas[tabla]
+    tablas = set(TABLAS) | {tabla}
+    cargadas = _cargar(conn, sorted(tablas))
+    logging.info(f"Esquema cargado: {', '.join(sorted(cargadas))}")
+    with _lock:
+        _tablas.update(cargadas)
+        return _tablas.get(tabla)
+
+
+def asegurar_columnas(conn, tabla, columnas):
+    """Añade a una tabla existente las columnas que le falten.
+
+    columnas es {nombre: definición SQL}; devuelve los nombres añadidos. Es DDL:
+    confirma la transacción en curso, así que se llama fuera de ellas.
+    """
+    actual = esquema(conn, tabla)
+    if actual is None:
+        return []
+    anadidas = []
+    cursor = conn.cursor()
+    try:
+        for nombre, definicion in columnas.items():
+            if nombre in actual:
+                continue
+            try:
+                cursor.execute(f"ALTER TABLE {tabla} ADD COLUMN {nombre} {definicion}")
+                anadidas.append(nombre)
+            except Exception as err:
+                # Otro proceso pudo añadirla a la vez (ER_DUP_FIELDNAME)
+                if getattr(err, 'errno', None) != _ER_DUP_FIELDNAME:
+                    raise
+    finally:
+        cursor.close()
+    if anadidas:
+        logging.info(f"Columnas añadidas a {tabla}: {', '.join(anadidas)}")
+        invalidar_esquema(tabla)
+    return anadidas
+
+
+def invalidar_esquema(tabla=None):
+    """Descarta el esquema en memoria (tras un CREATE/ALTER) para releerlo al siguiente uso"""
+    with _lock:
+        if tabla is None:
+            _tablas.clear()
+        else:
+            _tablas.pop(tabla, None)
@@ -0,0 +1,236 @@
+# historial.py
+"""Historial de monitoreos: una fila por inspección, solo se añaden filas.
+
+La tabla colmenas queda como registro de colmenas (una fila por colmena) y
+cada inspección se guarda en monitoreos con su colmena y su fecha, sin claves
+únicas que choquen entre una semana y la siguiente. Los índices compuestos
+(colmena, fecha) y (apiario, fecha) resuelven "último monitoreo de cada
+colmena" y los rangos de fechas sin recorrer el historial completo.
+
+Las funciones reciben una conexión abierta para servir igual al modelo (con
+el pool) y a la CLI (con su conexión directa).
+"""
+import logging
+from datetime import datetime
+
+from esquema import esquema
+from indice_nombres import colmena_agregada
+
+# ================= CONFIGURACIÓN =================
+LIMITE_CONSULTA = 500        # Filas máximas por consulta de historial
+
+COLUMNAS_RESPUESTA = (
+    'actividad_piqueras', 'poblacion_abejas', 'cuadros_alimento', 'cuadros_cria',
+    'estado_colmena', 'estado_sanitario', 'limpieza_arveneses', 'estado_postura',
+    'distribucion_postura', 'almacenamiento_alimento', 'tiene_camara_produccion',
+    'tipo_camara_produccion', 'numero_cuadros_produccion', 'cuadros_estampados',
+    'cuadros_estirados', 'cuadros_llenado', 'cuadros_operculados', 'porcentaje_operculo',
+    'cuadros_cosecha', 'kilos_cosecha', 'observaciones',
+)
+
+CREAR_MONITOREOS = """
+CREATE TABLE IF NOT EXISTS monitoreos (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    id_colmena INT NOT NULL,
+    id_apiario INT NOT NULL,
+    fecha_monitoreo DATETIME(3) NOT NULL DEFAULT CURRENT_TIMESTAMP(3),
+
+    actividad_piqueras ENUM('Baja', 'Media', 'Alta') DEFAULT NULL,
+    poblacion_abejas ENUM('Baja', 'Media', 'Alta') DEFAULT NULL,
+    cuadros_alimento INT DEFAULT NULL,
+    cuadros_cria INT DEFAULT NULL,
+
+    estado_colmena ENUM(
+        'Cámara de cría',
+        'Cámara de cría y producción',
+        'Cámara de cría y doble alza de producción'
+    ) DEFAULT NULL,
+
+    estado_sanitario ENUM(
+        'Presencia barroa',
+        'Presencia de polilla',
+        'Presencia de curruncho',
+        'Mortalidad- malformación en nodrizas',
+        'Ninguno'
+    ) DEFAULT NULL,
+
+    limpieza_arveneses ENUM('Si', 'No') DEFAULT NULL,
+    estado_postura ENUM('Huevo', 'Larva y pupa', 'Mortalidad', 'Zanganeras') DEFAULT NULL,
+    distribucion_postura ENUM('No hay postura', 'dispersa', 'uniforme') DEFAULT NULL,
+
+    almacenamiento_alimento ENUM(
+        'Existe pan de abeja',
+        'Almacenamiento de néctar',
+        'Bajo almacenamiento'
+    ) DEFAULT NULL,
+
+    tiene_camara_produccion ENUM('Si', 'No') DEFAULT NULL,
+    tipo_camara_produccion ENUM('Media alza', 'Alza profunda', 'No aplica') DEFAULT NULL,
+
+    numero_cuadros_produccion INT DEFAULT NULL,
+    cuadros_estampados INT DEFAULT NULL,
+    cuadros_estirados INT DEFAULT NULL,
+    cuadros_llenado INT DEFAULT NULL,
+    cuadros_operculados INT DEFAULT NULL,
+    porcentaje_operculo VARCHAR(20) DEFAULT NULL,
+    cuadros_cosecha INT DEFAULT NULL,
+    kilos_cosecha DECIMAL(5,2) DEFAULT NULL,
+
+    observaciones TEXT DEFAULT NULL,
+
+    -- Último monitoreo por colmena e historial de una colmena
+    KEY idx_colmena_fecha (id_colmena, fecha_monitoreo),
+    -- Rangos de fechas de un apiario
+    KEY idx_apiario_fecha (id_apiario, fecha_monitoreo),
+    FOREIGN KEY (id_colmena) REFERENCES colmenas(id),
+    FOREIGN KEY (id_apiario) REFERENCES apiarios(id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+"""
+
+_SELECT = """
+SELECT m.*, c.numero_colmena
+FROM monitoreos m
+JOIN colmenas c ON c.id = m.id_colmena
+"""
+
+
+def crear_tabla_monitoreos(cursor):
+    """Crea la tabla de historial y, la primera vez, copia los monitoreos guardados en colmenas"""
+    cursor.execute(CREAR_MONITOREOS)
+    cursor.execute("SELECT COUNT(*) FROM monitoreos")
+    if cursor.fetchone()[0]:
+        return
+    columnas = ', '.join(COLUMNAS_RESPUESTA)
+    # Solo las filas de colmenas que llevan alguna respuesta son monitoreos
+    cursor.execute(f"""
+    INSERT INTO monitoreos (id_colmena, id_apiario, fecha_monitoreo, {columnas})
+    SELECT id, id_apiario, COALESCE(fecha_registro, CURRENT_TIMESTAMP(3)), {columnas}
+    FROM colmenas
+    WHERE COALESCE({columnas}) IS NOT NULL
+    """)
+    if cursor.rowcount:
+        logging.info(f"Copiados {cursor.rowcount} monitoreos de colmenas al historial")
+
+
+def _fecha(valor):
+    """Fecha de la inspección (las sincronizadas traen la suya); ahora si no hay"""
+    if isinstance(valor, datetime):
+        return valor
+    if valor:
+        try:
+            return datetime.fromisoformat(str(valor))
+        except ValueError:
+            logging.warning(f"Fecha de monitoreo no válida: {valor}")
+    return datetime.now()
+
+
+def _iso(valor):
+    return valor if isinstance(valor, datetime) else datetime.fromisoformat(str(valor))
+
+
+def _id_colmena(cursor, numero_colmena, id_apiario):
+    """Id de la colmena del registro; se da de alta si aún no existe"""
+    cursor.execute(
+        "SELECT MIN(id) FROM colmenas WHERE numero_colmena = %s AND id_apiario = %s",
+        (numero_colmena, id_apiario)
+    )
+    fila = cursor.fetchone()
+    if fila and fila[0] is not None:
+        return fila[0], False
+    cursor.execute(
+        "INSERT INTO colmenas (numero_colmena, id_apiario) VALUES (%s, %s)",
+        (numero_colmena, id_apiario)
+    )
+    return cursor.lastrowid, True
+
+
+def registrar_monitoreo(conn, respuestas):
+    """Añade una inspección al historial (sin confirmar la transacción).
+
+    Acepta las respuestas sueltas o anidadas en 'respuestas' (flujo de voz de
+    la API). Devuelve (id del monitoreo, columnas descartadas por no válidas).
+    """
+    datos = dict(respuestas)
+    datos.update(respuestas.get('respuestas') or {})
+
+    tabla = esquema(conn, 'monitoreos')
+    if tabla is None:
+        raise RuntimeError("La tabla monitoreos no existe")
+
+    cursor = conn.cursor()
+    try:
+        id_colmena, nueva = _id_colmena(cursor, datos['colmena'], datos['id_apiario'])
+        columnas, valores, descartadas = tabla.filtrar(
+            {k: v for k, v in datos.items() if k in COLUMNAS_RESPUESTA}
+        )
+        columnas = ['id_colmena', 'id_apiario', 'fecha_monitoreo'] + columnas
+        valores = [id_colmena, datos['id_apiario'], _fecha(datos.get('fecha'))] + valores
+
+        marcas = ', '.join(['%s'] * len(valores))
+        cursor.execute(f"INSERT INTO monitoreos ({', '.join(columnas)}) VALUES ({marcas})", valores)
+        id_monitoreo = cursor.lastrowid
+    finally:
+        cursor.close()
+
+    if nueva:
+        colmena_agregada(datos['id_apiario'], {'id': id_colmena, 'numero_colmena': datos['colmena']})
+    return id_monitoreo, descartadas
+
+
+def consultar_monitoreos(conn, id_colmena=None, id_apiario=None, desde=None, hasta=None, limite=LIMITE_CONSULTA):
+    """Monitoreos más recientes primero, filtrados por colmena, apiario y rango de fechas.
+
+    desde y hasta son datetime o texto ISO (ValueError si no lo son); hasta es exclusivo.
+    """
+    condiciones, parametros = [], []
+    if id_colmena is not None:
+        condiciones.append("m.id_colmena = %s")
+        parametros.append(id_colmena)
+    if id_apiario is not None:
+        condiciones.append("m.id_apiario = %s")
+        parametros.append(id_apiario)
+    if desde is not None:
+        condiciones.append("m.fecha_monitoreo >= %s")
+        parametros.append(_iso(desde))
+    if hasta is not None:
+        condiciones.append("m.fecha_monitoreo < %s")
+        parametros.append(_iso(hasta))
+
+    donde = f"WHERE {' AND '.join(condiciones)}" if condiciones else ""
+    parametros.append(min(int(limite), LIMITE_CONSULTA))
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"{_SELECT} {donde} ORDER BY m.fecha_monitoreo DESC, m.id DESC LIMIT %s", parametros)
+        return cursor.fetchall()
+    finally:
+        cursor.close()
+
+
+def obtener_monitoreo(conn, id_monitoreo):
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute(f"{_SELECT} WHERE m.id = %s", (id_monitoreo,))
+        return cursor.fetchone() or {}
+    finally:
+        cursor.close()
+
+
+def ultimos_por_colmena(conn, id_apiario):
+    """Último monitoreo de cada colmena de un apiario (una búsqueda en el índice por colmena)"""
+    cursor = conn.cursor(dictionary=True)
+    try:
+        cursor.execute("""
+        SELECT m.*, c.numero_colmena
+        FROM colmenas c
+        JOIN monitoreos m ON m.id = (
+            SELECT u.id FROM monitoreos u
+            WHERE u.id_colmena = c.id
+            ORDER BY u.fecha_monitoreo DESC, u.id DESC
+            LIMIT 1
+        )
+        WHERE c.id_apiario = %s
+        ORDER BY c.numero_colmena
+        """, (id_apiario,))
+        return cursor.fetchall()
+    finally:
+        cursor.close()
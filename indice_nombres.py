@@ -0,0 +1,236 @@
+# indice_nombres.py
+"""Índice de nombres para reconocer apiarios, colmenas y opciones dichos en voz.
+
+Cada nombre se guarda por su clave fonética en español (b/v, c/s/z, ll/y,
+h muda...) y por los trigramas de esa clave. Una búsqueda solo puntúa las
+entradas que comparten trigramas con lo dicho, así que el coste no crece con
+el número total de nombres, y el índice se amplía entrada a entrada.
+"""
+import re
+import threading
+from collections import Counter
+from functools import lru_cache
+from fuzzywuzzy import fuzz
+
+from numeros_es import normalizar, palabras_a_numero
+
+# ================= CONFIGURACIÓN =================
+UMBRAL_COINCIDENCIA = 70     # Puntuación mínima (0-100) para aceptar un candidato
+CANDIDATOS_MAX = 20          # Entradas con más trigramas en común que se puntúan
+TAMANO_NGRAMA = 3
+
+_REGLAS_FONETICAS = [
+    (re.compile(r'ch'), 'X'),
+    (re.compile(r'll'), 'y'),
+    (re.compile(r'qu([ei])'), r'k\1'),
+    (re.compile(r'gu([ei])'), r'g\1'),
+    (re.compile(r'g([ei])'), r'j\1'),
+    (re.compile(r'c([ei])'), r's\1'),
+    (re.compile(r'c'), 'k'),
+    (re.compile(r'z'), 's'),
+    (re.compile(r'[vw]'), 'b'),
+    (re.compile(r'x'), 'ks'),
+    (re.compile(r'ñ'), 'ni'),
+    (re.compile(r'h'), ''),
+    (re.compile(r'y\b'), 'i'),
+    (re.compile(r'(.)\1+'), r'\1'),
+]
+
+
+def clave_fonetica(texto):
+    """Clave que iguala las grafías que suenan igual en español"""
+    clave = normalizar(texto).replace(',', ' ').replace('.', ' ')
+    for patron, reemplazo in _REGLAS_FONETICAS:
+        clave = patron.sub(reemplazo, clave)
+    return ' '.join(clave.split())
+
+
+def ngramas(clave, n=TAMANO_NGRAMA):
+    relleno = f" {clave} "
+    return {relleno[i:i + n] for i in range(max(1, len(relleno) - n + 1))}
+
+
+class IndiceNombres:
+    """Nombres indexados por clave fonética y trigramas"""
+
+    def __init__(self, umbral=UMBRAL_COINCIDENCIA):
+        self.umbral = umbral
+        self._entradas = {}      # identificador -> (valor, clave, palabras)
+        self._exactas = {}       # clave -> identificador
+        self._ngramas = {}       # trigrama -> identificadores
+        self._lock = threading.Lock()
+
+    @classmethod
+    def desde(cls, filas, texto, identificador=None, **kwargs):
+        """Construye el índice de una lista de filas (apiarios, opciones...)"""
+        indice = cls(**kwargs)
+        for i, fila in enumerate(filas):
+            indice.agregar(fila, texto(fila), identificador(fila) if identificador else i)
+        return indice
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def agregar(self, valor, texto, identificador=None):
+        """Añade o reemplaza una entrada sin reconstruir el resto del índice"""
+        identificador = texto if identificador is None else identificador
+        clave = clave_fonetica(texto)
+        with self._lock:
+            self._quitar(identificador)
+            self._entradas[identificador] = (valor, clave, len(clave.split()))
+            self._exactas[clave] = identificador
+            for grama in ngramas(clave):
+                self._ngramas.setdefault(grama, set()).add(identificador)
+
+    def valor(self, identificador):
+        entrada = self._entradas.get(identificador)
+        return entrada[0] if entrada else None
+
+    def quitar(self, identificador):
+        with self._lock:
+            self._quitar(identificador)
+
+    def _quitar(self, identificador):
+        entrada = self._entradas.pop(identificador, None)
+        if entrada is None:
+            return
+        clave = entrada[1]
+        if self._exactas.get(clave) == identificador:
+            del self._exactas[clave]
+        for grama in ngramas(clave):
+            grupo = self._ngramas.get(grama)
+            if grupo:
+                grupo.discard(identificador)
+                if not grupo:
+                    del self._ngramas[grama]
+
+    def buscar(self, consulta, limite=1):
+        """Mejores entradas para lo dicho como [(valor, puntuacion)], de mayor a menor"""
+        clave = clave_fonetica(consulta or "")
+        if not clave:
+            return []
+        with self._lock:
+            exacta = self._exactas.get(clave)
+            if exacta is not None:
+                return [(self._entradas[exacta][0], 100)]
+
+            comunes = Counter()
+            for grama in ngramas(clave):
+                comunes.update(self._ngramas.get(grama, ()))
+            candidatos = [(i, self._entradas[i]) for i, _ in comunes.most_common(CANDIDATOS_MAX)]
+
+        palabras = clave.split()
+        puntuados = []
+        for _, (valor, clave_entrada, n_palabras) in candidatos:
+            # Se compara con el tramo de lo dicho que tiene tantas palabras como el nombre
+            tramos = [' '.join(palabras[i:i + n_palabras]) for i in range(max(1, len(palabras) - n_palabras + 1))]
+            puntuacion = max(fuzz.ratio(tramo, clave_entrada) for tramo in tramos)
+            puntuados.append((puntuacion, len(clave_entrada), valor))
+        # A igual puntuación gana el nombre más largo ("no presente" frente a "presente")
+        puntuados.sort(key=lambda p: (p[0], p[1]), reverse=True)
+        return [(valor, puntuacion) for puntuacion, _, valor in puntuados[:limite]]
+
+    def mejor(self, consulta):
+        """Entrada más parecida si supera el umbral; None en otro caso"""
+        resultado = self.buscar(consulta)
+        if resultado and resultado[0][1] >= self.umbral:
+            return resultado[0][0]
+        return None
+
+
+class IndiceColmenas:
+    """Colmenas de un apiario por número, reconocido con la gramática de números"""
+
+    def __init__(self, colmenas=()):
+        self._por_numero = {}
+        for colmena in colmenas:
+            self.agregar(colmena)
+
+    def agregar(self, colmena):
+        self._por_numero[int(colmena['numero_colmena'])] = colmena
+
+    def __len__(self):
+        return len(self._por_numero)
+
+    def numeros(self):
+        return sorted(self._por_numero)
+
+    def mejor(self, consulta):
+        numero = palabras_a_numero(consulta)
+        if isinstance(numero, float) and numero.is_integer():
+            numero = int(numero)
+        return self._por_numero.get(numero)
+
+
+@lru_cache(maxsize=256)
+def indice_opciones(opciones):
+    """Índice de las opciones de una pregunta (tupla), construido una vez por lista de opciones"""
+    return IndiceNombres.desde(opciones, lambda o: o)
+
+
+# ================= ÍNDICES COMPARTIDOS =================
+_lock = threading.Lock()
+_apiarios = None
+_colmenas = {}
+
+
+def indice_apiarios(cargar=None):
+    """Índice de apiarios del proceso; se construye con cargar() la primera vez"""
+    global _apiarios
+    with _lock:
+        if _apiarios is None and cargar is not None:
+            filas = cargar()
+            if filas is not None:
+                _apiarios = IndiceNombres.desde(filas, lambda a: a['nombre'], lambda a: a['id'])
+        return _apiarios
+
+
+def indice_colmenas(id_apiario, cargar=None):
+    """Índice de colmenas de un apiario; se construye con cargar() la primera vez"""
+    with _lock:
+        if id_apiario not in _colmenas and cargar is not None:
+            filas = cargar()
+            if filas is not None:
+                _colmenas[id_apiario] = IndiceColmenas(filas)
+        return _colmenas.get(id_apiario)
+
+
+def apiario_agregado(apiario):
+    """Añade un apiario nuevo a un índice ya construido"""
+    with _lock:
+        indice = _apiarios
+    if indice is not None:
+        indice.agregar(apiario, apiario['nombre'], apiario['id'])
+
+
+def apiario_modificado(apiario_id, nombre=None):
+    """Actualiza o retira un apiario del índice (nombre=None lo retira)"""
+    with _lock:
+        indice = _apiarios
+        if nombre is None:
+            _colmenas.pop(apiario_id, None)
+    if indice is None:
+        return
+    if nombre is None:
+        indice.quitar(apiario_id)
+    else:
+        apiario = dict(indice.valor(apiario_id) or {'id': apiario_id})
+        apiario['nombre'] = nombre
+        indice.agregar(apiario, nombre, apiario_id)
+
+
+def colmena_agregada(id_apiario, colmena):
+    """Añade una colmena nueva al índice de su apiario si ya estaba construido"""
+    with _lock:
+        indice = _colmenas.get(id_apiario)
+    if indice is not None:
+        indice.agregar(colmena)
+
+
+def invalidar_colmenas(id_apiario=None):
+    """Descarta los índices de colmenas (p. ej. tras borrar o renumerar una)"""
+    with _lock:
+        if id_apiario is None:
+            _colmenas.clear()
+        else:
+            _colmenas.pop(id_apiario, None)
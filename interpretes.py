@@ -0,0 +1,153 @@
+# interpretes.py
+"""Intérpretes de respuesta por pregunta, compilados una vez por versión de la configuración.
+
+Cada intérprete guarda ya preparados las opciones y sus sinónimos (en un
+índice fonético), el rango numérico y los textos que se dicen al usuario, de
+modo que la API, la CLI y Logica interpretan igual cada enunciado sin volver a
+procesar la pregunta.
+"""
+import json
+import hashlib
+import threading
+from collections import namedtuple
+
+from numeros_es import palabras_a_numero
+from indice_nombres import IndiceNombres
+
+# ================= CONFIGURACIÓN =================
+MINIMO_DEFECTO = 0
+MAXIMO_DEFECTO = 100
+
+Interpretacion = namedtuple('Interpretacion', 'valido valor mensaje')
+
+
+def version_config(preguntas):
+    """Huella estable del conjunto de preguntas; cambia con cualquier edición"""
+    datos = json.dumps(preguntas, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(datos.encode('utf-8')).hexdigest()[:16]
+
+
+class Interprete:
+    """Interpretación de las respuestas a una pregunta"""
+
+    def __init__(self, pregunta):
+        self.pregunta = pregunta
+        self.id = pregunta['id']
+        self.tipo = pregunta['tipo']
+        self.opciones = list(pregunta.get('opciones') or [])
+        self.minimo = pregunta.get('min', MINIMO_DEFECTO)
+        self.maximo = pregunta.get('max', MAXIMO_DEFECTO)
+        if self.minimo is None:
+            self.minimo = MINIMO_DEFECTO
+        if self.maximo is None:
+            self.maximo = MAXIMO_DEFECTO
+        # Solo las columnas DECIMAL admiten "tres coma cinco"; el resto son enteras
+        self.decimales = bool(pregunta.get('decimales'))
+
+        # Sinónimos opcionales en la configuración: {"Alta": ["fuerte", "mucha"]}
+        self.indice = IndiceNombres()
+        for opcion in self.opciones:
+            self.indice.agregar(opcion, opcion)
+            for sinonimo in (pregunta.get('sinonimos') or {}).get(opcion, []):
+                self.indice.agregar(opcion, sinonimo)
+
+        self.texto = self._texto()
+        if self.tipo == 'opcion':
+            opciones_numeradas = [f"{n+1} para {o}" for n, o in enumerate(self.opciones)]
+            self.mensaje_error = f"Opción no reconocida. Por favor diga el número de la opción: {', '.join(opciones_numeradas)}"
+        elif self.tipo == 'numero':
+            self.mensaje_error = "No entendí el número. Por favor responda con un valor numérico."
+            self.mensaje_rango = f"El valor debe estar entre {self.minimo} y {self.maximo}"
+        else:
+            self.mensaje_error = "No capté su respuesta. Por favor repita."
+
+    def _texto(self):
+        """Texto hablado de la pregunta con sus opciones o su rango"""
+        texto = self.pregunta['pregunta']
+        if self.tipo == 'opcion':
+            opciones_numeradas = [f"{n+1}. {o}" for n, o in enumerate(self.opciones)]
+            texto += f". Opciones: {', '.join(opciones_numeradas)}. Responda con el número de la opción."
+        elif self.tipo == 'numero':
+            texto += f". Responda con un número entre {self.minimo} y {self.maximo}"
+        return texto
+
+    def interpretar(self, respuesta):
+        """Valor de la respuesta, o el mensaje que hay que decir si no es válida"""
+        respuesta = (respuesta or "").strip().lower()
+        if not respuesta:
+            return Interpretacion(False, None, self.mensaje_error)
+
+        if self.tipo == 'opcion':
+            # Primero el número de la opción (1, 2, 3...), después el texto
+            numero = palabras_a_numero(respuesta)
+            if isinstance(numero, int) and 1 <= numero <= len(self.opciones):
+                return Interpretacion(True, self.opciones[numero - 1], "")
+            opcion = self.indice.mejor(respuesta)
+            if opcion is not None:
+                return Interpretacion(True, opcion, "")
+            return Interpretacion(False, None, self.mensaje_error)
+
+        if self.tipo == 'numero':
+            numero = palabras_a_numero(respuesta)
+            if numero is None:
+                return Interpretacion(False, None, self.mensaje_error)
+            if numero != int(numero):
+                if not self.decimales:
+                    return Interpretacion(False, None, self.mensaje_error)
+            else:
+                numero = int(numero)
+            if not self.minimo <= numero <= self.maximo:
+                return Interpretacion(False, numero, self.mensaje_rango)
+            return Interpretacion(True, numero, "")
+
+        return Interpretacion(True, respuesta, "")
+
+    def es_valida(self, respuesta):
+        return self.interpretar(respuesta).valido
+
+
+class ConjuntoInterpretes:
+    """Intérpretes de todas las preguntas de una versión de la configuración"""
+
+    def __init__(self, preguntas, version=None):
+        self.version = version or version_config(preguntas)
+        self.interpretes = {p['id']: Interprete(p) for p in preguntas}
+
+    def __getitem__(self, pregunta_id):
+        return self.interpretes[pregunta_id]
+
+    def get(self, pregunta_id):
+        return self.interpretes.get(pregunta_id)
+
+
+_lock = threading.Lock()
+_vigente = None
+
+
+def compilar(preguntas, version=None):
+    """Compila las preguntas si su versión cambió; devuelve el conjunto vigente.
+
+    version evita recalcular la huella cuando el llamador ya la tiene (el ETag de la caché).
+    """
+    global _vigente
+    version = version or version_config(preguntas)
+    with _lock:
+        if _vigente is None or _vigente.version != version:
+            _vigente = ConjuntoInterpretes(preguntas, version)
+        return _vigente
+
+
+def interprete(pregunta):
+    """Intérprete de una pregunta; reutiliza el compilado si la pregunta no ha cambiado"""
+    with _lock:
+        conjunto = _vigente
+    compilado = conjunto.get(pregunta['id']) if conjunto else None
+    if compilado is not None and compilado.pregunta == pregunta:
+        return compilado
+    # Pregunta fuera del conjunto vigente (p. ej. un caso del banco de pruebas)
+    return Interprete(pregunta)
+
+
+def texto_pregunta(pregunta):
+    """Texto hablado de una pregunta con sus opciones o su rango"""
+    return interprete(pregunta).texto
@@ -1,5 +1,4 @@
 import os
-import whisper
 import sounddevice as sd
 import numpy as np
 import pyttsx3
@@ -10,30 +9,34 @@ import re
 import warnings
 from mysql.connector import Error
 import json
-import pygame  # 👈 Reemplazamos winsound por pygame.mixer
 import threading
 from fuzzywuzzy import fuzz
 from pathlib import Path
 from modelo import DatabaseModel
+from captura import capturar_audio, capturar_con_interrupcion, SILENCIO_FINAL
+from preproceso import preparar_audio
+from modelos_asr import ModeloCompartido
+from transcriptor import transcribir, transcribir_escalonado, ESCALONADO
+from salida_voz import obtener_salida_voz
+from sesion_voz import medir
+from numeros_es import palabras_a_numero
+from interpretes import interprete
+import audio_duplex
 
 # Configuración inicial
 load_dotenv()
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
 
 # Inicialización de componentes de audio
-model = whisper.load_model("tiny")
-engine = pyttsx3.init()
-engine.setProperty('rate', 180)
-engine.setProperty('voice', 'spanish')
-
-# Inicializar pygame.mixer (requiere un archivo WAV para el pitido)
-pygame.mixer.init()
-BEEP_SOUND = pygame.mixer.Sound("beep.wav")  # 👈 Necesitas un archivo beep.wav
+# El modelo Whisper se carga al primer uso desde el registro compartido
+model = ModeloCompartido()
+# El motor de voz lo posee un único hilo de salida que reproduce en orden
+salida_voz = obtener_salida_voz()
 
 class Logica:
     # Variables de clase compartidas
     model = model
-    engine = engine
+    salida_voz = salida_voz
 
     @staticmethod
     def es_dispositivo_movil():
@@ -91,61 +94,8 @@ class Logica:
             print(f"Error al guardar temporalmente: {e}")
             return False
 
-    @staticmethod
-    def palabras_a_numero(texto):
-        """Convierte palabras de números en español a valores numéricos"""
-        if not texto:
-            return None
-            
-        texto = re.sub(r'[^a-zA-ZáéíóúüñÁÉÍÓÚÜÑ]', '', texto.lower()).strip()
-        
-        numeros = {
-            'cero': 0, 'sero': 0, 'xero': 0,
-            'uno': 1, 'un': 1, 'una': 1, 'primero': 1, 'primer': 1, 'úno': 1, 'ino': 1,
-            'dos': 2, 'segundo': 2, 'dós': 2, 'tres': 3, 'tercero': 3, 'tercer': 3, 'trés': 3,
-            'cuatro': 4, 'cuarto': 4, 'kuatro': 4, 'quatro': 4,
-            'cinco': 5, 'quinto': 5, 'sinko': 5, 'zinko': 5,
-            'seis': 6, 'sexto': 6, 'séis': 6, 'seyis': 6,
-            'siete': 7, 'séptimo': 7, 'síete': 7, 'ciete': 7,
-            'ocho': 8, 'octavo': 8, 'ócho': 8, 'otcho': 8,
-            'nueve': 9, 'noveno': 9, 'nuéve': 9, 'nuebe': 9,
-            'diez': 10, 'décimo': 10, 'diéz': 10, 'dies': 10,
-            'once': 11, 'undécimo': 11, 'ónce': 11, 'onse': 11,
-            'doce': 12, 'duodécimo': 12, 'dóce': 12, 'dose': 12,
-            'trece': 13, 'tréce': 13, 'trese': 13,
-            'catorce': 14, 'katorce': 14,
-            'quince': 15, 'kinse': 15,
-            'dieciseis': 16, 'dieciséis': 16, 'diez y seis': 16,
-            'diecisiete': 17, 'diez y siete': 17,
-            'dieciocho': 18, 'diez y ocho': 18,
-            'diecinueve': 19, 'diez y nueve': 19,
-            'veinte': 20, 'veintiuno': 21, 'veintiún': 21, 'veintiuna': 21,
-            'veintidós': 22, 'veintitrés': 23, 'veinticuatro': 24,
-            'veinticinco': 25, 'veintiséis': 26, 'veintisiete': 27,
-            'veintiocho': 28, 'veintinueve': 29,
-            'treinta': 30, 'cuarenta': 40, 'cincuenta': 50,
-            'sesenta': 60, 'setenta': 70, 'ochenta': 80,
-            'noventa': 90, 'cien': 100, 'ciento': 100,
-            'doscientos': 200, 'trescientos': 300, 'cuatrocientos': 400,
-            'quinientos': 500, 'seiscientos': 600, 'setecientos': 700,
-            'ochocientos': 800, 'novecientos': 900, 'mil': 1000
-        }
-        
-        if texto in numeros:
-            return numeros[texto]
-        
-        for palabra, num in numeros.items():
-            if fuzz.ratio(texto, palabra) > 80:
-                return num
-        
-        if 'y' in texto:
-            partes = [p.strip() for p in texto.split('y')]
-            if len(partes) == 2:
-                num1 = numeros.get(partes[0], 0)
-                num2 = numeros.get(partes[1], 0)
-                return num1 + num2
-        
-        return None
+    # Gramática de números compartida con la CLI y la API
+    palabras_a_numero = staticmethod(palabras_a_numero)
 
     @staticmethod
     def confirmacion_reconocida(respuesta, palabra_clave):
@@ -177,58 +127,18 @@ class Logica:
     @staticmethod
     def procesar_respuesta_pregunta(pregunta, respuesta, intentos, respuestas):
         """Procesa la respuesta a una pregunta específica"""
-        pregunta_respondida = False
-        
-        if pregunta['tipo'] == 'opcion':
-            respuesta = respuesta.lower()
-            
-            # Primero intentar reconocer números (1, 2, 3...)
-            numero_opcion = None
-            try:
-                numero_opcion = int(respuesta)
-            except ValueError:
-                numero_opcion = Logica.palabras_a_numero(respuesta)
-            
-            if numero_opcion is not None and 1 <= numero_opcion <= len(pregunta['opciones']):
-                respuestas[pregunta['id']] = pregunta['opciones'][numero_opcion-1]
-                pregunta_respondida = True
-            else:
-                # Búsqueda por texto como respaldo
-                opciones = [o.lower() for o in pregunta['opciones']]
-                for i, op in enumerate(opciones):
-                    if op in respuesta or any(palabra in op for palabra in respuesta.split()):
-                        respuestas[pregunta['id']] = pregunta['opciones'][i]
-                        pregunta_respondida = True
-                        break
-            
-            if not pregunta_respondida and intentos < 2:
-                opciones_numeradas = [f"{n+1} para {o}" for n, o in enumerate(pregunta['opciones'])]
-                return False, f"Opción no reconocida. Por favor diga el número de la opción: {', '.join(opciones_numeradas)}"
-                
-        elif pregunta['tipo'] == 'numero':
-            try:
-                num = int(respuesta)
-                min_val = pregunta.get('min', 0)
-                max_val = pregunta.get('max', 100)
-                if min_val <= num <= max_val:
-                    respuestas[pregunta['id']] = num
-                    pregunta_respondida = True
-                else:
-                    if intentos < 2:
-                        return False, f"El valor debe estar entre {min_val} y {max_val}"
-            except ValueError:
-                num = Logica.palabras_a_numero(respuesta)
-                if num is not None and pregunta.get('min', 0) <= num <= pregunta.get('max', 100):
-                    respuestas[pregunta['id']] = num
-                    pregunta_respondida = True
-                else:
-                    if intentos < 2:
-                        return False, "No entendí el número. Por favor responda con un valor numérico."
-        else:  # Tipo texto
-            respuestas[pregunta['id']] = respuesta
-            pregunta_respondida = True
-        
-        return pregunta_respondida, ""
+        resultado = interprete(pregunta).interpretar(respuesta)
+        if resultado.valido:
+            respuestas[pregunta['id']] = resultado.valor
+            return True, ""
+        return False, resultado.mensaje if intentos < 2 else ""
+
+    @staticmethod
+    def validador_respuesta(pregunta):
+        """Función que indica si un texto es una respuesta válida para la pregunta"""
+        if not pregunta or pregunta['tipo'] not in ('opcion', 'numero'):
+            return None
+        return interprete(pregunta).es_valida
 
     @staticmethod
     def sincronizar_monitoreos_pendientes():
@@ -264,37 +174,40 @@ class Logica:
 
     @staticmethod
     def emitir_pitido(frecuencia=1000, duracion=200):
-        """Emite un pitido usando pygame.mixer en lugar de winsound"""
-        BEEP_SOUND.play()
+        """Emite el pitido por el stream de audio compartido, sin bloquear"""
+        audio_duplex.emitir_pitido(frecuencia, duracion)
 
     @staticmethod
-    def escuchar(duracion=3):
-        """Función para capturar audio y transcribirlo"""
+    def escuchar(duracion=3, pregunta=None, silencio_final=SILENCIO_FINAL):
+        """Captura un enunciado (duracion es el tope máximo) y lo transcribe.
+
+        Si se indica la pregunta, la decodificación se orienta a sus respuestas válidas.
+        """
         try:
-            samplerate = 16000
-            
-            threading.Thread(target=Logica.emitir_pitido).start()
-            
-            print("\n[ESCUCHANDO...]")
-            audio = sd.rec(
-                int(duracion * samplerate),
-                samplerate=samplerate,
-                channels=1,
-                dtype='float32'
-            )
-            
-            sd.wait()
-            
-            audio_np = audio.flatten()
-            audio_np = audio_np / np.max(np.abs(audio_np))
-            
-            result = Logica.model.transcribe(
-                audio_np.astype(np.float32),
-                language="es",
-                temperature=0.0,
-                best_of=1,
-                beam_size=2
-            )
+            # Con barge-in la respuesta puede empezar mientras suena el mensaje
+            with medir("captura", barge_in=True):
+                audio_np = capturar_con_interrupcion(Logica.salida_voz, duracion, silencio_final)
+            if audio_np is None:
+                # No se graba mientras suena un mensaje del asistente
+                with medir("tts"):
+                    Logica.salida_voz.esperar()
+                with medir("pitido"):
+                    Logica.emitir_pitido()
+                
+                print("\n[ESCUCHANDO...]")
+                with medir("captura"):
+                    audio_np = capturar_audio(duracion, silencio_final)
+            
+            with medir("asr"):
+                # Las capturas sin voz se descartan aquí sin pasar por el modelo
+                audio_np = preparar_audio(audio_np)
+                if audio_np is None:
+                    return None
+                
+                if ESCALONADO:
+                    result = transcribir_escalonado(audio_np, pregunta, Logica.validador_respuesta(pregunta))
+                else:
+                    result = transcribir(Logica.model, audio_np, pregunta)
             
             texto = result["text"].strip()
             if texto:
@@ -307,11 +220,18 @@ class Logica:
             return None
 
     @staticmethod
-    def hablar(texto):
-        """Función para sintetizar voz"""
+    def hablar(texto, etiqueta=None, esperar=False, cachear=True):
+        """Encola un mensaje de voz; solo bloquea si se pide esperar (cachear=False para errores)"""
         print(f"ASISTENTE: {texto}")
-        threading.Thread(target=Logica.engine.say, args=(texto,)).start()
-        Logica.engine.runAndWait()
+        with medir("tts"):
+            return Logica.salida_voz.decir(texto, etiqueta=etiqueta, esperar=esperar, cachear=cachear)
+
+    @staticmethod
+    def hablar_segmentos(segmentos, etiqueta=None, esperar=False):
+        """Encola un mensaje dinámico montado con segmentos en caché"""
+        print(f"ASISTENTE: {' '.join(segmentos)}")
+        with medir("tts"):
+            return Logica.salida_voz.decir(segmentos=segmentos, etiqueta=etiqueta, esperar=esperar)
 
 if _name_ == "_main_":
     # Ejemplo de uso
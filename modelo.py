@@ -5,9 +5,14 @@ from datetime import datetime
 from dotenv import load_dotenv
 import re
 import json
-from mysql.connector import Error, pooling
+from mysql.connector import Error, errorcode
 from pathlib import Path
 import logging
+from indice_nombres import apiario_agregado, apiario_modificado, colmena_agregada
+from esquema import esquema, invalidar_esquema, asegurar_columnas
+from cache_preguntas import preguntas_modificadas
+import historial
+from pool_conexiones import PoolConexiones, PoolAgotado
 
 # Configuración inicial
 load_dotenv()
@@ -19,39 +24,105 @@ logging.basicConfig(
     filename='app.log'
 )
 
+# Clave de la pregunta -> columna de config_preguntas
+COLUMNAS_PREGUNTA = {
+    'pregunta': 'pregunta',
+    'tipo': 'tipo',
+    'obligatoria': 'obligatoria',
+    'orden': 'orden',
+    'min': 'min_val',
+    'max': 'max_val',
+    'opciones': 'opciones',
+    'depende_de': 'depende_de',
+    'activa': 'activa',
+    'alias': 'alias',
+    'sinonimos': 'sinonimos',
+}
+# Claves guardadas como JSON
+CLAVES_JSON_PREGUNTA = ('opciones', 'alias', 'sinonimos')
+
+# Columnas que las tablas de preguntas antiguas aún no tienen
+COLUMNAS_NUEVAS_PREGUNTA = {
+    'version': "INT NOT NULL DEFAULT 1",
+    # Palabras del dictado para la pregunta: ["población", "abejas"]
+    'alias': "JSON DEFAULT NULL",
+    # Sinónimos por opción: {"Alta": ["fuerte", "mucha"]}
+    'sinonimos': "JSON DEFAULT NULL",
+}
+
+# Valores de las claves que no se envían al crear o reemplazar una pregunta completa
+PREGUNTA_DEFECTO = {
+    'obligatoria': False,
+    'orden': 0,
+    'min': None,
+    'max': None,
+    'opciones': None,
+    'depende_de': None,
+    'activa': True,
+    'alias': None,
+    'sinonimos': None,
+}
+
+# If-Match: * -> la pregunta debe existir, en cualquier versión
+CUALQUIER_VERSION = '*'
+
+
+class PreguntaNoEncontrada(LookupError):
+    """La pregunta no existe"""
+
+
+class PreguntaDuplicada(Exception):
+    """Ya existe una pregunta con ese id"""
+
+
+class ConflictoVersion(Exception):
+    """La pregunta cambió desde que el cliente la leyó"""
+
+    def __init__(self, pregunta_id, actual):
+        super().__init__(f"La pregunta {pregunta_id} está en la versión {actual}")
+        self.actual = actual
+
+
 class DatabaseModel:
     # Configuración del pool de conexiones
     _connection_pool = None
+    # config_preguntas ya tiene la columna version y existe el sello de la configuración
+    _versionado = False
     
     @classmethod
     def initialize_pool(cls):
         """Inicializa el pool de conexiones a la base de datos"""
-        try:
-            cls._connection_pool = pooling.MySQLConnectionPool(
-                pool_name="beehive_pool",
-                pool_size=5,
-                host=os.getenv('DB_HOST'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASS'),
-                database=os.getenv('DB_NAME')
-            )
-            logging.info("Pool de conexiones inicializado correctamente")
-        except Error as err:
-            logging.error(f"Error al inicializar el pool de conexiones: {err}")
+        # Tamaño, espera máxima, ping y reciclado se configuran con DB_POOL_* (pool_conexiones.py)
+        cls._connection_pool = PoolConexiones(
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASS'),
+            database=os.getenv('DB_NAME')
+        )
+        logging.info(f"Pool de conexiones inicializado (tamaño {cls._connection_pool.tamano})")
 
     @classmethod
     def get_db_connection(cls):
-        """Obtiene una conexión del pool"""
+        """Obtiene una conexión del pool; si están todas ocupadas espera a que se libere una"""
         if cls._connection_pool is None:
             cls.initialize_pool()
         
         try:
-            conn = cls._connection_pool.get_connection()
-            return conn
+            return cls._connection_pool.obtener()
+        except PoolAgotado as err:
+            logging.error(f"Pool de conexiones agotado: {err}")
+            return None
         except Error as err:
             logging.error(f"Error al obtener conexión del pool: {err}")
             return None
 
+    @classmethod
+    def metricas_pool(cls):
+        """Conexiones en uso, histograma de esperas y duración de los préstamos"""
+        if cls._connection_pool is None:
+            return None
+        return cls._connection_pool.metricas()
+
     @staticmethod
     def verificar_tablas_colmenas():
         """Verifica y crea las tablas necesarias si no existen"""
@@ -60,114 +131,128 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para verificar tablas")
             return False
             
-        try:
-            cursor = conn.cursor()
+        with conn:
+            try:
+                cursor = conn.cursor()
             
-            # Crear tabla apiarios si no existe
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS apiarios (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                nombre VARCHAR(50) NOT NULL,
-                ubicacion VARCHAR(100),
-                fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                UNIQUE KEY unique_nombre (nombre)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
+                # Crear tabla apiarios si no existe
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS apiarios (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    nombre VARCHAR(50) NOT NULL,
+                    ubicacion VARCHAR(100),
+                    fecha_creacion TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    UNIQUE KEY unique_nombre (nombre)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """)
             
-            # Insertar datos iniciales si no existen
-            cursor.execute("SELECT COUNT(*) FROM apiarios")
-            if cursor.fetchone()[0] == 0:
-                cursor.executemany("""
-                INSERT INTO apiarios (nombre, ubicacion) VALUES (%s, %s)
-                """, [
-                    ('Norte', 'Zona norte de la finca'),
-                    ('Centro', 'Zona central de la finca'),
-                    ('Sur', 'Zona sur de la finca')
-                ])
-            
-            # Crear tabla colmenas con estructura mejorada
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS colmenas (
-                id INT AUTO_INCREMENT PRIMARY KEY,
-                numero_colmena INT NOT NULL,
-                id_apiario INT NOT NULL,
+                # Insertar datos iniciales si no existen
+                cursor.execute("SELECT COUNT(*) FROM apiarios")
+                if cursor.fetchone()[0] == 0:
+                    cursor.executemany("""
+                    INSERT INTO apiarios (nombre, ubicacion) VALUES (%s, %s)
+                    """, [
+                        ('Norte', 'Zona norte de la finca'),
+                        ('Centro', 'Zona central de la finca'),
+                        ('Sur', 'Zona sur de la finca')
+                    ])
+            
+                # Crear tabla colmenas con estructura mejorada
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS colmenas (
+                    id INT AUTO_INCREMENT PRIMARY KEY,
+                    numero_colmena INT NOT NULL,
+                    id_apiario INT NOT NULL,
                 
-                actividad_piqueras ENUM('Baja', 'Media', 'Alta') DEFAULT NULL,
-                poblacion_abejas ENUM('Baja', 'Media', 'Alta') DEFAULT NULL,
-                cuadros_alimento INT DEFAULT NULL,
-                cuadros_cria INT DEFAULT NULL,
+                    actividad_piqueras ENUM('Baja', 'Media', 'Alta') DEFAULT NULL,
+                    poblacion_abejas ENUM('Baja', 'Media', 'Alta') DEFAULT NULL,
+                    cuadros_alimento INT DEFAULT NULL,
+                    cuadros_cria INT DEFAULT NULL,
                 
-                estado_colmena ENUM(
-                    'Cámara de cría',
-                    'Cámara de cría y producción',
-                    'Cámara de cría y doble alza de producción'
-                ) DEFAULT NULL,
+                    estado_colmena ENUM(
+                        'Cámara de cría',
+                        'Cámara de cría y producción',
+                        'Cámara de cría y doble alza de producción'
+                    ) DEFAULT NULL,
                 
-                estado_sanitario ENUM(
-                    'Presencia barroa',
-                    'Presencia de polilla',
-                    'Presencia de curruncho',
-                    'Mortalidad- malformación en nodrizas',
-                    'Ninguno'
-                ) DEFAULT NULL,
+                    estado_sanitario ENUM(
+                        'Presencia barroa',
+                        'Presencia de polilla',
+                        'Presencia de curruncho',
+                        'Mortalidad- malformación en nodrizas',
+                        'Ninguno'
+                    ) DEFAULT NULL,
                 
-                limpieza_arveneses ENUM('Si', 'No') DEFAULT NULL,
-                estado_postura ENUM('Huevo', 'Larva y pupa', 'Mortalidad', 'Zanganeras') DEFAULT NULL,
-                distribucion_postura ENUM('No hay postura', 'dispersa', 'uniforme') DEFAULT NULL,
+                    limpieza_arveneses ENUM('Si', 'No') DEFAULT NULL,
+                    estado_postura ENUM('Huevo', 'Larva y pupa', 'Mortalidad', 'Zanganeras') DEFAULT NULL,
+                    distribucion_postura ENUM('No hay postura', 'dispersa', 'uniforme') DEFAULT NULL,
                 
-                almacenamiento_alimento ENUM(
-                    'Existe pan de abeja',
-                    'Almacenamiento de néctar',
-                    'Bajo almacenamiento'
-                ) DEFAULT NULL,
+                    almacenamiento_alimento ENUM(
+                        'Existe pan de abeja',
+                        'Almacenamiento de néctar',
+                        'Bajo almacenamiento'
+                    ) DEFAULT NULL,
                 
-                tiene_camara_produccion ENUM('Si', 'No') DEFAULT NULL,
-                tipo_camara_produccion ENUM('Media alza', 'Alza profunda', 'No aplica') DEFAULT NULL,
+                    tiene_camara_produccion ENUM('Si', 'No') DEFAULT NULL,
+                    tipo_camara_produccion ENUM('Media alza', 'Alza profunda', 'No aplica') DEFAULT NULL,
                 
-                numero_cuadros_produccion INT DEFAULT NULL,
-                cuadros_estampados INT DEFAULT NULL,
-                cuadros_estirados INT DEFAULT NULL,
-                cuadros_llenado INT DEFAULT NULL,
-                cuadros_operculados INT DEFAULT NULL,
-                porcentaje_operculo VARCHAR(20) DEFAULT NULL,
-                cuadros_cosecha INT DEFAULT NULL,
-                kilos_cosecha DECIMAL(5,2) DEFAULT NULL,
+                    numero_cuadros_produccion INT DEFAULT NULL,
+                    cuadros_estampados INT DEFAULT NULL,
+                    cuadros_estirados INT DEFAULT NULL,
+                    cuadros_llenado INT DEFAULT NULL,
+                    cuadros_operculados INT DEFAULT NULL,
+                    porcentaje_operculo VARCHAR(20) DEFAULT NULL,
+                    cuadros_cosecha INT DEFAULT NULL,
+                    kilos_cosecha DECIMAL(5,2) DEFAULT NULL,
                 
-                observaciones TEXT DEFAULT NULL,
-                fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    observaciones TEXT DEFAULT NULL,
+                    fecha_registro TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 
-                FOREIGN KEY (id_apiario) REFERENCES apiarios(id),
-                UNIQUE KEY unique_colmena_apiario (numero_colmena, id_apiario)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
+                    FOREIGN KEY (id_apiario) REFERENCES apiarios(id),
+                    UNIQUE KEY unique_colmena_apiario (numero_colmena, id_apiario)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """)
             
-            # Tabla de configuración de preguntas
-            cursor.execute("""
-            CREATE TABLE IF NOT EXISTS config_preguntas (
-                id VARCHAR(50) PRIMARY KEY,
-                pregunta TEXT NOT NULL,
-                tipo ENUM('numero', 'opcion', 'texto') NOT NULL,
-                obligatoria BOOLEAN DEFAULT FALSE,
-                orden INT NOT NULL,
-                min_val INT DEFAULT NULL,
-                max_val INT DEFAULT NULL,
-                opciones JSON DEFAULT NULL,
-                depende_de VARCHAR(50) DEFAULT NULL,
-                activa BOOLEAN DEFAULT TRUE,
-                FOREIGN KEY (depende_de) REFERENCES config_preguntas(id)
-            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
-            """)
+                # Historial de monitoreos: una fila por inspección
+                historial.crear_tabla_monitoreos(cursor)
             
-            conn.commit()
-            logging.info("Tablas verificadas/creadas correctamente")
-            return True
-        except Error as err:
-            conn.rollback()
-            logging.error(f"Error al verificar tablas: {err}")
-            return False
-        finally:
-            if conn.is_connected():
-                conn.close()
+                # Tabla de configuración de preguntas
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS config_preguntas (
+                    id VARCHAR(50) PRIMARY KEY,
+                    pregunta TEXT NOT NULL,
+                    tipo ENUM('numero', 'opcion', 'texto') NOT NULL,
+                    obligatoria BOOLEAN DEFAULT FALSE,
+                    orden INT NOT NULL,
+                    min_val INT DEFAULT NULL,
+                    max_val INT DEFAULT NULL,
+                    opciones JSON DEFAULT NULL,
+                    depende_de VARCHAR(50) DEFAULT NULL,
+                    activa BOOLEAN DEFAULT TRUE,
+                    version INT NOT NULL DEFAULT 1,
+                    alias JSON DEFAULT NULL,
+                    sinonimos JSON DEFAULT NULL,
+                    FOREIGN KEY (depende_de) REFERENCES config_preguntas(id)
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """)
+            
+                # Sello de versión de la configuración (lo sube cada escritura de preguntas)
+                cursor.execute("""
+                CREATE TABLE IF NOT EXISTS config_version (
+                    clave VARCHAR(50) PRIMARY KEY,
+                    version BIGINT NOT NULL DEFAULT 0
+                ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+                """)
+            
+                conn.commit()
+                # Las tablas pudieron crearse ahora: el esquema se relee al siguiente uso
+                invalidar_esquema()
+                logging.info("Tablas verificadas/creadas correctamente")
+                return True
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al verificar tablas: {err}")
+                return False
 
     @staticmethod
     def obtener_apiarios(activos=True):
@@ -177,17 +262,15 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para obtener apiarios")
             return None
             
-        try:
-            cursor = conn.cursor(dictionary=True)
-            query = "SELECT id, nombre, ubicacion FROM apiarios"
-            cursor.execute(query)
-            return cursor.fetchall()
-        except Error as err:
-            logging.error(f"Error al obtener apiarios: {err}")
-            return None
-        finally:
-            if conn.is_connected():
-                conn.close()
+        with conn:
+            try:
+                cursor = conn.cursor(dictionary=True)
+                query = "SELECT id, nombre, ubicacion FROM apiarios"
+                cursor.execute(query)
+                return cursor.fetchall()
+            except Error as err:
+                logging.error(f"Error al obtener apiarios: {err}")
+                return None
 
     @staticmethod
     def obtener_colmenas_apiario(id_apiario):
@@ -197,22 +280,20 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para obtener colmenas")
             return None
             
-        try:
-            cursor = conn.cursor(dictionary=True)
-            cursor.execute("""
-            SELECT c.id, c.numero_colmena, a.nombre as nombre_apiario
-            FROM colmenas c
-            JOIN apiarios a ON c.id_apiario = a.id
-            WHERE c.id_apiario = %s
-            ORDER BY c.numero_colmena
-            """, (id_apiario,))
-            return cursor.fetchall()
-        except Error as err:
-            logging.error(f"Error al obtener colmenas: {err}")
-            return None
-        finally:
-            if conn.is_connected():
-                conn.close()
+        with conn:
+            try:
+                cursor = conn.cursor(dictionary=True)
+                cursor.execute("""
+                SELECT c.id, c.numero_colmena, a.nombre as nombre_apiario
+                FROM colmenas c
+                JOIN apiarios a ON c.id_apiario = a.id
+                WHERE c.id_apiario = %s
+                ORDER BY c.numero_colmena
+                """, (id_apiario,))
+                return cursor.fetchall()
+            except Error as err:
+                logging.error(f"Error al obtener colmenas: {err}")
+                return None
 
     @staticmethod
     def crear_colmena(numero_colmena, id_apiario):
@@ -222,22 +303,279 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para crear colmena")
             return False
             
+        with conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute("""
+                INSERT INTO colmenas (numero_colmena, id_apiario)
+                VALUES (%s, %s)
+                """, (numero_colmena, id_apiario))
+                conn.commit()
+                colmena_agregada(id_apiario, {'id': cursor.lastrowid, 'numero_colmena': numero_colmena})
+                logging.info(f"Colmena {numero_colmena} creada en apiario {id_apiario}")
+                return True
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al crear colmena: {err}")
+                return False
+
+    @classmethod
+    def _asegurar_versionado(cls, conn):
+        """Crea el sello de versión y añade version, alias y sinonimos a tablas de preguntas antiguas"""
+        if cls._versionado:
+            return
+        cursor = conn.cursor()
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS config_version (
+            clave VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+        cursor.close()
+        asegurar_columnas(conn, 'config_preguntas', COLUMNAS_NUEVAS_PREGUNTA)
+        cls._versionado = True
+
+    @staticmethod
+    def _subir_sello_preguntas(conn):
+        """Sube el sello de la configuración en la misma transacción que la escritura"""
+        cursor = conn.cursor()
         try:
-            cursor = conn.cursor()
             cursor.execute("""
-            INSERT INTO colmenas (numero_colmena, id_apiario)
-            VALUES (%s, %s)
-            """, (numero_colmena, id_apiario))
-            conn.commit()
-            logging.info(f"Colmena {numero_colmena} creada en apiario {id_apiario}")
-            return True
-        except Error as err:
-            conn.rollback()
-            logging.error(f"Error al crear colmena: {err}")
-            return False
+            INSERT INTO config_version (clave, version) VALUES ('preguntas', 1)
+            ON DUPLICATE KEY UPDATE version = version + 1
+            """)
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def sello_preguntas():
+        """Versión actual de la configuración de preguntas (0 si nunca se escribió, None sin BD)"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para leer la versión de las preguntas")
+            return None
+            
+        with conn:
+            try:
+                DatabaseModel._asegurar_versionado(conn)
+                cursor = conn.cursor()
+                cursor.execute("SELECT version FROM config_version WHERE clave = 'preguntas'")
+                fila = cursor.fetchone()
+                return fila[0] if fila else 0
+            except Error as err:
+                logging.error(f"Error al leer la versión de las preguntas: {err}")
+                return None
+
+    @staticmethod
+    def _pregunta_desde_fila(row, tabla=None):
+        """Convierte una fila de config_preguntas en el diccionario de la pregunta.
+
+        tabla es el esquema de monitoreos: las preguntas numéricas admiten
+        decimales solo si su columna es DECIMAL.
+        """
+        pregunta = {
+            'id': row['id'],
+            'pregunta': row['pregunta'],
+            'tipo': row['tipo'],
+            'obligatoria': bool(row['obligatoria']),
+            'orden': row['orden'],
+            'depende_de': row['depende_de'],
+            'activa': bool(row['activa']),
+            'version': row.get('version', 1)
+        }
+        
+        if row['tipo'] == 'numero':
+            pregunta['min'] = row['min_val'] if row['min_val'] is not None else 0
+            pregunta['max'] = row['max_val'] if row['max_val'] is not None else 100
+            pregunta['decimales'] = bool(tabla and tabla.admite_decimales(row['id']))
+        elif row['tipo'] == 'opcion' and row['opciones']:
+            pregunta['opciones'] = json.loads(row['opciones'])
+        # Alias y sinonimos los usan el dictado y el intérprete de opciones
+        if row.get('alias'):
+            pregunta['alias'] = json.loads(row['alias'])
+        if row.get('sinonimos'):
+            pregunta['sinonimos'] = json.loads(row['sinonimos'])
+        return pregunta
+
+    @staticmethod
+    def _valores_pregunta(pregunta, completa=False):
+        """Columnas y valores de las claves presentes en la pregunta.
+
+        Con completa=True las claves que faltan toman su valor por defecto
+        (crear o reemplazar la pregunta entera, no parchearla).
+        """
+        if completa:
+            pregunta = {**PREGUNTA_DEFECTO, **pregunta}
+        columnas, valores = [], []
+        for clave, columna in COLUMNAS_PREGUNTA.items():
+            if clave not in pregunta:
+                continue
+            valor = pregunta[clave]
+            if clave in CLAVES_JSON_PREGUNTA and valor is not None:
+                valor = json.dumps(valor, ensure_ascii=False)
+            columnas.append(columna)
+            valores.append(valor)
+        return columnas, valores
+
+    @staticmethod
+    def _leer_pregunta(conn, pregunta_id):
+        cursor = conn.cursor(dictionary=True)
+        try:
+            cursor.execute("SELECT * FROM config_preguntas WHERE id = %s", (pregunta_id,))
+            row = cursor.fetchone()
+            return DatabaseModel._pregunta_desde_fila(row, esquema(conn, 'monitoreos')) if row else None
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def _actualizar_pregunta(conn, pregunta_id, columnas, valores, version):
+        """UPDATE de una fila que sube su versión; exige la versión leída si se indica (* = cualquiera)"""
+        asignaciones = [f"{c} = %s" for c in columnas] + ["version = version + 1"]
+        query = f"UPDATE config_preguntas SET {', '.join(asignaciones)} WHERE id = %s"
+        params = list(valores) + [pregunta_id]
+        if version is not None and version != CUALQUIER_VERSION:
+            query += " AND version = %s"
+            params.append(version)
+        
+        cursor = conn.cursor()
+        try:
+            cursor.execute(query, params)
+            if cursor.rowcount:
+                return
+            # Ninguna fila: o no existe o alguien la cambió antes
+            cursor.execute("SELECT version FROM config_preguntas WHERE id = %s", (pregunta_id,))
+            fila = cursor.fetchone()
         finally:
-            if conn.is_connected():
-                conn.close()
+            cursor.close()
+        if fila is None:
+            raise PreguntaNoEncontrada(pregunta_id)
+        raise ConflictoVersion(pregunta_id, fila[0])
+
+    @staticmethod
+    def obtener_pregunta(pregunta_id):
+        """Obtiene una pregunta por su id ({} si no existe)"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para obtener la pregunta")
+            return None
+            
+        with conn:
+            try:
+                DatabaseModel._asegurar_versionado(conn)
+                return DatabaseModel._leer_pregunta(conn, pregunta_id) or {}
+            except Error as err:
+                logging.error(f"Error al obtener la pregunta {pregunta_id}: {err}")
+                return None
+
+    @staticmethod
+    def crear_pregunta(pregunta):
+        """Inserta una pregunta nueva; PreguntaDuplicada si el id ya existe"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para crear la pregunta")
+            return None
+            
+        with conn:
+            try:
+                DatabaseModel._asegurar_versionado(conn)
+                columnas, valores = DatabaseModel._valores_pregunta(pregunta, completa=True)
+                columnas = ['id'] + columnas
+                valores = [pregunta['id']] + valores
+                cursor = conn.cursor()
+                cursor.execute(
+                    f"INSERT INTO config_preguntas ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(valores))})",
+                    valores
+                )
+                creada = DatabaseModel._leer_pregunta(conn, pregunta['id'])
+                DatabaseModel._subir_sello_preguntas(conn)
+                conn.commit()
+                preguntas_modificadas()
+                logging.info(f"Pregunta {pregunta['id']} creada")
+                return creada
+            except Error as err:
+                conn.rollback()
+                if err.errno == errorcode.ER_DUP_ENTRY:
+                    raise PreguntaDuplicada(pregunta['id'])
+                logging.error(f"Error al crear la pregunta {pregunta['id']}: {err}")
+                return None
+
+    @staticmethod
+    def guardar_pregunta(pregunta, version=None):
+        """Crea o reemplaza una pregunta; devuelve (pregunta guardada, creada).
+
+        Las claves que no se envían vuelven a su valor por defecto. Con version
+        solo se reemplaza si la fila sigue en esa versión, o si existe cuando es
+        CUALQUIER_VERSION (ConflictoVersion si cambió, PreguntaNoEncontrada si no existe).
+        """
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para guardar la pregunta")
+            return None, False
+            
+        with conn:
+            try:
+                DatabaseModel._asegurar_versionado(conn)
+                columnas, valores = DatabaseModel._valores_pregunta(pregunta, completa=True)
+                creada = False
+                if version is None:
+                    cursor = conn.cursor()
+                    todas = ['id'] + columnas
+                    actualizaciones = [f"{c} = VALUES({c})" for c in columnas] + ["version = version + 1"]
+                    cursor.execute(f"""
+                    INSERT INTO config_preguntas ({', '.join(todas)})
+                    VALUES ({', '.join(['%s'] * len(todas))})
+                    ON DUPLICATE KEY UPDATE {', '.join(actualizaciones)}
+                    """, [pregunta['id']] + valores)
+                    # MySQL cuenta 1 fila al insertar y 2 al actualizar
+                    creada = cursor.rowcount == 1
+                    cursor.close()
+                else:
+                    DatabaseModel._actualizar_pregunta(conn, pregunta['id'], columnas, valores, version)
+                guardada = DatabaseModel._leer_pregunta(conn, pregunta['id'])
+                DatabaseModel._subir_sello_preguntas(conn)
+                conn.commit()
+                preguntas_modificadas()
+                logging.info(f"Pregunta {pregunta['id']} {'creada' if creada else 'actualizada'} (versión {guardada['version']})")
+                return guardada, creada
+            except (PreguntaNoEncontrada, ConflictoVersion):
+                conn.rollback()
+                raise
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al guardar la pregunta {pregunta['id']}: {err}")
+                return None, False
+
+    @staticmethod
+    def modificar_pregunta(pregunta_id, cambios, version=None):
+        """Cambia solo los campos indicados de una pregunta y sube su versión"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para modificar la pregunta")
+            return None
+            
+        with conn:
+            try:
+                DatabaseModel._asegurar_versionado(conn)
+                columnas, valores = DatabaseModel._valores_pregunta(cambios)
+                DatabaseModel._actualizar_pregunta(conn, pregunta_id, columnas, valores, version)
+                modificada = DatabaseModel._leer_pregunta(conn, pregunta_id)
+                DatabaseModel._subir_sello_preguntas(conn)
+                conn.commit()
+                preguntas_modificadas()
+                logging.info(f"Pregunta {pregunta_id} modificada (versión {modificada['version']})")
+                return modificada
+            except (PreguntaNoEncontrada, ConflictoVersion):
+                conn.rollback()
+                raise
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al modificar la pregunta {pregunta_id}: {err}")
+                return None
+
+    @staticmethod
+    def desactivar_pregunta(pregunta_id, version=None):
+        """Borrado lógico: la pregunta queda inactiva y conserva su historial"""
+        return DatabaseModel.modificar_pregunta(pregunta_id, {'activa': False}, version)
 
     @staticmethod
     def cargar_preguntas_desde_bd(activas=True):
@@ -247,44 +585,26 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para cargar preguntas")
             return None
             
-        try:
-            cursor = conn.cursor(dictionary=True)
-            
-            query = """
-            SELECT * FROM config_preguntas 
-            WHERE activa = %s OR %s = FALSE
-            ORDER BY orden
-            """
-            cursor.execute(query, (activas, activas))
-            
-            preguntas = []
-            for row in cursor.fetchall():
-                pregunta = {
-                    'id': row['id'],
-                    'pregunta': row['pregunta'],
-                    'tipo': row['tipo'],
-                    'obligatoria': bool(row['obligatoria']),
-                    'orden': row['orden'],
-                    'depende_de': row['depende_de'],
-                    'activa': bool(row['activa'])
-                }
-                
-                if row['tipo'] == 'numero':
-                    pregunta['min'] = row['min_val'] if row['min_val'] is not None else 0
-                    pregunta['max'] = row['max_val'] if row['max_val'] is not None else 100
-                elif row['tipo'] == 'opcion' and row['opciones']:
-                    pregunta['opciones'] = json.loads(row['opciones'])
-                
-                preguntas.append(pregunta)
+        with conn:
+            try:
+                DatabaseModel._asegurar_versionado(conn)
+                cursor = conn.cursor(dictionary=True)
             
-            logging.info(f"Cargadas {len(preguntas)} preguntas desde la BD")
-            return preguntas
-        except Error as err:
-            logging.error(f"Error al cargar preguntas: {err}")
-            return None
-        finally:
-            if conn.is_connected():
-                conn.close()
+                query = """
+                SELECT * FROM config_preguntas 
+                WHERE activa = %s OR %s = FALSE
+                ORDER BY orden
+                """
+                cursor.execute(query, (activas, activas))
+            
+                tabla = esquema(conn, 'monitoreos')
+                preguntas = [DatabaseModel._pregunta_desde_fila(row, tabla) for row in cursor.fetchall()]
+            
+                logging.info(f"Cargadas {len(preguntas)} preguntas desde la BD")
+                return preguntas
+            except Error as err:
+                logging.error(f"Error al cargar preguntas: {err}")
+                return None
 
     @staticmethod
     def aplicar_cambios_preguntas(preguntas):
@@ -294,46 +614,36 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para actualizar preguntas")
             return False
             
-        try:
-            cursor = conn.cursor()
+        with conn:
+            try:
+                # Fuera de la transacción: el DDL de la primera vez confirmaría lo pendiente
+                DatabaseModel._asegurar_versionado(conn)
+                cursor = conn.cursor()
             
-            # Iniciar transacción
-            conn.start_transaction()
+                # Iniciar transacción
+                conn.start_transaction()
             
-            # Eliminar todas las preguntas existentes
-            cursor.execute("DELETE FROM config_preguntas")
+                # Eliminar todas las preguntas existentes
+                cursor.execute("DELETE FROM config_preguntas")
             
-            # Insertar las nuevas preguntas
-            for p in preguntas:
-                opciones_str = json.dumps(p.get('opciones')) if 'opciones' in p else None
-                
-                cursor.execute("""
-                INSERT INTO config_preguntas 
-                (id, pregunta, tipo, obligatoria, orden, min_val, max_val, opciones, depende_de, activa)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    p['id'],
-                    p['pregunta'],
-                    p['tipo'],
-                    p.get('obligatoria', False),
-                    p.get('orden', 0),
-                    p.get('min'),
-                    p.get('max'),
-                    opciones_str,
-                    p.get('depende_de'),
-                    p.get('activa', True)
-                ))
-            
-            conn.commit()
-            logging.info(f"Actualizadas {len(preguntas)} preguntas en la BD")
-            return True
-        except Error as err:
-            conn.rollback()
-            logging.error(f"Error al actualizar preguntas: {err}")
-            return False
-        finally:
-            if conn.is_connected():
-                conn.close()
+                # Insertar las nuevas preguntas
+                for p in preguntas:
+                    columnas, valores = DatabaseModel._valores_pregunta(p, completa=True)
+                    columnas, valores = ['id'] + columnas, [p['id']] + valores
+                    cursor.execute(
+                        f"INSERT INTO config_preguntas ({', '.join(columnas)}) VALUES ({', '.join(['%s'] * len(valores))})",
+                        valores
+                    )
+            
+                DatabaseModel._subir_sello_preguntas(conn)
+                conn.commit()
+                preguntas_modificadas()
+                logging.info(f"Actualizadas {len(preguntas)} preguntas en la BD")
+                return True
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al actualizar preguntas: {err}")
+                return False
 
     @staticmethod
     def guardar_respuestas(respuestas):
@@ -343,39 +653,64 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para guardar respuestas")
             return False
             
-        try:
-            cursor = conn.cursor()
-            
-            # Obtener columnas válidas de la tabla
-            cursor.execute("SHOW COLUMNS FROM colmenas")
-            existing_columns = {row[0] for row in cursor.fetchall()}
-            
-            # Preparar datos para inserción
-            columns = ['numero_colmena', 'id_apiario']
-            values = [respuestas['colmena'], respuestas['id_apiario']]
-            
-            # Filtrar y validar campos adicionales
-            for key, value in respuestas.items():
-                if key in existing_columns and key not in ['colmena', 'id_apiario'] and value is not None:
-                    columns.append(key)
-                    values.append(value)
-            
-            # Construir y ejecutar consulta
-            columns_str = ', '.join(columns)
-            placeholders = ', '.join(['%s'] * len(values))
-            query = f"INSERT INTO colmenas ({columns_str}) VALUES ({placeholders})"
-            
-            cursor.execute(query, values)
-            conn.commit()
-            logging.info(f"Monitoreo guardado para colmena {respuestas['colmena']}")
-            return True
-        except Error as err:
-            conn.rollback()
-            logging.error(f"Error al guardar respuestas: {err}")
-            return False
-        finally:
-            if conn.is_connected():
-                conn.close()
+        with conn:
+            try:
+                # Cada inspección es una fila nueva del historial, validada con el esquema en memoria
+                id_monitoreo, descartadas = historial.registrar_monitoreo(conn, respuestas)
+                if descartadas:
+                    logging.warning(f"Valores no válidos descartados: {', '.join(descartadas)}")
+                conn.commit()
+                logging.info(f"Monitoreo {id_monitoreo} guardado para colmena {respuestas['colmena']}")
+                return True
+            except (Error, RuntimeError) as err:
+                conn.rollback()
+                logging.error(f"Error al guardar respuestas: {err}")
+                return False
+
+    @staticmethod
+    def obtener_monitoreos(id_colmena=None, id_apiario=None, desde=None, hasta=None, limite=historial.LIMITE_CONSULTA):
+        """Historial de monitoreos, los más recientes primero"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para obtener monitoreos")
+            return None
+            
+        with conn:
+            try:
+                return historial.consultar_monitoreos(conn, id_colmena, id_apiario, desde, hasta, limite)
+            except Error as err:
+                logging.error(f"Error al obtener monitoreos: {err}")
+                return None
+
+    @staticmethod
+    def obtener_monitoreo(monitoreo_id):
+        """Obtiene un monitoreo específico ({} si no existe)"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para obtener el monitoreo")
+            return None
+            
+        with conn:
+            try:
+                return historial.obtener_monitoreo(conn, monitoreo_id)
+            except Error as err:
+                logging.error(f"Error al obtener monitoreo {monitoreo_id}: {err}")
+                return None
+
+    @staticmethod
+    def obtener_ultimos_monitoreos(id_apiario):
+        """Último monitoreo de cada colmena de un apiario"""
+        conn = DatabaseModel.get_db_connection()
+        if not conn:
+            logging.error("No se pudo establecer conexión para obtener monitoreos")
+            return None
+            
+        with conn:
+            try:
+                return historial.ultimos_por_colmena(conn, id_apiario)
+            except Error as err:
+                logging.error(f"Error al obtener últimos monitoreos del apiario {id_apiario}: {err}")
+                return None
 
     @staticmethod
     def agregar_apiario(nombre, ubicacion=None):
@@ -385,22 +720,21 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para agregar apiario")
             return False
             
-        try:
-            cursor = conn.cursor()
-            cursor.execute(
-                "INSERT INTO apiarios (nombre, ubicacion) VALUES (%s, %s)",
-                (nombre, ubicacion)
-            )
-            conn.commit()
-            logging.info(f"Apiario '{nombre}' agregado correctamente")
-            return True
-        except Error as err:
-            conn.rollback()
-            logging.error(f"Error al agregar apiario '{nombre}': {err}")
-            return False
-        finally:
-            if conn.is_connected():
-                conn.close()
+        with conn:
+            try:
+                cursor = conn.cursor()
+                cursor.execute(
+                    "INSERT INTO apiarios (nombre, ubicacion) VALUES (%s, %s)",
+                    (nombre, ubicacion)
+                )
+                conn.commit()
+                apiario_agregado({'id': cursor.lastrowid, 'nombre': nombre, 'ubicacion': ubicacion})
+                logging.info(f"Apiario '{nombre}' agregado correctamente")
+                return True
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al agregar apiario '{nombre}': {err}")
+                return False
 
     @staticmethod
     def actualizar_apiario(apiario_id, nombre=None, ubicacion=None):
@@ -410,37 +744,37 @@ class DatabaseModel:
             logging.error("No se pudo establecer conexión para actualizar apiario")
             return False
             
-        try:
-            cursor = conn.cursor()
+        with conn:
+            try:
+                cursor = conn.cursor()
             
-            updates = []
-            params = []
+                updates = []
+                params = []
             
-            if nombre is not None:
-                updates.append("nombre = %s")
-                params.append(nombre)
-            if ubicacion is not None:
-                updates.append("ubicacion = %s")
-                params.append(ubicacion)
+                if nombre is not None:
+                    updates.append("nombre = %s")
+                    params.append(nombre)
+                if ubicacion is not None:
+                    updates.append("ubicacion = %s")
+                    params.append(ubicacion)
             
-            if not updates:
-                logging.warning("Nada que actualizar para el apiario")
-                return False
+                if not updates:
+                    logging.warning("Nada que actualizar para el apiario")
+                    return False
                 
-            params.append(apiario_id)
-            query = f"UPDATE apiarios SET {', '.join(updates)} WHERE id = %s"
+                params.append(apiario_id)
+                query = f"UPDATE apiarios SET {', '.join(updates)} WHERE id = %s"
             
-            cursor.execute(query, params)
-            conn.commit()
-            logging.info(f"Apiario {apiario_id} actualizado correctamente")
-            return True
-        except Error as err:
-            conn.rollback()
-            logging.error(f"Error al actualizar apiario {apiario_id}: {err}")
-            return False
-        finally:
-            if conn.is_connected():
-                conn.close()
+                cursor.execute(query, params)
+                conn.commit()
+                if nombre is not None:
+                    apiario_modificado(apiario_id, nombre)
+                logging.info(f"Apiario {apiario_id} actualizado correctamente")
+                return True
+            except Error as err:
+                conn.rollback()
+                logging.error(f"Error al actualizar apiario {apiario_id}: {err}")
+                return False
 
 # Inicializar el pool de conexiones al importar el módulo
 DatabaseModel.initialize_pool()
\ No newline at end of file
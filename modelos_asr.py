@@ -0,0 +1,152 @@
+# modelos_asr.py
+import os
+import threading
+import warnings
+import logging
+
+warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
+
+# Modelo por defecto del proceso (se puede cambiar con WHISPER_MODEL)
+WHISPER_MODEL = os.getenv('WHISPER_MODEL', 'tiny')
+
+# Motor de reconocimiento: "whisper" (PyTorch) o "ctranslate2" (int8 en CPU)
+ASR_MOTOR = os.getenv('ASR_MOTOR', 'whisper')
+# Carpeta con los modelos convertidos a CTranslate2 (whisper-tiny, whisper-small, ...)
+ASR_CT2_DIR = os.getenv('ASR_CT2_DIR', 'modelos_ct2')
+ASR_CT2_COMPUTO = os.getenv('ASR_CT2_COMPUTO', 'int8')
+
+_modelos = {}
+_lock = threading.Lock()
+_bloqueos = {}
+_lock_bloqueos = threading.Lock()
+
+
+def dispositivo_por_defecto():
+    """Usa CUDA si está disponible, si no la CPU"""
+    try:
+        import torch
+        return "cuda" if torch.cuda.is_available() else "cpu"
+    except ImportError:
+        return "cpu"
+
+
+class MotorCTranslate2:
+    """Modelo Whisper cuantizado ejecutado con CTranslate2 (faster-whisper).
+
+    Expone transcribe() con los mismos argumentos y el mismo formato de
+    resultado que openai-whisper, para que el resto del código no cambie.
+    """
+    admite_lotes = False
+
+    def __init__(self, tamano, dispositivo="cpu", tipo_computo=ASR_CT2_COMPUTO):
+        from faster_whisper import WhisperModel
+
+        ruta = os.path.join(ASR_CT2_DIR, f"whisper-{tamano}")
+        local = os.path.isdir(ruta)
+        self._modelo = WhisperModel(
+            ruta if local else tamano,
+            device=dispositivo,
+            compute_type=tipo_computo,
+            local_files_only=local
+        )
+        self.device = dispositivo
+        self.is_multilingual = self._modelo.model.is_multilingual
+        self.num_languages = getattr(self._modelo.model, 'num_languages', 99)
+        self._tokenizadores = {}
+
+    def tokenizador(self, idioma):
+        """Tokenizador del modelo (librería tokenizers): no necesita whisper ni torch"""
+        if idioma not in self._tokenizadores:
+            from faster_whisper.tokenizer import Tokenizer
+            self._tokenizadores[idioma] = Tokenizer(
+                self._modelo.hf_tokenizer, self.is_multilingual, task="transcribe", language=idioma
+            )
+        return self._tokenizadores[idioma]
+
+    def transcribe(self, audio, **opciones):
+        opciones.pop('fp16', None)
+        opciones.pop('verbose', None)
+        if 'sample_len' in opciones:
+            opciones['max_new_tokens'] = opciones.pop('sample_len')
+        if 'suppress_tokens' in opciones:
+            opciones['suppress_tokens'] = list(opciones['suppress_tokens'])
+
+        segmentos, info = self._modelo.transcribe(audio, **opciones)
+        segmentos = [
+            {
+                'text': s.text,
+                'start': s.start,
+                'end': s.end,
+                'avg_logprob': s.avg_logprob,
+                'no_speech_prob': s.no_speech_prob
+            }
+            for s in segmentos
+        ]
+        return {
+            'text': "".join(s['text'] for s in segmentos),
+            'segments': segmentos,
+            'language': info.language
+        }
+
+
+def _cargar(motor, tamano, dispositivo):
+    if motor == 'whisper':
+        # openai-whisper arrastra torch: solo se importa si se usa este motor
+        import whisper
+        return whisper.load_model(tamano, device=dispositivo)
+    if motor == 'ctranslate2':
+        return MotorCTranslate2(tamano, dispositivo)
+    raise ValueError(f"Motor ASR desconocido: {motor}")
+
+
+def obtener_modelo(tamano=None, dispositivo=None, motor=None):
+    """Devuelve el modelo compartido para (tamano, dispositivo) del motor, cargándolo la primera vez"""
+    tamano = tamano or WHISPER_MODEL
+    motor = motor or ASR_MOTOR
+    # El motor int8 solo tiene sentido en CPU salvo que se pida otro dispositivo
+    dispositivo = dispositivo or ("cpu" if motor == 'ctranslate2' else dispositivo_por_defecto())
+    clave = (tamano, dispositivo) if motor == 'whisper' else (tamano, dispositivo, motor)
+
+    modelo = _modelos.get(clave)
+    if modelo is not None:
+        return modelo
+
+    with _lock:
+        # Otro hilo pudo cargarlo mientras esperábamos el lock
+        if clave not in _modelos:
+            logging.info(f"Cargando modelo {motor} '{tamano}' en {dispositivo}")
+            _modelos[clave] = _cargar(motor, tamano, dispositivo)
+        return _modelos[clave]
+
+
+def modelos_cargados():
+    """Lista las claves de los modelos ya cargados"""
+    return list(_modelos.keys())
+
+
+class ModeloCompartido:
+    """Referencia perezosa a un modelo del registro; carga al primer uso"""
+
+    def __init__(self, tamano=None, dispositivo=None, motor=None):
+        self.tamano = tamano
+        self.dispositivo = dispositivo
+        self.motor = motor
+
+    def obtener(self):
+        """Modelo cargado al que apunta la referencia"""
+        return obtener_modelo(self.tamano, self.dispositivo, self.motor)
+
+    def __getattr__(self, nombre):
+        return getattr(self.obtener(), nombre)
+
+
+def modelo_cargado(modelo):
+    """El modelo real detrás de una ModeloCompartido (o el mismo modelo)"""
+    return modelo.obtener() if isinstance(modelo, ModeloCompartido) else modelo
+
+
+def bloqueo_modelo(modelo):
+    """Lock del modelo: sus pasadas se hacen de una en una aunque vengan de varios hilos"""
+    modelo = modelo_cargado(modelo)
+    with _lock_bloqueos:
+        return _bloqueos.setdefault(id(modelo), threading.Lock())
@@ -0,0 +1,285 @@
+# numeros_es.py
+"""Gramática de números en español dichos en voz, compilada una vez al importar.
+
+Reconoce unidades, decenas, centenas y miles ("ciento veinticinco",
+"dos mil trescientos", "diez y seis"), decimales ("dos coma cinco",
+"dos y medio") y cifras. Las palabras pegadas por el reconocedor
+("cientoveinticinco") se separan con un trie y las partidas ("veinti cinco")
+se unen; las mal escritas se corrigen por similitud solo contra el
+vocabulario numérico.
+
+Los decimales solo se aceptan con la forma explícita "<entero> coma
+<dígitos>" o "<entero> y medio", sin otras palabras entre medias: "tres
+colmenas con cinco cuadros" o "población media" no son 3,5 ni 0,5. Lo que
+no se puede leer como un único número (dos números seguidos, "5 10") es None.
+"""
+import re
+import unicodedata
+from functools import lru_cache
+from fuzzywuzzy import fuzz
+
+# ================= CONFIGURACIÓN =================
+SIMILITUD_MINIMA = 80        # fuzz.ratio mínimo para aceptar una palabra corregida
+LONGITUD_MINIMA_FUZZY = 4    # Palabras y candidatas más cortas no se corrigen (evita "si" -> "seis", "miel" -> "mil")
+
+# Tipos de token
+# OTRA marca una palabra ajena a los números (separa grupos que no son contiguos)
+UNIDAD, ESPECIAL, DECENA, CENTENA, MIL, CONECTOR, DECIMAL, MEDIO, OTRA = range(9)
+
+_UNIDADES = {
+    'cero': 0, 'uno': 1, 'un': 1, 'una': 1, 'dos': 2, 'tres': 3, 'cuatro': 4,
+    'cinco': 5, 'seis': 6, 'siete': 7, 'ocho': 8, 'nueve': 9,
+    # Ordinales y variantes que produce el reconocedor
+    'primero': 1, 'primer': 1, 'primera': 1, 'segundo': 2, 'segunda': 2,
+    'tercero': 3, 'tercer': 3, 'tercera': 3, 'cuarto': 4, 'quinto': 5,
+    'sexto': 6, 'septimo': 7, 'octavo': 8, 'noveno': 9,
+    'sero': 0, 'xero': 0, 'ino': 1, 'kuatro': 4, 'quatro': 4, 'sinko': 5,
+    'zinko': 5, 'seyis': 6, 'ciete': 7, 'otcho': 8, 'nuebe': 9,
+}
+_ESPECIALES = {
+    'diez': 10, 'once': 11, 'doce': 12, 'trece': 13, 'catorce': 14, 'quince': 15,
+    'dieciseis': 16, 'diecisiete': 17, 'dieciocho': 18, 'diecinueve': 19,
+    'veinte': 20, 'veintiuno': 21, 'veintiun': 21, 'veintiuna': 21, 'veintidos': 22,
+    'veintitres': 23, 'veinticuatro': 24, 'veinticinco': 25, 'veintiseis': 26,
+    'veintisiete': 27, 'veintiocho': 28, 'veintinueve': 29,
+    'decimo': 10, 'undecimo': 11, 'duodecimo': 12,
+    'dies': 10, 'onse': 11, 'dose': 12, 'trese': 13, 'katorce': 14, 'kinse': 15,
+}
+_DECENAS = {
+    'treinta': 30, 'cuarenta': 40, 'cincuenta': 50, 'sesenta': 60,
+    'setenta': 70, 'ochenta': 80, 'noventa': 90,
+}
+_CENTENAS = {
+    'cien': 100, 'ciento': 100, 'doscientos': 200, 'doscientas': 200,
+    'trescientos': 300, 'trescientas': 300, 'cuatrocientos': 400, 'cuatrocientas': 400,
+    'quinientos': 500, 'quinientas': 500, 'seiscientos': 600, 'seiscientas': 600,
+    'setecientos': 700, 'setecientas': 700, 'ochocientos': 800, 'ochocientas': 800,
+    'novecientos': 900, 'novecientas': 900,
+}
+
+
+def _construir_vocabulario():
+    vocabulario = {}
+    for tabla, tipo in ((_UNIDADES, UNIDAD), (_ESPECIALES, ESPECIAL), (_DECENAS, DECENA), (_CENTENAS, CENTENA)):
+        for palabra, valor in tabla.items():
+            vocabulario[palabra] = (tipo, valor)
+    vocabulario['mil'] = (MIL, 1000)
+    vocabulario['y'] = (CONECTOR, 0)
+    for palabra in ('coma', 'punto'):
+        vocabulario[palabra] = (DECIMAL, 0)
+    for palabra in ('medio', 'media'):
+        vocabulario[palabra] = (MEDIO, 0.5)
+    return vocabulario
+
+
+def _construir_trie(palabras):
+    """Trie de caracteres; el valor '$' marca el final de una palabra"""
+    raiz = {}
+    for palabra in palabras:
+        nodo = raiz
+        for letra in palabra:
+            nodo = nodo.setdefault(letra, {})
+        nodo['$'] = palabra
+    return raiz
+
+
+VOCABULARIO = _construir_vocabulario()
+_TRIE = _construir_trie(VOCABULARIO)
+# Candidatos de corrección agrupados por longitud: solo se comparan los de longitud parecida
+_CANDIDATOS = {}
+for _palabra in VOCABULARIO:
+    if len(_palabra) >= LONGITUD_MINIMA_FUZZY and VOCABULARIO[_palabra][0] not in (CONECTOR, DECIMAL):
+        _CANDIDATOS.setdefault(len(_palabra), []).append(_palabra)
+
+_NO_LETRAS = re.compile(r'[^a-z0-9ñ,. ]')
+_CIFRA = re.compile(r'^\d+(?:[.,]\d+)?$')
+_MILES = re.compile(r'^\d{1,3}(?:\.\d{3})+$')
+_SOLO_CIFRAS = re.compile(r'^[\d.,]+(?: [\d.,]+)*$')
+# "veinti cinco", "dieci seis": el reconocedor parte la palabra en dos
+_PREFIJO_PARTIDO = re.compile(r'\b(veinti|dieci) +(?=[a-z])')
+
+
+def normalizar(texto):
+    """Minúsculas sin tildes ni signos, conservando cifras y separadores decimales"""
+    texto = unicodedata.normalize('NFD', texto.lower())
+    # Se quitan las tildes pero no la virgulilla de la ñ
+    texto = ''.join(c for c in texto if unicodedata.category(c) != 'Mn' or c == '\u0303')
+    texto = unicodedata.normalize('NFC', texto)
+    return _NO_LETRAS.sub(' ', texto).strip()
+
+
+def _segmentar(palabra, inicio=0):
+    """Divide una palabra en palabras del vocabulario (la coincidencia más larga primero)"""
+    if inicio == len(palabra):
+        return []
+    nodo = _TRIE
+    finales = []
+    for i in range(inicio, len(palabra)):
+        nodo = nodo.get(palabra[i])
+        if nodo is None:
+            break
+        if '$' in nodo:
+            finales.append((i + 1, nodo['$']))
+    for fin, encontrada in reversed(finales):
+        resto = _segmentar(palabra, fin)
+        if resto is not None:
+            return [encontrada] + resto
+    return None
+
+
+@lru_cache(maxsize=1024)
+def _corregir(palabra):
+    """Palabra del vocabulario más parecida, comparando solo con las de longitud cercana"""
+    if len(palabra) < LONGITUD_MINIMA_FUZZY:
+        return None
+    mejor, puntuacion = None, SIMILITUD_MINIMA
+    for longitud in range(len(palabra) - 2, len(palabra) + 3):
+        for candidata in _CANDIDATOS.get(longitud, ()):
+            similitud = fuzz.ratio(palabra, candidata)
+            if similitud >= puntuacion:
+                mejor, puntuacion = candidata, similitud
+    return mejor
+
+
+def _tokens(texto, corregir=False):
+    """Tokens (tipo, valor) del texto; las palabras ajenas a los números son OTRA"""
+    tokens = []
+    for palabra in texto.replace('.', ' . ').split():
+        if palabra == '.':
+            tokens.append((DECIMAL, 0))
+        elif palabra.isdigit():
+            tokens.append((None, int(palabra)))
+        elif palabra in VOCABULARIO:
+            tokens.append(VOCABULARIO[palabra])
+        else:
+            partes = _segmentar(palabra)
+            if partes is None:
+                corregida = _corregir(palabra) if corregir else None
+                if corregida is None:
+                    tokens.append((OTRA, 0))
+                    continue
+                partes = [corregida]
+            tokens.extend(VOCABULARIO[p] for p in partes)
+    return tokens
+
+
+def _entero(tokens):
+    """Valor de una secuencia de tokens enteros; None si no forman un número"""
+    total = actual = 0
+    hay_numero = False
+    for tipo, valor in tokens:
+        if tipo in (CONECTOR, OTRA):
+            continue
+        if tipo is None:
+            # Cifras sueltas ("2 mil") ocupan la posición de un grupo completo
+            if actual:
+                return None
+            actual = valor
+        elif tipo == UNIDAD:
+            if actual % 10:
+                return None
+            actual += valor
+        elif tipo in (ESPECIAL, DECENA):
+            if actual % 100:
+                return None
+            actual += valor
+        elif tipo == CENTENA:
+            if actual:
+                return None
+            actual = valor
+        elif tipo == MIL:
+            if total:
+                return None
+            total = (actual or 1) * 1000
+            actual = 0
+        else:
+            return None
+        hay_numero = True
+    return total + actual if hay_numero else None
+
+
+def _decimales(tokens):
+    """Parte decimal: dígitos sueltos ("cero cinco" -> .05) o un entero ("veinticinco" -> .25)"""
+    if tokens and all(tipo in (UNIDAD, None) and valor < 10 for tipo, valor in tokens):
+        return '.' + ''.join(str(valor) for _, valor in tokens)
+    valor = _entero(tokens)
+    return None if valor is None else f".{valor}"
+
+
+def _recortar(tokens):
+    """Quita las palabras ajenas del principio y del final"""
+    inicio, fin = 0, len(tokens)
+    while inicio < fin and tokens[inicio][0] == OTRA:
+        inicio += 1
+    while fin > inicio and tokens[fin - 1][0] == OTRA:
+        fin -= 1
+    return tokens[inicio:fin]
+
+
+def _contiguo(tokens):
+    """Indica si los tokens no tienen palabras ajenas entre medias"""
+    return bool(tokens) and all(tipo != OTRA for tipo, _ in tokens)
+
+
+def palabras_a_numero(texto):
+    """Convierte un número dicho en español (o escrito en cifras) a int, o a float si lleva decimales"""
+    if texto is None:
+        return None
+    texto = normalizar(str(texto))
+    if not texto:
+        return None
+
+    if _SOLO_CIFRAS.match(texto):
+        grupos = texto.split()
+        if len(grupos) > 1:
+            # "2 500" son miles; "5 10" pueden ser dos números
+            if (all(g.isdigit() for g in grupos) and len(grupos[0]) <= 3
+                    and all(len(g) == 3 for g in grupos[1:])):
+                return int(''.join(grupos))
+            return None
+        compacto = grupos[0]
+        if compacto.isdigit():
+            return int(compacto)
+        if _MILES.match(compacto):
+            return int(compacto.replace('.', ''))
+        if _CIFRA.match(compacto):
+            return float(compacto.replace(',', '.'))
+
+    # Las comas entre palabras son pausas del reconocedor, no decimales
+    texto = _PREFIJO_PARTIDO.sub(r'\1', texto.replace(',', ' '))
+    # Solo se corrigen palabras si la frase no contiene ningún número bien escrito:
+    # así "reina nueva" no se lee como "treinta nueve" al lado de un número real
+    tokens = _tokens(texto)
+    if all(tipo in (CONECTOR, DECIMAL, OTRA) for tipo, _ in tokens):
+        tokens = _tokens(texto, corregir=True)
+    tokens = _recortar(tokens)
+    if not tokens:
+        return None
+
+    # "dos y medio": entero, "y" y "medio" seguidos
+    if tokens[-1][0] == MEDIO:
+        if len(tokens) < 3 or tokens[-2][0] != CONECTOR or not _contiguo(tokens[:-2]):
+            return None
+        entero = _entero(tokens[:-2])
+        return None if entero is None else entero + 0.5
+
+    separador = next((i for i, (tipo, _) in enumerate(tokens) if tipo == DECIMAL), None)
+    if separador is None:
+        return _entero(tokens)
+
+    # "dos coma cinco": sin palabras ajenas alrededor del separador
+    antes, despues = _recortar(tokens[:separador]), _recortar(tokens[separador + 1:])
+    if not antes:
+        # Sin parte entera el separador ("punto") es una palabra más de la frase
+        return _entero(despues)
+    if tokens[separador - 1][0] == OTRA or not _contiguo(antes):
+        return None
+    entero = _entero(antes)
+    if entero is None:
+        return None
+    if not despues:
+        return entero
+    if tokens[separador + 1][0] == OTRA or not _contiguo(despues):
+        return None
+    decimales = _decimales(despues)
+    return None if decimales is None else float(f"{entero}{decimales}")
@@ -0,0 +1,208 @@
+# pool_conexiones.py
+"""Pool de conexiones MySQL con espera, comprobación previa y métricas.
+
+El pool de mysql.connector falla en cuanto no le quedan conexiones libres;
+este hace esperar a quien pide una (hasta DB_POOL_ESPERA segundos), de modo
+que los picos de peticiones se encolan en vez de terminar en error. Antes de
+prestar una conexión que lleva tiempo parada se comprueba con un ping, y las
+caídas o demasiado viejas se sustituyen por otras nuevas.
+"""
+import os
+import time
+import logging
+import threading
+import weakref
+from collections import deque
+import mysql.connector
+from mysql.connector import Error
+
+# ================= CONFIGURACIÓN DEL POOL =================
+TAMANO = int(os.getenv('DB_POOL_TAMANO', '5'))              # Conexiones máximas abiertas
+ESPERA_MAX = float(os.getenv('DB_POOL_ESPERA', '10'))       # Segundos máximos esperando una conexión libre
+PING_INACTIVA = float(os.getenv('DB_POOL_PING', '5'))       # Se hace ping si estuvo parada más que esto (0 = siempre)
+RECICLAR = float(os.getenv('DB_POOL_RECICLAR', '3600'))     # Edad máxima de una conexión en segundos
+
+# Límites superiores (segundos) de los tramos de los histogramas
+TRAMOS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, float('inf'))
+
+
+class PoolAgotado(Error):
+    """No quedó ninguna conexión libre durante el tiempo de espera"""
+
+
+class Histograma:
+    """Recuento por tramos de duración, con total y máximo"""
+
+    def __init__(self, tramos=TRAMOS):
+        self.tramos = tramos
+        self.cuentas = [0] * len(tramos)
+        self.total = 0.0
+        self.n = 0
+        self.maximo = 0.0
+
+    def registrar(self, segundos):
+        for i, limite in enumerate(self.tramos):
+            if segundos <= limite:
+                self.cuentas[i] += 1
+                break
+        self.total += segundos
+        self.n += 1
+        self.maximo = max(self.maximo, segundos)
+
+    def resumen(self):
+        return {
+            'n': self.n,
+            'media': self.total / self.n if self.n else 0.0,
+            'maximo': self.maximo,
+            'tramos': {
+                ('+inf' if limite == float('inf') else f"<={limite}"): cuenta
+                for limite, cuenta in zip(self.tramos, self.cuentas)
+            },
+        }
+
+
+def _devolver_olvidada(pool, conexion, creada, prestada):
+    """Finalizador: la conexión se perdió sin close() y vuelve igualmente al pool"""
+    logging.warning("Conexión del pool recogida sin devolver; se devuelve al pool")
+    pool._devolver(conexion, creada, prestada)
+
+
+class ConexionPrestada:
+    """Conexión del pool; close() (o salir del bloque with) la devuelve en lugar de cerrarla.
+
+    is_connected() y el resto de métodos son los de la conexión real.
+    """
+
+    def __init__(self, pool, conexion, creada):
+        self._pool = pool
+        self._conexion = conexion
+        self._creada = creada
+        self._prestada = time.monotonic()
+        # Si se pierde la referencia sin cerrarla, el hueco del pool no se queda ocupado
+        self._finalizador = weakref.finalize(self, _devolver_olvidada, pool, conexion, creada, self._prestada)
+
+    def __getattr__(self, nombre):
+        return getattr(self._conexion, nombre)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        self.close()
+        return False
+
+    def prestada(self):
+        """Indica si la conexión sigue prestada (aún no se ha devuelto al pool)"""
+        return self._finalizador.alive
+
+    def close(self):
+        # detach() solo devuelve los argumentos la primera vez
+        if self._finalizador.detach() is not None:
+            self._pool._devolver(self._conexion, self._creada, self._prestada)
+
+
+class PoolConexiones:
+    """Pool de tamaño fijo con préstamo bloqueante"""
+
+    def __init__(self, tamano=TAMANO, espera_max=ESPERA_MAX, ping_inactiva=PING_INACTIVA,
+                 reciclar=RECICLAR, **config):
+        self.tamano = tamano
+        self.espera_max = espera_max
+        self.ping_inactiva = ping_inactiva
+        self.reciclar = reciclar
+        self.config = config
+        self._huecos = threading.BoundedSemaphore(tamano)
+        self._lock = threading.Lock()
+        self._libres = deque()     # (conexion, creada, devuelta) de la más reciente a la más antigua
+        self._en_uso = 0
+        self._espera = Histograma()
+        self._uso = Histograma()
+        self._contadores = {'creadas': 0, 'descartadas': 0, 'recicladas': 0, 'agotado': 0}
+
+    def _abrir(self):
+        conexion = mysql.connector.connect(**self.config)
+        with self._lock:
+            self._contadores['creadas'] += 1
+        return conexion, time.monotonic()
+
+    def _cerrar(self, conexion, motivo):
+        with self._lock:
+            self._contadores[motivo] += 1
+        try:
+            conexion.close()
+        except Error:
+            pass
+
+    def _viva(self, conexion, creada, devuelta):
+        """Indica si la conexión libre se puede prestar; cierra las que no"""
+        ahora = time.monotonic()
+        if self.reciclar and ahora - creada > self.reciclar:
+            self._cerrar(conexion, 'recicladas')
+            return False
+        if ahora - devuelta >= self.ping_inactiva:
+            try:
+                conexion.ping(reconnect=False)
+            except Error:
+                self._cerrar(conexion, 'descartadas')
+                return False
+        return True
+
+    def obtener(self, espera=None):
+        """Presta una conexión, esperando hasta que haya una libre (PoolAgotado si no llega)"""
+        espera = self.espera_max if espera is None else espera
+        inicio = time.monotonic()
+        if not self._huecos.acquire(timeout=espera):
+            with self._lock:
+                self._contadores['agotado'] += 1
+                self._espera.registrar(time.monotonic() - inicio)
+            raise PoolAgotado(msg=f"Sin conexiones libres tras {espera:g} s (tamaño {self.tamano})")
+
+        try:
+            while True:
+                with self._lock:
+                    libre = self._libres.popleft() if self._libres else None
+                if libre is None:
+                    conexion, creada = self._abrir()
+                    break
+                if self._viva(*libre):
+                    conexion, creada = libre[0], libre[1]
+                    break
+        except Exception:
+            self._huecos.release()
+            raise
+
+        with self._lock:
+            self._en_uso += 1
+            self._espera.registrar(time.monotonic() - inicio)
+        return ConexionPrestada(self, conexion, creada)
+
+    def _devolver(self, conexion, creada, prestada):
+        duracion = time.monotonic() - prestada
+        try:
+            # Lo que la petición dejó sin confirmar no pasa a la siguiente
+            if conexion.is_connected():
+                if conexion.in_transaction:
+                    conexion.rollback()
+                with self._lock:
+                    self._libres.appendleft((conexion, creada, time.monotonic()))
+            else:
+                self._cerrar(conexion, 'descartadas')
+        except Error:
+            self._cerrar(conexion, 'descartadas')
+        finally:
+            with self._lock:
+                self._en_uso -= 1
+                self._uso.registrar(duracion)
+            self._huecos.release()
+
+    def metricas(self):
+        """Estado del pool: conexiones en uso y libres, esperas y duración de los préstamos"""
+        with self._lock:
+            return {
+                'tamano': self.tamano,
+                'en_uso': self._en_uso,
+                'libres': len(self._libres),
+                'espera': self._espera.resumen(),
+                'uso': self._uso.resumen(),
+                **self._contadores,
+            }
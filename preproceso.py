@@ -0,0 +1,83 @@
+# preproceso.py
+import logging
+import numpy as np
+
+# ================= CONFIGURACIÓN DEL PREPROCESO =================
+SAMPLERATE = 16000
+DURACION_TRAMA = 0.02        # 20 ms por trama de análisis
+UMBRAL_PICO = 0.02           # Por debajo de este pico la captura se considera vacía
+UMBRAL_RMS = 0.003           # RMS mínimo de la captura completa
+UMBRAL_TRAMA = 0.01          # RMS mínimo de una trama con voz
+FRACCION_TRAMA = 0.1         # ...o esta fracción de la trama más fuerte, si es mayor
+MARGEN = 0.15                # Segundos de silencio que se conservan a cada lado
+DURACION_MINIMA = 0.12       # Voz más corta que esto no merece una decodificación
+NIVEL_OBJETIVO = 0.9         # Pico tras normalizar
+GANANCIA_MAXIMA = 30.0       # Evita amplificar ruido de fondo sin límite
+NIVEL_SATURACION = 0.999
+FRACCION_SATURACION = 0.01   # Aviso si más de este porcentaje de muestras está saturado
+
+
+def energia(audio_np):
+    """RMS y pico de la captura"""
+    if audio_np.size == 0:
+        return 0.0, 0.0
+    return float(np.sqrt(np.mean(np.square(audio_np)))), float(np.max(np.abs(audio_np)))
+
+
+def _rms_tramas(audio_np, tamano_trama):
+    """RMS de cada trama completa, calculado de una vez"""
+    n_tramas = audio_np.size // tamano_trama
+    if n_tramas == 0:
+        return np.sqrt(np.mean(np.square(audio_np)))[None]
+    tramas = audio_np[:n_tramas * tamano_trama].reshape(n_tramas, tamano_trama)
+    return np.sqrt(np.mean(np.square(tramas), axis=1))
+
+
+def recortar_silencio(audio_np, samplerate=SAMPLERATE):
+    """Quita el silencio inicial y final; devuelve un array vacío si no hay voz"""
+    tamano_trama = max(1, int(samplerate * DURACION_TRAMA))
+    rms = _rms_tramas(audio_np, tamano_trama)
+    umbral = max(UMBRAL_TRAMA, FRACCION_TRAMA * float(rms.max()))
+
+    con_voz = np.flatnonzero(rms > umbral)
+    if con_voz.size == 0:
+        return audio_np[:0]
+
+    margen = int(MARGEN * samplerate)
+    inicio = max(0, con_voz[0] * tamano_trama - margen)
+    fin = min(audio_np.size, (con_voz[-1] + 1) * tamano_trama + margen)
+    return audio_np[inicio:fin]
+
+
+def normalizar(audio_np, pico):
+    """Lleva el pico a NIVEL_OBJETIVO sin dividir por cero ni sobreamplificar"""
+    if pico <= 0:
+        return audio_np
+    ganancia = min(NIVEL_OBJETIVO / pico, GANANCIA_MAXIMA)
+    return audio_np * np.float32(ganancia)
+
+
+def preparar_audio(audio_np, samplerate=SAMPLERATE):
+    """Filtra capturas vacías y deja el audio recortado y normalizado para Whisper.
+
+    Devuelve None si la captura no contiene voz, para no llamar al modelo.
+    """
+    if audio_np is None or audio_np.size == 0:
+        return None
+    audio_np = np.nan_to_num(np.asarray(audio_np, dtype=np.float32).ravel())
+
+    rms, pico = energia(audio_np)
+    if pico < UMBRAL_PICO or rms < UMBRAL_RMS:
+        logging.info(f"Captura descartada por silencio (rms={rms:.4f}, pico={pico:.4f})")
+        return None
+
+    saturadas = np.count_nonzero(np.abs(audio_np) >= NIVEL_SATURACION) / audio_np.size
+    if saturadas > FRACCION_SATURACION:
+        logging.warning(f"Captura saturada: {saturadas:.1%} de las muestras en el límite")
+
+    audio_np = recortar_silencio(audio_np, samplerate)
+    if audio_np.size < DURACION_MINIMA * samplerate:
+        logging.info("Captura descartada: voz demasiado corta")
+        return None
+
+    return normalizar(audio_np, float(np.max(np.abs(audio_np))))
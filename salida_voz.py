@@ -0,0 +1,167 @@
+# salida_voz.py
+import threading
+import logging
+from collections import deque
+import pyttsx3
+
+from audio_duplex import obtener_audio
+from cache_voz import CacheVoz, CACHE_VOZ, PAUSA_SEGMENTOS
+from config_voz import VELOCIDAD, VOZ
+
+
+class Locucion:
+    """Mensaje encolado para reproducir"""
+
+    def __init__(self, segmentos, etiqueta=None, cachear=True):
+        self.segmentos = segmentos
+        self.etiqueta = etiqueta
+        self.cachear = cachear
+        self.cancelada = False
+        self._terminada = threading.Event()
+
+    @property
+    def texto(self):
+        return " ".join(self.segmentos)
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que el mensaje se haya dicho o cancelado"""
+        return self._terminada.wait(timeout)
+
+    def terminada(self):
+        return self._terminada.is_set()
+
+
+class SalidaVoz:
+    """Hilo único dueño del motor pyttsx3 que reproduce los mensajes en orden.
+
+    El audio en caché se reproduce por el stream dúplex compartido con la captura.
+    Los demás hilos solo encolan mensajes o los marcan como cancelados: el motor
+    se detiene desde su propio hilo.
+    """
+
+    def __init__(self, audio=None):
+        self._cond = threading.Condition()
+        self._pendientes = deque()
+        self._actual = None
+        self._listo = threading.Event()
+        self.engine = None
+        self.cache = None
+        self.audio = audio or obtener_audio()
+        self._hilo = threading.Thread(target=self._bucle, name="salida-voz", daemon=True)
+        self._hilo.start()
+
+    def _bucle(self):
+        # El motor se crea y se usa solo en este hilo
+        self.engine = pyttsx3.init()
+        self.engine.setProperty('rate', VELOCIDAD)
+        self.engine.setProperty('voice', VOZ)
+        # Los avisos del motor llegan en este hilo durante runAndWait
+        self.engine.connect('started-word', self._al_empezar_palabra)
+        if CACHE_VOZ:
+            self.cache = CacheVoz(self.engine)
+        self._listo.set()
+
+        while True:
+            with self._cond:
+                while not self._pendientes:
+                    self._cond.wait()
+                # Sacar el mensaje y marcarlo como actual en un solo paso
+                locucion = self._actual = self._pendientes.popleft()
+            try:
+                if not locucion.cancelada:
+                    self._reproducir(locucion)
+            except Exception as e:
+                logging.error(f"Error al reproducir '{locucion.texto[:40]}': {e}")
+            finally:
+                with self._cond:
+                    self._actual = None
+                    locucion._terminada.set()
+                    self._cond.notify_all()
+
+    def _al_empezar_palabra(self, name, location, length):
+        locucion = self._actual
+        if locucion is not None and locucion.cancelada:
+            self.engine.stop()
+
+    def _reproducir(self, locucion):
+        if self.cache is not None:
+            try:
+                partes = self.cache.segmentos(
+                    locucion.segmentos, locucion.etiqueta, self.audio.samplerate, guardar=locucion.cachear
+                )
+            except Exception as e:
+                logging.warning(f"Error en la caché de voz, se sintetiza en vivo: {e}")
+            else:
+                # cancelar() detiene la reproducción con el mismo lock tomado:
+                # o se cancela antes de empezar o corta lo que ya suena
+                with self._cond:
+                    if locucion.cancelada:
+                        return
+                    self.audio.reproducir(partes, pausa=PAUSA_SEGMENTOS, esperar=False)
+                self.audio.esperar_reproduccion()
+                return
+        self.engine.say(locucion.texto)
+        self.engine.runAndWait()
+
+    def tiempo_reproduccion(self):
+        """Segundos reproducidos del mensaje actual"""
+        return self.audio.tiempo_reproduccion()
+
+    def nivel_referencia(self):
+        """Nivel del audio reproducido en los últimos instantes; None si no suena nada"""
+        return self.audio.nivel_salida()
+
+    def decir(self, texto=None, segmentos=None, etiqueta=None, esperar=False, cachear=True):
+        """Encola un mensaje; con esperar=True bloquea hasta que se haya dicho.
+
+        cachear=False para textos que no se repiten (errores, texto libre).
+        """
+        locucion = Locucion(segmentos or [texto], etiqueta, cachear)
+        with self._cond:
+            self._pendientes.append(locucion)
+            self._cond.notify_all()
+        if esperar:
+            locucion.esperar()
+        return locucion
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta que no quede ningún mensaje pendiente"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pendientes and self._actual is None, timeout)
+
+    def hablando(self):
+        with self._cond:
+            return self._actual is not None or bool(self._pendientes)
+
+    def cancelar(self):
+        """Descarta los mensajes pendientes e interrumpe el actual"""
+        with self._cond:
+            for pendiente in self._pendientes:
+                pendiente.cancelada = True
+                pendiente._terminada.set()
+            self._pendientes.clear()
+
+            if self._actual is not None:
+                # El hilo de salida ve la marca y para el motor él mismo
+                self._actual.cancelada = True
+                self.audio.detener_reproduccion()
+            self._cond.notify_all()
+
+    def invalidar(self, etiqueta):
+        """Descarta los mensajes en caché de una etiqueta"""
+        self._listo.wait()
+        if self.cache is not None:
+            self.cache.invalidar(etiqueta)
+
+
+_salida = None
+_lock = threading.Lock()
+
+
+def obtener_salida_voz():
+    """Devuelve la salida de voz compartida del proceso"""
+    global _salida
+    with _lock:
+        if _salida is None:
+            _salida = SalidaVoz()
+        return _salida
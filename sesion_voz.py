@@ -0,0 +1,182 @@
+# sesion_voz.py
+import os
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from transcriptor import opciones_decodificacion
+
+# ================= CONFIGURACIÓN DE LAS TRAZAS =================
+SESIONES_MAX = int(os.getenv('SESIONES_TRAZA_MAX', '100'))   # Sesiones que se conservan para consultar
+
+# Cronómetro y etiquetas del paso en curso; los pasos anidados las heredan
+_traza = ContextVar('traza_voz', default=None)
+_sesiones = OrderedDict()
+_lock_sesiones = threading.Lock()
+
+
+class CronometroSesion:
+    """Registra la duración de cada paso de una sesión de voz.
+
+    Cada paso lleva el id de la sesión y las etiquetas activas (apiario, colmena,
+    pregunta); se escribe en el log y queda consultable con obtener_informe.
+    """
+
+    def __init__(self, sesion=None, **etiquetas):
+        self.sesion = sesion or uuid.uuid4().hex[:12]
+        self.etiquetas = etiquetas
+        self.fecha = datetime.now().isoformat(timespec='seconds')
+        self.inicio = time.perf_counter()
+        self.pasos = []
+        self._lock = threading.Lock()
+        _registrar(self)
+
+    def etiquetar(self, **etiquetas):
+        """Añade etiquetas a todos los pasos que se midan a partir de ahora"""
+        self.etiquetas.update(etiquetas)
+
+    @contextmanager
+    def medir(self, nombre, **etiquetas):
+        actual = _traza.get()
+        heredadas = actual[1] if actual is not None and actual[0] is self else {}
+        etiquetas = {**self.etiquetas, **heredadas, **etiquetas}
+        token = _traza.set((self, etiquetas))
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            _traza.reset(token)
+            duracion = time.perf_counter() - inicio
+            paso = {'paso': nombre, 'sesion': self.sesion, 'inicio': round(inicio - self.inicio, 3), 'duracion': round(duracion, 3)}
+            paso.update((k, v) for k, v in etiquetas.items() if v is not None)
+            with self._lock:
+                self.pasos.append(paso)
+            detalle = " ".join(f"{k}={v}" for k, v in etiquetas.items() if v is not None)
+            logging.info(f"Paso '{nombre}' sesion={self.sesion} {detalle}: {duracion:.3f}s")
+
+    def resumen(self):
+        """Tiempo acumulado por tipo de paso (los pasos anidados cuentan también en el suyo)"""
+        totales = {}
+        for p in list(self.pasos):
+            tipo = p['paso'].split(':')[0]
+            totales[tipo] = round(totales.get(tipo, 0.0) + p['duracion'], 3)
+        return totales
+
+    def por_pregunta(self):
+        """Tiempo acumulado por pregunta y tipo de paso"""
+        totales = {}
+        for p in list(self.pasos):
+            if 'pregunta' not in p:
+                continue
+            pasos = totales.setdefault(str(p['pregunta']), {})
+            pasos[p['paso']] = round(pasos.get(p['paso'], 0.0) + p['duracion'], 3)
+        return totales
+
+    def informe(self, con_pasos=True):
+        """Resumen consultable de la sesión"""
+        informe = {
+            'sesion': self.sesion,
+            'fecha': self.fecha,
+            'etiquetas': dict(self.etiquetas),
+            'duracion': round(time.perf_counter() - self.inicio, 3),
+            'resumen': self.resumen(),
+            'por_pregunta': self.por_pregunta(),
+        }
+        if con_pasos:
+            informe['pasos'] = list(self.pasos)
+        return informe
+
+
+@contextmanager
+def medir(nombre, **etiquetas):
+    """Mide un paso dentro de la sesión activa; fuera de una sesión no registra nada"""
+    actual = _traza.get()
+    if actual is None:
+        yield
+        return
+    with actual[0].medir(nombre, **etiquetas):
+        yield
+
+
+def _registrar(cronometro):
+    with _lock_sesiones:
+        _sesiones[cronometro.sesion] = cronometro
+        while len(_sesiones) > SESIONES_MAX:
+            _sesiones.popitem(last=False)
+
+
+def obtener_informe(sesion):
+    """Informe de una sesión reciente; None si ya no se conserva"""
+    with _lock_sesiones:
+        cronometro = _sesiones.get(sesion)
+    return cronometro.informe() if cronometro else None
+
+
+def informes(**filtros):
+    """Informes sin detalle de pasos de las sesiones recientes que cumplen los filtros de etiquetas"""
+    with _lock_sesiones:
+        cronometros = list(_sesiones.values())
+    return [
+        c.informe(con_pasos=False) for c in cronometros
+        if all(str(c.etiquetas.get(k)) == str(v) for k, v in filtros.items())
+    ]
+
+
+def preguntas_lentas(limite=10, paso='escucha'):
+    """Preguntas con mayor tiempo medio en un tipo de paso, sobre las sesiones recientes"""
+    acumulado = {}
+    for informe in informes():
+        for pregunta, pasos in informe['por_pregunta'].items():
+            if paso in pasos:
+                total, n = acumulado.get(pregunta, (0.0, 0))
+                acumulado[pregunta] = (total + pasos[paso], n + 1)
+    medias = [
+        {'pregunta': pregunta, 'media': round(total / n, 3), 'sesiones': n}
+        for pregunta, (total, n) in acumulado.items()
+    ]
+    return sorted(medias, key=lambda m: m['media'], reverse=True)[:limite]
+
+
+class EjecutorSesion:
+    """Adelanta en segundo plano el trabajo de los turnos siguientes del diálogo"""
+
+    def __init__(self, modelo, construir_texto):
+        self.modelo = modelo
+        self.construir_texto = construir_texto
+        self.cronometro = CronometroSesion()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="sesion-voz")
+        self._preparadas = {}
+
+    def _preparar(self, pregunta):
+        texto = self.construir_texto(pregunta)
+        # Deja calculadas (y en caché) las opciones del decodificador para esta pregunta
+        opciones_decodificacion(self.modelo, pregunta)
+        return texto
+
+    def preparar(self, pregunta):
+        """Empieza a preparar el texto y el decodificador de una pregunta"""
+        if pregunta is not None and pregunta['id'] not in self._preparadas:
+            self._preparadas[pregunta['id']] = self._executor.submit(self._preparar, pregunta)
+
+    def texto(self, pregunta):
+        """Texto de la pregunta; espera a la preparación si aún está en curso"""
+        self.preparar(pregunta)
+        try:
+            return self._preparadas[pregunta['id']].result()
+        except Exception as e:
+            logging.warning(f"No se pudo preparar la pregunta {pregunta['id']}: {e}")
+            return self.construir_texto(pregunta)
+
+    def en_segundo_plano(self, funcion, *args, **kwargs):
+        """Ejecuta una tarea de la sesión sin bloquear el turno actual"""
+        return self._executor.submit(funcion, *args, **kwargs)
+
+    def cerrar(self):
+        self._executor.shutdown(wait=False)
+        logging.info(f"Tiempos de la sesión {self.cronometro.sesion}: {self.cronometro.resumen()}")
@@ -0,0 +1,132 @@
+# sintesis_voz.py
+import io
+import os
+import threading
+import logging
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as TiempoAgotado
+from concurrent.futures.process import BrokenProcessPool
+import multiprocessing as mp
+
+# ================= CONFIGURACIÓN DE LA SÍNTESIS REMOTA =================
+TTS_TRABAJADORES = int(os.getenv('TTS_TRABAJADORES', '2'))   # Procesos, cada uno con su motor pyttsx3
+TTS_TIMEOUT = float(os.getenv('TTS_TIMEOUT', '20'))          # Segundos máximos por mensaje
+TEXTO_MAXIMO = 1000                                          # Caracteres por mensaje
+SAMPLERATE_OPUS = 48000
+
+FORMATOS = {
+    'wav': 'audio/wav',
+    'opus': 'audio/ogg',
+}
+
+# Estado de cada proceso trabajador
+_cache = None
+
+
+def _iniciar_trabajador():
+    """Crea el motor y la caché de mensajes una sola vez por proceso"""
+    global _cache
+    import pyttsx3
+    from cache_voz import CacheVoz
+    from config_voz import VELOCIDAD, VOZ
+
+    engine = pyttsx3.init()
+    engine.setProperty('rate', VELOCIDAD)
+    engine.setProperty('voice', VOZ)
+    _cache = CacheVoz(engine)
+    logging.info(f"Trabajador de síntesis {os.getpid()} listo")
+
+
+@lru_cache(maxsize=256)
+def _codificar(ruta, formato):
+    """Bytes del mensaje en el formato pedido; la ruta incluye la clave de texto, voz y velocidad"""
+    if formato == 'wav':
+        with open(ruta, 'rb') as f:
+            return f.read()
+
+    import soundfile as sf
+    from decodificacion_audio import remuestrear
+
+    if 'OPUS' not in sf.available_subtypes('OGG'):
+        raise ValueError("Esta instalación de libsndfile no codifica Opus")
+    datos, samplerate = sf.read(ruta, dtype='float32', always_2d=True)
+    datos = remuestrear(datos[:, 0], samplerate, SAMPLERATE_OPUS)
+    salida = io.BytesIO()
+    sf.write(salida, datos, SAMPLERATE_OPUS, format='OGG', subtype='OPUS')
+    return salida.getvalue()
+
+
+def _renderizar(texto, formato):
+    """Se ejecuta en el proceso trabajador: usa la caché si el texto ya se renderizó"""
+    return _codificar(str(_cache.ruta(texto)), formato)
+
+
+class PoolSintesis:
+    """Procesos de síntesis que renderizan mensajes a bytes para clientes remotos"""
+
+    def __init__(self, trabajadores=TTS_TRABAJADORES):
+        self.trabajadores = trabajadores
+        self._lock = threading.Lock()
+        self._pool = self._crear_pool()
+
+    def _crear_pool(self):
+        return ProcessPoolExecutor(
+            max_workers=self.trabajadores,
+            mp_context=mp.get_context('spawn'),
+            initializer=_iniciar_trabajador
+        )
+
+    def _reciclar(self, pool):
+        """Sustituye un pool con un trabajador colgado; sus procesos se terminan"""
+        with self._lock:
+            if self._pool is not pool:
+                return      # Otro hilo ya lo sustituyó
+            self._pool = self._crear_pool()
+        logging.warning("Síntesis agotó su tiempo: se reinician los trabajadores")
+        # ProcessPoolExecutor no permite matar un solo trabajador
+        for proceso in list((getattr(pool, '_processes', None) or {}).values()):
+            proceso.terminate()
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def sintetizar(self, texto, formato='wav', timeout=TTS_TIMEOUT):
+        """Devuelve (bytes, tipo MIME) del mensaje; la espera está acotada por el tamaño del pool"""
+        texto = (texto or "").strip()
+        if not texto:
+            raise ValueError("Texto vacío")
+        if len(texto) > TEXTO_MAXIMO:
+            raise ValueError(f"El texto supera {TEXTO_MAXIMO} caracteres")
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}")
+
+        for intento in range(2):
+            with self._lock:
+                pool = self._pool
+                futuro = pool.submit(_renderizar, texto, formato)
+            try:
+                return futuro.result(timeout=timeout), FORMATOS[formato]
+            except TiempoAgotado:
+                # Si ya estaba en marcha, el trabajador seguiría ocupado con este mensaje
+                if not futuro.cancel():
+                    self._reciclar(pool)
+                raise
+            except BrokenProcessPool:
+                # El pool se recicló por otro mensaje mientras este esperaba: un reintento
+                if intento:
+                    raise
+
+    def cerrar(self):
+        with self._lock:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+_pool = None
+_lock = threading.Lock()
+
+
+def obtener_pool_sintesis():
+    """Devuelve el pool de síntesis compartido del proceso"""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = PoolSintesis()
+        return _pool
@@ -0,0 +1,5 @@
+# Los módulos de la aplicación están en la raíz del repositorio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
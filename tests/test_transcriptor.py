@@ -0,0 +1,80 @@
+# tests/test_transcriptor.py
+"""Decodificación con vocabulario cerrado (ASR_VOCABULARIO_CERRADO=1)"""
+from dataclasses import dataclass
+
+import numpy as np
+import pytest
+
+import transcriptor
+
+PREGUNTA = {
+    'id': 'poblacion_abejas',
+    'pregunta': 'Población de abejas',
+    'tipo': 'opcion',
+    'opciones': ['Baja', 'Media', 'Alta'],
+}
+
+
+class ModeloFalso:
+    """Modelo del motor whisper por defecto: sin tokenizador propio, guarda las opciones recibidas"""
+    is_multilingual = True
+    num_languages = 99
+    device = "cpu"
+
+    def __init__(self):
+        self.opciones = None
+
+    def transcribe(self, audio, **opciones):
+        self.opciones = opciones
+        return {'text': ' media'}
+
+
+@dataclass
+class TokenizerDataclass:
+    """Misma forma que whisper.tokenizer.Tokenizer: dataclass mutable, no hashable"""
+    eot: int = 300
+
+    def encode(self, texto):
+        return [ord(c) for c in texto]
+
+
+@pytest.fixture(autouse=True)
+def vocabulario_cerrado(monkeypatch):
+    monkeypatch.setattr(transcriptor, 'VOCABULARIO_CERRADO', True)
+    transcriptor._suprimidos.clear()
+    yield
+    transcriptor._suprimidos.clear()
+
+
+def _transcribir(modelo):
+    resultado = transcriptor.transcribir(modelo, np.zeros(1600, dtype=np.float32), PREGUNTA)
+    assert resultado['text'] == ' media'
+    suprimidos = modelo.opciones['suppress_tokens']
+    assert suprimidos[0] == -1
+    return suprimidos[1:]
+
+
+def test_vocabulario_cerrado_con_tokenizer_dataclass(monkeypatch):
+    tokenizer = TokenizerDataclass()
+    monkeypatch.setattr(transcriptor, '_tokenizador_whisper', lambda multilingue, num_idiomas: tokenizer)
+    modelo = ModeloFalso()
+
+    suprimidos = _transcribir(modelo)
+    assert ord('M') not in suprimidos
+    assert ord('X') in suprimidos
+    # La segunda llamada sale de la caché
+    assert _transcribir(modelo) == suprimidos
+
+
+def test_vocabulario_cerrado_con_tokenizer_de_whisper():
+    pytest.importorskip("whisper.tokenizer")
+    modelo = ModeloFalso()
+
+    suprimidos = _transcribir(modelo)
+    tokenizer = transcriptor._tokenizador(modelo)
+    assert not set(tokenizer.encode(" Media")) & set(suprimidos)
+
+
+def test_prompt_numero_sin_valor_de_ejemplo():
+    pregunta = {'id': 'cuadros_cria', 'pregunta': 'Cuadros de cría', 'tipo': 'numero', 'min': 0, 'max': 20}
+    assert transcriptor.prompt_pregunta(pregunta) == "Cuadros de cría. Un número entre 0 y 20."
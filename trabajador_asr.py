@@ -0,0 +1,178 @@
+# trabajador_asr.py
+import os
+import time
+import queue
+import threading
+import logging
+from concurrent.futures import Future
+import numpy as np
+
+from transcriptor import opciones_lote, transcribir
+from modelos_asr import bloqueo_modelo, modelo_cargado
+
+# ================= CONFIGURACIÓN DEL TRABAJADOR =================
+VENTANA_LOTE = float(os.getenv('ASR_VENTANA_LOTE', '0.05'))   # Segundos esperando más enunciados
+LOTE_MAX = int(os.getenv('ASR_LOTE_MAX', '8'))
+MUESTRAS_MAX = 30 * 16000                                      # 30 s, una sola ventana del codificador (whisper.audio.N_SAMPLES)
+
+
+class _Solicitud:
+    """Enunciado pendiente de una sesión"""
+
+    def __init__(self, audio_np, pregunta):
+        self.audio = audio_np.astype(np.float32)
+        self.pregunta = pregunta
+        self.opciones = None
+        self.futuro = Future()
+        self.llegada = time.perf_counter()
+
+
+class TrabajadorTranscripcion:
+    """Agrupa los enunciados de varias sesiones en pasadas por lotes del modelo"""
+
+    def __init__(self, modelo, ventana=VENTANA_LOTE, lote_max=LOTE_MAX):
+        self.modelo = modelo
+        self.ventana = ventana
+        self.lote_max = lote_max
+        self._cola = queue.Queue()
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def iniciar(self):
+        """Arranca el hilo del trabajador si aún no está en marcha"""
+        with self._lock:
+            if self._hilo is not None and self._hilo.is_alive():
+                return
+            self._hilo = threading.Thread(target=self._bucle, name="trabajador-asr", daemon=True)
+            self._hilo.start()
+            logging.info("Trabajador de transcripción iniciado")
+
+    def enviar(self, audio_np, pregunta=None):
+        """Encola un enunciado y devuelve un Future con el resultado"""
+        self.iniciar()
+        solicitud = _Solicitud(audio_np, pregunta)
+        self._cola.put(solicitud)
+        return solicitud.futuro
+
+    def transcribir(self, audio_np, pregunta=None, timeout=None):
+        """Transcribe un enunciado esperando su turno en el lote"""
+        return self.enviar(audio_np, pregunta).result(timeout=timeout)
+
+    def _recoger_lote(self):
+        """Toma el primer enunciado y los que lleguen dentro de la ventana"""
+        lote = [self._cola.get()]
+        limite = time.perf_counter() + self.ventana
+        while len(lote) < self.lote_max:
+            restante = limite - time.perf_counter()
+            if restante <= 0:
+                break
+            try:
+                lote.append(self._cola.get(timeout=restante))
+            except queue.Empty:
+                break
+        return lote
+
+    def _bucle(self):
+        while True:
+            lote = self._recoger_lote()
+
+            # Solo comparten pasada los enunciados con las mismas opciones de decodificación
+            grupos = {}
+            largos = []
+            for solicitud in lote:
+                if solicitud.audio.size > MUESTRAS_MAX:
+                    # No caben en una ventana: se decodifican aparte, pero en este hilo
+                    largos.append(solicitud)
+                    continue
+                try:
+                    solicitud.opciones = opciones_lote(self.modelo, solicitud.pregunta)
+                except Exception as e:
+                    solicitud.futuro.set_exception(e)
+                    continue
+                clave = tuple(sorted(solicitud.opciones.items()))
+                grupos.setdefault(clave, []).append(solicitud)
+
+            for grupo in grupos.values():
+                self._decodificar(grupo)
+            if largos:
+                self._decodificar_uno_a_uno(largos)
+
+    def _decodificar(self, grupo):
+        """Una pasada de codificador/decodificador para todo el grupo"""
+        if not getattr(self.modelo, 'admite_lotes', True):
+            self._decodificar_uno_a_uno(grupo)
+            return
+
+        # Solo openai-whisper decodifica por lotes: torch se importa aquí y no con el módulo
+        import torch
+        import whisper
+
+        inicio = time.perf_counter()
+        try:
+            mels = torch.stack([
+                whisper.log_mel_spectrogram(
+                    whisper.pad_or_trim(s.audio),
+                    n_mels=self.modelo.dims.n_mels
+                )
+                for s in grupo
+            ]).to(self.modelo.device)
+            with bloqueo_modelo(self.modelo):
+                resultados = whisper.decode(self.modelo, mels, whisper.DecodingOptions(**grupo[0].opciones))
+        except Exception as e:
+            logging.error(f"Error en la transcripción por lotes: {e}")
+            for s in grupo:
+                s.futuro.set_exception(e)
+            return
+
+        fin = time.perf_counter()
+        logging.info(f"Lote de {len(grupo)} enunciados decodificado en {fin - inicio:.3f}s")
+        for s, r in zip(grupo, resultados):
+            s.futuro.set_result({
+                'text': r.text,
+                'avg_logprob': r.avg_logprob,
+                'no_speech_prob': r.no_speech_prob,
+                'latencia': {
+                    'espera': inicio - s.llegada,
+                    'decodificacion': fin - inicio,
+                    'total': fin - s.llegada,
+                    'lote': len(grupo)
+                }
+            })
+
+
+    def _decodificar_uno_a_uno(self, grupo):
+        """Motores sin decodificación por lotes: se atienden en orden de llegada"""
+        for s in grupo:
+            inicio = time.perf_counter()
+            try:
+                resultado = transcribir(self.modelo, s.audio, s.pregunta)
+            except Exception as e:
+                logging.error(f"Error en la transcripción: {e}")
+                s.futuro.set_exception(e)
+                continue
+            fin = time.perf_counter()
+            resultado['latencia'] = {
+                'espera': inicio - s.llegada,
+                'decodificacion': fin - inicio,
+                'total': fin - s.llegada,
+                'lote': 1
+            }
+            s.futuro.set_result(resultado)
+
+
+_trabajadores = {}
+_lock_trabajadores = threading.Lock()
+
+
+def obtener_trabajador(modelo):
+    """Devuelve el trabajador compartido del proceso para un modelo.
+
+    La clave es el modelo cargado: una ModeloCompartido y obtener_modelo() del
+    mismo tamaño comparten trabajador (el escalado no abre un segundo hilo).
+    """
+    modelo = modelo_cargado(modelo)
+    clave = id(modelo)
+    with _lock_trabajadores:
+        if clave not in _trabajadores:
+            _trabajadores[clave] = TrabajadorTranscripcion(modelo)
+        return _trabajadores[clave]
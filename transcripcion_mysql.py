@@ -1,6 +1,5 @@
 # -*- coding: utf-8 -*-
 import os
-import whisper
 import sounddevice as sd
 import numpy as np
 import pyttsx3
@@ -11,22 +10,35 @@ import re
 import warnings
 from mysql.connector import Error
 import json
-import winsound
 import threading
 from fuzzywuzzy import fuzz
 import json
 from pathlib import Path
+from captura import capturar_audio, capturar_con_interrupcion, SILENCIO_FINAL, BARGE_IN
+from preproceso import preparar_audio
+from modelos_asr import ModeloCompartido
+from transcriptor import transcribir, transcribir_escalonado, ESCALONADO
+from sesion_voz import EjecutorSesion, medir, preguntas_lentas
+from numeros_es import palabras_a_numero
+from interpretes import compilar, interprete, texto_pregunta
+from indice_nombres import (indice_apiarios, indice_colmenas,
+                            apiario_agregado, apiario_modificado, colmena_agregada)
+from salida_voz import obtener_salida_voz
+from cache_voz import TextoVariable
+from esquema import esquema, invalidar_esquema, asegurar_columnas
+import historial
+from dictado import DICTADO, DURACION_DICTADO, SILENCIO_DICTADO, extraer_respuestas
+import audio_duplex
 
 # Configuración inicial
 load_dotenv()
-engine = pyttsx3.init()
-engine.setProperty('rate', 180)
-engine.setProperty('voice', 'spanish')
+# El motor de voz lo posee un único hilo de salida que reproduce en orden
+salida_voz = obtener_salida_voz()
 warnings.filterwarnings("ignore", message="FP16 is not supported on CPU")
 
 # ================= CONFIGURACIÓN WHISPER =================
 WHISPER_MODEL = "small"
-model = whisper.load_model(WHISPER_MODEL)
+model = ModeloCompartido(WHISPER_MODEL)
 
 # ================= FUNCION PARA CELULAR =================
 
@@ -115,43 +127,55 @@ def guardar_monitoreo_temp(datos):
         return False
     
 # ================= FUNCIONES DE AUDIO =================
-def hablar(texto):
-    """Función para sintetizar voz"""
+def hablar(texto, etiqueta=None, esperar=False, cachear=True):
+    """Encola un mensaje de voz; solo bloquea si se pide esperar (cachear=False para errores)"""
     print(f"ASISTENTE: {texto}")
-    threading.Thread(target=engine.say, args=(texto,)).start()
-    engine.runAndWait()
+    with medir("tts"):
+        return salida_voz.decir(texto, etiqueta=etiqueta, esperar=esperar, cachear=cachear)
+
+def hablar_segmentos(segmentos, etiqueta=None, esperar=False):
+    """Encola un mensaje dinámico montado con segmentos en caché"""
+    print(f"ASISTENTE: {' '.join(segmentos)}")
+    with medir("tts"):
+        return salida_voz.decir(segmentos=segmentos, etiqueta=etiqueta, esperar=esperar)
 
 def emitir_pitido(frecuencia=1000, duracion=200):
     """Emite un pitido para indicar que el sistema está escuchando"""
-    winsound.Beep(frecuencia, duracion)
+    audio_duplex.emitir_pitido(frecuencia, duracion)
+
+def escuchar(duracion=3, pregunta=None, silencio_final=SILENCIO_FINAL):
+    """Captura un enunciado (duracion es el tope máximo) y lo transcribe.
 
-def escuchar(duracion=3):
-    """Función para capturar audio y transcribirlo"""
+    Si se indica la pregunta, la decodificación se orienta a sus respuestas válidas.
+    """
     try:
-        samplerate = 16000
-        
-        threading.Thread(target=emitir_pitido).start()
-        
-        print("\n[ESCUCHANDO...]")
-        audio = sd.rec(
-            int(duracion * samplerate),
-            samplerate=samplerate,
-            channels=1,
-            dtype='float32'
-        )
-        
-        sd.wait()
-        
-        audio_np = audio.flatten()
-        audio_np = audio_np / np.max(np.abs(audio_np))
+        # Con barge-in la respuesta puede empezar mientras suena el mensaje
+        with medir("captura", barge_in=True):
+            audio_np = capturar_con_interrupcion(salida_voz, duracion, silencio_final)
+        if audio_np is None:
+            # No se graba mientras suena un mensaje del asistente
+            with medir("tts"):
+                salida_voz.esperar()
+            with medir("pitido"):
+                emitir_pitido()
+            
+            print("\n[ESCUCHANDO...]")
+            with medir("captura"):
+                audio_np = capturar_audio(duracion, silencio_final)
         
-        result = model.transcribe(
-            audio_np.astype(np.float32),
-            language="es",
-            temperature=0.0,
-            best_of=1,
-            beam_size=2
-        )
+        with medir("asr"):
+            # Las capturas sin voz se descartan aquí sin pasar por el modelo
+            audio_np = preparar_audio(audio_np)
+            if audio_np is None:
+                return None
+            
+            if ESCALONADO:
+                es_valida = None
+                if pregunta and pregunta['tipo'] in ('opcion', 'numero'):
+                    es_valida = interprete(pregunta).es_valida
+                result = transcribir_escalonado(audio_np, pregunta, es_valida)
+            else:
+                result = transcribir(model, audio_np, pregunta)
         
         texto = result["text"].strip()
         if texto:
@@ -164,61 +188,6 @@ def escuchar(duracion=3):
         return None
 
 # ================= FUNCIONES DE CONVERSIÓN =================
-def palabras_a_numero(texto):
-    """Convierte palabras de números en español a valores numéricos"""
-    if not texto:
-        return None
-        
-    texto = re.sub(r'[^a-zA-ZáéíóúüñÁÉÍÓÚÜÑ]', '', texto.lower()).strip()
-    
-    numeros = {
-        'cero': 0, 'sero': 0, 'xero': 0,
-        'uno': 1, 'un': 1, 'una': 1, 'primero': 1, 'primer': 1, 'úno': 1, 'ino': 1,
-        'dos': 2, 'segundo': 2, 'dós': 2, 'tres': 3, 'tercero': 3, 'tercer': 3, 'trés': 3,
-        'cuatro': 4, 'cuarto': 4, 'kuatro': 4, 'quatro': 4,
-        'cinco': 5, 'quinto': 5, 'sinko': 5, 'zinko': 5,
-        'seis': 6, 'sexto': 6, 'séis': 6, 'seyis': 6,
-        'siete': 7, 'séptimo': 7, 'síete': 7, 'ciete': 7,
-        'ocho': 8, 'octavo': 8, 'ócho': 8, 'otcho': 8,
-        'nueve': 9, 'noveno': 9, 'nuéve': 9, 'nuebe': 9,
-        'diez': 10, 'décimo': 10, 'diéz': 10, 'dies': 10,
-        'once': 11, 'undécimo': 11, 'ónce': 11, 'onse': 11,
-        'doce': 12, 'duodécimo': 12, 'dóce': 12, 'dose': 12,
-        'trece': 13, 'tréce': 13, 'trese': 13,
-        'catorce': 14, 'katorce': 14,
-        'quince': 15, 'kinse': 15,
-        'dieciseis': 16, 'dieciséis': 16, 'diez y seis': 16,
-        'diecisiete': 17, 'diez y siete': 17,
-        'dieciocho': 18, 'diez y ocho': 18,
-        'diecinueve': 19, 'diez y nueve': 19,
-        'veinte': 20, 'veintiuno': 21, 'veintiún': 21, 'veintiuna': 21,
-        'veintidós': 22, 'veintitrés': 23, 'veinticuatro': 24,
-        'veinticinco': 25, 'veintiséis': 26, 'veintisiete': 27,
-        'veintiocho': 28, 'veintinueve': 29,
-        'treinta': 30, 'cuarenta': 40, 'cincuenta': 50,
-        'sesenta': 60, 'setenta': 70, 'ochenta': 80,
-        'noventa': 90, 'cien': 100, 'ciento': 100,
-        'doscientos': 200, 'trescientos': 300, 'cuatrocientos': 400,
-        'quinientos': 500, 'seiscientos': 600, 'setecientos': 700,
-        'ochocientos': 800, 'novecientos': 900, 'mil': 1000
-    }
-    
-    if texto in numeros:
-        return numeros[texto]
-    
-    for palabra, num in numeros.items():
-        if fuzz.ratio(texto, palabra) > 80:
-            return num
-    
-    if 'y' in texto:
-        partes = [p.strip() for p in texto.split('y')]
-        if len(partes) == 2:
-            num1 = numeros.get(partes[0], 0)
-            num2 = numeros.get(partes[1], 0)
-            return num1 + num2
-    
-    return None
-
 def confirmacion_reconocida(respuesta, palabra_clave):
     """Reconoce confirmaciones con tolerancia a errores"""
     umbral_similitud = 70
@@ -255,7 +224,7 @@ def get_db_connection():
             database=os.getenv('DB_NAME')
         )
     except Error as err:
-        hablar(f"Error de MySQL: {err.msg}")
+        hablar(f"Error de MySQL: {err.msg}", cachear=False)
         return None
 
 def verificar_tablas_colmenas():
@@ -339,6 +308,8 @@ def verificar_tablas_colmenas():
         ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
         """)
         
+        historial.crear_tabla_monitoreos(cursor)
+        
         cursor.execute("""
         CREATE TABLE IF NOT EXISTS config_preguntas (
             id VARCHAR(50) PRIMARY KEY,
@@ -350,11 +321,22 @@ def verificar_tablas_colmenas():
             max_val INT DEFAULT NULL,
             opciones TEXT DEFAULT NULL,
             depende_de VARCHAR(50) DEFAULT NULL,
-            activa BOOLEAN DEFAULT TRUE
+            activa BOOLEAN DEFAULT TRUE,
+            version INT NOT NULL DEFAULT 1,
+            alias TEXT DEFAULT NULL,
+            sinonimos TEXT DEFAULT NULL
         )
         """)
         
         conn.commit()
+        # Las tablas pudieron crearse ahora: el esquema se relee al siguiente uso
+        invalidar_esquema()
+        # Tablas de preguntas creadas antes de que existieran alias y sinonimos
+        asegurar_columnas(conn, 'config_preguntas', {
+            'version': "INT NOT NULL DEFAULT 1",
+            'alias': "TEXT DEFAULT NULL",
+            'sinonimos': "TEXT DEFAULT NULL",
+        })
         return True
     except Error as err:
         print(f"Error al verificar tablas: {err}")
@@ -374,7 +356,7 @@ def obtener_apiarios():
         cursor.execute("SELECT id, nombre, ubicacion FROM apiarios")
         return cursor.fetchall()
     except Error as err:
-        hablar(f"Error al obtener apiarios: {err.msg}")
+        hablar(f"Error al obtener apiarios: {err.msg}", cachear=False)
         return None
     finally:
         if conn.is_connected():
@@ -396,7 +378,7 @@ def obtener_colmenas_apiario(id_apiario):
         """, (id_apiario,))
         return cursor.fetchall()
     except Error as err:
-        hablar(f"Error al obtener colmenas: {err.msg}")
+        hablar(f"Error al obtener colmenas: {err.msg}", cachear=False)
         return None
     finally:
         if conn.is_connected():
@@ -415,6 +397,7 @@ def crear_colmena(numero_colmena, id_apiario):
         VALUES (%s, %s)
         """, (numero_colmena, id_apiario))
         conn.commit()
+        colmena_agregada(id_apiario, {'id': cursor.lastrowid, 'numero_colmena': numero_colmena})
         return True
     except Error as err:
         print(f"Error al crear colmena: {err}")
@@ -440,33 +423,35 @@ def cargar_preguntas_desde_bd():
         count = count_result['total'] if count_result else 0
         
         if count == 0:
-            cursor.execute("SHOW COLUMNS FROM colmenas")
-            columns = cursor.fetchall()
+            # Una pregunta por cada columna de respuesta del historial
+            tabla = esquema(conn, 'monitoreos')
+            columns = [c for c in tabla if c.nombre in historial.COLUMNAS_RESPUESTA] if tabla else []
             
-            exclude_columns = {'id', 'numero_colmena', 'id_apiario', 'fecha_registro'}
+            exclude_columns = {'id', 'id_colmena', 'id_apiario', 'fecha_monitoreo'}
             preguntas = []
             
             for col in columns:
-                if col['Field'] in exclude_columns:
+                if col.nombre in exclude_columns:
                     continue
                     
                 pregunta = {
-                    'id': col['Field'],
-                    'pregunta': col['Field'].replace('_', ' ').title(),
+                    'id': col.nombre,
+                    'pregunta': col.nombre.replace('_', ' ').title(),
                     'tipo': 'texto',
-                    'obligatoria': col['Null'] == 'NO',
+                    'obligatoria': not col.nula,
                     'orden': len(preguntas) + 1,
                     'depende_de': None,
                     'activa': True
                 }
                 
-                if 'int' in col['Type'] or 'decimal' in col['Type']:
+                if 'int' in col.tipo or col.tipo == 'decimal':
                     pregunta['tipo'] = 'numero'
                     pregunta['min'] = 0
-                    pregunta['max'] = 20 if 'cuadros' in col['Field'] else 100
-                elif col['Type'].startswith('enum'):
+                    pregunta['max'] = 20 if 'cuadros' in col.nombre else 100
+                    pregunta['decimales'] = tabla.admite_decimales(col.nombre)
+                elif col.valores:
                     pregunta['tipo'] = 'opcion'
-                    pregunta['opciones'] = re.findall(r"'(.*?)'", col['Type'])
+                    pregunta['opciones'] = list(col.valores)
                 
                 preguntas.append(pregunta)
             
@@ -494,6 +479,7 @@ def cargar_preguntas_desde_bd():
             return preguntas
         else:
             cursor.execute("SELECT * FROM config_preguntas ORDER BY orden")
+            tabla = esquema(conn, 'monitoreos')
             preguntas = []
             
             for row in cursor.fetchall():
@@ -510,15 +496,20 @@ def cargar_preguntas_desde_bd():
                 if row['tipo'] == 'numero':
                     pregunta['min'] = row['min_val'] if row['min_val'] is not None else 0
                     pregunta['max'] = row['max_val'] if row['max_val'] is not None else 100
+                    pregunta['decimales'] = bool(tabla and tabla.admite_decimales(row['id']))
                 elif row['tipo'] == 'opcion' and row['opciones']:
                     pregunta['opciones'] = json.loads(row['opciones'])
+                if row.get('alias'):
+                    pregunta['alias'] = json.loads(row['alias'])
+                if row.get('sinonimos'):
+                    pregunta['sinonimos'] = json.loads(row['sinonimos'])
                 
                 preguntas.append(pregunta)
             
             return preguntas
             
     except Error as err:
-        hablar(f"Error al cargar preguntas: {err.msg}")
+        hablar(f"Error al cargar preguntas: {err.msg}", cachear=False)
         return None
     finally:
         if conn.is_connected():
@@ -850,15 +841,25 @@ def aplicar_cambios_bd(preguntas):
     try:
         cursor = conn.cursor()
         
+        # Antes del DELETE: un CREATE dentro de la transacción la confirmaría a medias
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS config_version (
+            clave VARCHAR(50) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0
+        )
+        """)
+        
         cursor.execute("DELETE FROM config_preguntas")
         
         for p in preguntas:
             opciones_str = json.dumps(p['opciones']) if 'opciones' in p else None
+            alias_str = json.dumps(p['alias'], ensure_ascii=False) if p.get('alias') else None
+            sinonimos_str = json.dumps(p['sinonimos'], ensure_ascii=False) if p.get('sinonimos') else None
             
             cursor.execute("""
             INSERT INTO config_preguntas 
-            (id, pregunta, tipo, obligatoria, orden, min_val, max_val, opciones, depende_de, activa)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+            (id, pregunta, tipo, obligatoria, orden, min_val, max_val, opciones, depende_de, activa, alias, sinonimos)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             """, (
                 p['id'],
                 p['pregunta'],
@@ -869,9 +870,17 @@ def aplicar_cambios_bd(preguntas):
                 p.get('max'),
                 opciones_str,
                 p.get('depende_de'),
-                p.get('activa', True)
+                p.get('activa', True),
+                alias_str,
+                sinonimos_str
             ))
         
+        # Sube el sello de la configuración para que la API descarte su caché
+        cursor.execute("""
+        INSERT INTO config_version (clave, version) VALUES ('preguntas', 1)
+        ON DUPLICATE KEY UPDATE version = version + 1
+        """)
+        
         conn.commit()
         return True
     except Error as err:
@@ -936,58 +945,13 @@ def reordenar_preguntas(preguntas):
 # ================= MONITOREO POR VOZ =================
 def procesar_respuesta_pregunta(pregunta, respuesta, intentos, respuestas):
     """Procesa la respuesta a una pregunta específica"""
-    pregunta_respondida = False
-    
-    if pregunta['tipo'] == 'opcion':
-        respuesta = respuesta.lower()
-        
-        # Primero intentar reconocer números (1, 2, 3...)
-        numero_opcion = None
-        try:
-            numero_opcion = int(respuesta)
-        except ValueError:
-            numero_opcion = palabras_a_numero(respuesta)
-        
-        if numero_opcion is not None and 1 <= numero_opcion <= len(pregunta['opciones']):
-            respuestas[pregunta['id']] = pregunta['opciones'][numero_opcion-1]
-            pregunta_respondida = True
-        else:
-            # Búsqueda por texto como respaldo
-            opciones = [o.lower() for o in pregunta['opciones']]
-            for i, op in enumerate(opciones):
-                if op in respuesta or any(palabra in op for palabra in respuesta.split()):
-                    respuestas[pregunta['id']] = pregunta['opciones'][i]
-                    pregunta_respondida = True
-                    break
-        
-        if not pregunta_respondida and intentos < 2:
-            opciones_numeradas = [f"{n+1} para {o}" for n, o in enumerate(pregunta['opciones'])]
-            hablar(f"Opción no reconocida. Por favor diga el número de la opción: {', '.join(opciones_numeradas)}")
-            
-    elif pregunta['tipo'] == 'numero':
-        try:
-            num = int(respuesta)
-            min_val = pregunta.get('min', 0)
-            max_val = pregunta.get('max', 100)
-            if min_val <= num <= max_val:
-                respuestas[pregunta['id']] = num
-                pregunta_respondida = True
-            else:
-                if intentos < 2:
-                    hablar(f"El valor debe estar entre {min_val} y {max_val}")
-        except ValueError:
-            num = palabras_a_numero(respuesta)
-            if num is not None and pregunta.get('min', 0) <= num <= pregunta.get('max', 100):
-                respuestas[pregunta['id']] = num
-                pregunta_respondida = True
-            else:
-                if intentos < 2:
-                    hablar("No entendí el número. Por favor responda con un valor numérico.")
-    else:  # Tipo texto
-        respuestas[pregunta['id']] = respuesta
-        pregunta_respondida = True
-    
-    return pregunta_respondida
+    resultado = interprete(pregunta).interpretar(respuesta)
+    if resultado.valido:
+        respuestas[pregunta['id']] = resultado.valor
+        return True
+    if intentos < 2:
+        hablar(resultado.mensaje)
+    return False
 
 def guardar_respuestas(respuestas):
     """Guarda las respuestas en la base de datos o en archivo temporal según el dispositivo"""
@@ -998,27 +962,13 @@ def guardar_respuestas(respuestas):
             return False
             
         try:
-            cursor = conn.cursor()
-            
-            columns = ['numero_colmena', 'id_apiario']
-            values = [respuestas['colmena'], respuestas['id_apiario']]
-            
-            cursor.execute("SHOW COLUMNS FROM colmenas")
-            existing_columns = {row[0] for row in cursor.fetchall()}
-            
-            for key, value in respuestas.items():
-                if key in existing_columns and key not in ['colmena', 'id_apiario']:
-                    columns.append(key)
-                    values.append(value)
-            
-            columns_str = ', '.join(columns)
-            placeholders = ', '.join(['%s'] * len(values))
-            
-            query = f"INSERT INTO colmenas ({columns_str}) VALUES ({placeholders})"
-            cursor.execute(query, values)
+            # Cada inspección es una fila nueva del historial, validada con el esquema en memoria
+            _, descartadas = historial.registrar_monitoreo(conn, respuestas)
+            if descartadas:
+                print(f"Valores no válidos descartados: {', '.join(descartadas)}")
             conn.commit()
             return True
-        except Error as err:
+        except (Error, RuntimeError) as err:
             print(f"Error al guardar respuestas: {err}")
             conn.rollback()
             return False
@@ -1042,6 +992,16 @@ def iniciar_monitoreo_voz():
         hablar("No se pudieron cargar las preguntas de configuración")
         return
     
+    preguntas_activas = [p for p in preguntas if p.get('activa', True)]
+    preguntas_activas.sort(key=lambda x: x.get('orden', 0))
+    # Los intérpretes de respuesta solo se reconstruyen si la configuración cambió
+    compilar(preguntas)
+    
+    # La primera pregunta se prepara mientras transcurre la confirmación inicial
+    sesion = EjecutorSesion(model, texto_pregunta)
+    if preguntas_activas:
+        sesion.preparar(preguntas_activas[0])
+    
     hablar("A continuación se mostrarán las preguntas que se realizarán durante el monitoreo.")
     mostrar_preguntas_previo(preguntas)
     hablar("¿Desea continuar con el monitoreo? Por favor diga 'confirmar' para continuar o 'cancelar' para salir.")
@@ -1053,6 +1013,7 @@ def iniciar_monitoreo_voz():
             break
         elif respuesta and 'cancelar' in respuesta.lower():
             hablar("Monitoreo cancelado.")
+            sesion.cerrar()
             return
         else:
             hablar("No entendí su respuesta. Por favor diga 'confirmar' para continuar o 'cancelar' para salir.")
@@ -1060,54 +1021,73 @@ def iniciar_monitoreo_voz():
     # Seleccionar apiario
     hablar("Por favor indique el apiario a monitorear. Opciones: Norte, Centro o Sur")
     apiario = None
-    apiarios_disponibles = obtener_apiarios()
+    indice = indice_apiarios(obtener_apiarios)
     
     while apiario is None:
-        respuesta = escuchar()
+        with sesion.cronometro.medir("escucha", pregunta="apiario"):
+            respuesta = escuchar()
         if respuesta:
-            for a in apiarios_disponibles:
-                if fuzz.ratio(respuesta.lower(), a['nombre'].lower()) > 70:
-                    apiario = a
-                    break
-            
+            apiario = indice.mejor(respuesta) if indice else None
             if apiario is None:
                 hablar("Apiario no reconocido. Por favor diga Norte, Centro o Sur")
     
+    sesion.cronometro.etiquetar(apiario=apiario['id'])
+    # Las colmenas se consultan mientras se anuncia el apiario
+    consulta_colmenas = sesion.en_segundo_plano(
+        indice_colmenas, apiario['id'], lambda: obtener_colmenas_apiario(apiario['id'])
+    )
     hablar(f"Monitoreando apiario {apiario['nombre']}. A continuación indique el número de colmena.")
     
     # Seleccionar colmena
-    colmenas_disponibles = obtener_colmenas_apiario(apiario['id'])
+    colmenas_disponibles = consulta_colmenas.result()
     if not colmenas_disponibles:
         hablar(f"No hay colmenas registradas en el apiario {apiario['nombre']}")
+        sesion.cerrar()
         return
     
-    hablar(f"Colmenas disponibles en apiario {apiario['nombre']}: {', '.join(str(c['numero_colmena']) for c in colmenas_disponibles)}")
+    hablar_segmentos(
+        [f"Colmenas disponibles en apiario {apiario['nombre']}:"] +
+        [str(n) for n in colmenas_disponibles.numeros()]
+    )
     colmena = None
     
     while colmena is None:
-        respuesta = escuchar()
+        with sesion.cronometro.medir("escucha", pregunta="colmena"):
+            respuesta = escuchar()
         if respuesta:
-            try:
-                num = int(respuesta)
-                if any(c['numero_colmena'] == num for c in colmenas_disponibles):
-                    colmena = num
-                else:
-                    hablar(f"El número {num} no corresponde a una colmena en este apiario")
-            except ValueError:
+            encontrada = colmenas_disponibles.mejor(respuesta)
+            if encontrada is not None:
+                colmena = encontrada['numero_colmena']
+            else:
                 num = palabras_a_numero(respuesta)
-                if num is not None and any(c['numero_colmena'] == num for c in colmenas_disponibles):
-                    colmena = num
+                if num is not None:
+                    hablar(f"El número {num} no corresponde a una colmena en este apiario", cachear=False)
                 else:
                     hablar("Número de colmena no reconocido. Por favor diga un número válido")
     
+    sesion.cronometro.etiquetar(colmena=colmena)
     hablar(f"Monitoreando colmena {colmena} en apiario {apiario['nombre']}. Empezaremos con las preguntas.")
     
-    preguntas_activas = [p for p in preguntas if p.get('activa', True)]
-    preguntas_activas.sort(key=lambda x: x.get('orden', 0))
-    
     respuestas = {'colmena': colmena, 'id_apiario': apiario['id']}
     
-    for pregunta in preguntas_activas:
+    if DICTADO:
+        # Informe completo en un solo enunciado; después solo se pregunta lo que falte
+        hablar("Dicte el estado de la colmena, por ejemplo: población alta, actividad media.", esperar=True)
+        with sesion.cronometro.medir("escucha", pregunta="dictado"):
+            informe = escuchar(duracion=DURACION_DICTADO, silencio_final=SILENCIO_DICTADO)
+        if informe:
+            with sesion.cronometro.medir("interpretacion", pregunta="dictado"):
+                extraccion = extraer_respuestas(informe, preguntas_activas, respuestas)
+            respuestas.update(extraccion.respuestas)
+            faltan = len([p for p in preguntas_activas if p['id'] not in respuestas])
+            hablar(f"Registradas {len(extraccion.respuestas)} respuestas. Quedan {faltan} preguntas.")
+    
+    for indice, pregunta in enumerate(preguntas_activas):
+        siguiente = preguntas_activas[indice + 1] if indice + 1 < len(preguntas_activas) else None
+        
+        if pregunta['id'] in respuestas:
+            continue
+        
         if pregunta.get('depende_de'):
             pregunta_dependencia = next((p for p in preguntas_activas if p['id'] == pregunta['depende_de']), None)
             if pregunta_dependencia and pregunta_dependencia['id'] in respuestas:
@@ -1121,36 +1101,45 @@ def iniciar_monitoreo_voz():
         while not pregunta_respondida and intentos < 2:
             intentos += 1
             
-            texto_pregunta = pregunta['pregunta']
-            if pregunta['tipo'] == 'opcion':
-                opciones_numeradas = [f"{n+1}. {o}" for n, o in enumerate(pregunta['opciones'])]
-                texto_pregunta += f". Opciones: {', '.join(opciones_numeradas)}. Responda con el número de la opción."
-            elif pregunta['tipo'] == 'numero':
-                texto_pregunta += f". Responda con un número entre {pregunta.get('min', 0)} y {pregunta.get('max', 100)}"
+            with sesion.cronometro.medir("tts", pregunta=pregunta['id']):
+                # Con barge-in no se espera: la respuesta puede empezar durante el mensaje
+                hablar(sesion.texto(pregunta), etiqueta=pregunta['id'], esperar=not BARGE_IN)
             
-            hablar(texto_pregunta)
+            # La siguiente pregunta se prepara mientras se captura y transcribe esta respuesta
+            sesion.preparar(siguiente)
             
-            respuesta = escuchar(duracion=5 if pregunta['tipo'] == 'texto' else 3)
+            with sesion.cronometro.medir("escucha", pregunta=pregunta['id']):
+                respuesta = escuchar(duracion=5 if pregunta['tipo'] == 'texto' else 3, pregunta=pregunta)
             if not respuesta:
                 if intentos < 2:
                     hablar("No capté su respuesta. Por favor repita.")
                 continue
-                
-            pregunta_respondida = procesar_respuesta_pregunta(pregunta, respuesta, intentos, respuestas)
+            
+            with sesion.cronometro.medir("interpretacion", pregunta=pregunta['id']):
+                pregunta_respondida = procesar_respuesta_pregunta(pregunta, respuesta, intentos, respuestas)
     
-    hablar("Resumen de respuestas:")
+    # Resumen y petición de confirmación en una sola locución: la escucha empieza
+    # en cuanto termina la reproducción, sin un ciclo runAndWait por línea.
+    # Los textos fijos salen de la caché; los valores se sintetizan sin guardarlos
+    lineas = ["Resumen de respuestas:"]
     for key, value in respuestas.items():
         if key not in ['colmena', 'id_apiario']:
             pregunta = next((p for p in preguntas_activas if p['id'] == key), None)
             if pregunta:
-                hablar(f"{pregunta['pregunta']}: {value}")
+                lineas.append(f"{pregunta['pregunta']}:")
+                lineas.append(TextoVariable(f"{value}."))
+    lineas.append("¿Los datos son correctos? Por favor diga 'confirmar' para guardar o 'cancelar' para repetir el monitoreo.")
+    with sesion.cronometro.medir("tts", pregunta="resumen"):
+        hablar_segmentos(lineas, esperar=not BARGE_IN)
     
-    hablar("¿Los datos son correctos? Por favor diga 'confirmar' para guardar o 'cancelar' para repetir el monitoreo.")
     confirmacion = None
     while confirmacion not in ['confirmar', 'cancelar']:
-        confirmacion = escuchar()
+        with sesion.cronometro.medir("escucha", pregunta="confirmacion"):
+            confirmacion = escuchar()
         if confirmacion and 'confirmar' in confirmacion.lower():
-            if guardar_respuestas(respuestas):
+            with sesion.cronometro.medir("guardado"):
+                guardado = guardar_respuestas(respuestas)
+            if guardado:
                 if es_dispositivo_movil():
                     hablar("Datos guardados localmente. Podrás sincronizarlos cuando tengas conexión.")
                 else:
@@ -1160,10 +1149,18 @@ def iniciar_monitoreo_voz():
             break
         elif confirmacion and 'cancelar' in confirmacion.lower():
             hablar("Reiniciando el monitoreo para esta colmena.")
+            sesion.cerrar()
             iniciar_monitoreo_voz()
-            break
+            return
         else:
             hablar("No entendí su respuesta. Por favor diga 'confirmar' para guardar o 'cancelar' para repetir.")
+    
+    sesion.cerrar()
+    print(f"\nTiempos de la sesión {sesion.cronometro.sesion}:")
+    for paso, duracion in sesion.cronometro.resumen().items():
+        print(f"  {paso}: {duracion:.2f}s")
+    for lenta in preguntas_lentas(limite=3):
+        print(f"  Pregunta más lenta: {lenta['pregunta']} ({lenta['media']:.2f}s de escucha de media)")
 
 # ================= MENÚ DE CONFIGURACIÓN =================
 def menu_configuracion():
@@ -1224,6 +1221,9 @@ def menu_configuracion():
             cambios_guardados = False
         elif opcion == "7":
             if aplicar_cambios_bd(preguntas):
+                # Los textos de las preguntas pueden haber cambiado
+                for p in preguntas:
+                    salida_voz.invalidar(p['id'])
                 print("✓ Cambios guardados en la base de datos")
                 cambios_guardados = True
             else:
@@ -1306,6 +1306,7 @@ def agregar_apiario():
         cursor = conn.cursor()
         cursor.execute("INSERT INTO apiarios (nombre, ubicacion) VALUES (%s, %s)", (nombre, ubicacion))
         conn.commit()
+        apiario_agregado({'id': cursor.lastrowid, 'nombre': nombre, 'ubicacion': ubicacion})
         print(f"Apiario '{nombre}' agregado correctamente")
     except Error as err:
         print(f"Error al agregar apiario: {err}")
@@ -1345,6 +1346,7 @@ def editar_apiario():
                     WHERE id = %s
                     """, (nuevo_nombre, nueva_ubicacion, apiario['id']))
                     conn.commit()
+                    apiario_modificado(apiario['id'], nuevo_nombre)
                     print("Apiario actualizado correctamente")
                 except Error as err:
                     print(f"Error al actualizar apiario: {err}")
@@ -1428,7 +1430,7 @@ def main():
         elif opcion == "4" and es_dispositivo_movil():
             sincronizar_monitoreos_pendientes()
         elif opcion == str(4 if not es_dispositivo_movil() else 5):
-            hablar("Saliendo del sistema. ¡Hasta pronto!")
+            hablar("Saliendo del sistema. ¡Hasta pronto!", esperar=True)
             break
         else:
             print("Opción no válida")
@@ -0,0 +1,209 @@
+# transcriptor.py
+import os
+import numpy as np
+from functools import lru_cache
+
+from modelos_asr import bloqueo_modelo
+
+# ================= CONFIGURACIÓN DE DECODIFICACIÓN =================
+IDIOMA = "es"
+OPCIONES_BASE = {
+    'language': IDIOMA,
+    'temperature': 0.0,
+    'best_of': 1,
+    'beam_size': 2
+}
+
+# Con ASR_VOCABULARIO_CERRADO=1 se suprimen los tokens fuera del vocabulario de la pregunta;
+# por defecto solo se sesga el decodificador con el prompt y se limita la longitud
+VOCABULARIO_CERRADO = os.getenv('ASR_VOCABULARIO_CERRADO', '0') == '1'
+
+TOKENS_EXTRA_OPCION = 6      # Margen para "la opción dos", "es la media"...
+TOKENS_NUMERO = 12
+
+PALABRAS_NUMERO = [
+    'cero', 'uno', 'una', 'un', 'dos', 'tres', 'cuatro', 'cinco', 'seis', 'siete', 'ocho',
+    'nueve', 'diez', 'once', 'doce', 'trece', 'catorce', 'quince', 'dieciséis', 'diecisiete',
+    'dieciocho', 'diecinueve', 'veinte', 'veinti', 'treinta', 'cuarenta', 'cincuenta',
+    'sesenta', 'setenta', 'ochenta', 'noventa', 'cien', 'ciento', 'cientos', 'quinientos',
+    'setecientos', 'novecientos', 'mil', 'y', 'coma', 'punto', 'opción', 'número'
+]
+
+
+def prompt_pregunta(pregunta):
+    """Texto inicial que orienta al decodificador hacia las respuestas válidas"""
+    if pregunta['tipo'] == 'opcion' and pregunta.get('opciones'):
+        opciones = ", ".join(f"{n+1}. {o}" for n, o in enumerate(pregunta['opciones']))
+        return f"{pregunta['pregunta']}. Opciones: {opciones}."
+    if pregunta['tipo'] == 'numero':
+        # Sin un valor de ejemplo: el decodificador tiende a repetirlo en audio dudoso
+        return f"{pregunta['pregunta']}. Un número entre {pregunta.get('min', 0)} y {pregunta.get('max', 100)}."
+    return None
+
+
+def _vocabulario_pregunta(pregunta):
+    """Palabras que puede contener una respuesta válida a la pregunta"""
+    palabras = list(PALABRAS_NUMERO) + [str(d) for d in range(10)]
+    if pregunta['tipo'] == 'opcion':
+        palabras += pregunta.get('opciones', [])
+    return tuple(palabras)
+
+
+@lru_cache(maxsize=4)
+def _tokenizador_whisper(multilingue, num_idiomas):
+    from whisper.tokenizer import get_tokenizer
+    return get_tokenizer(multilingue, num_languages=num_idiomas, language=IDIOMA, task="transcribe")
+
+
+def _tokenizador(modelo):
+    """Tokenizador del modelo; el motor CTranslate2 trae el suyo, sin importar whisper ni torch"""
+    propio = getattr(modelo, 'tokenizador', None)
+    if propio is not None:
+        return propio(IDIOMA)
+    return _tokenizador_whisper(modelo.is_multilingual, modelo.num_languages)
+
+
+SUPRIMIDOS_MAX = 128         # Vocabularios con sus tokens suprimidos guardados
+_suprimidos = {}
+
+
+def _clave_tokenizador(modelo):
+    """Clave hashable del tokenizador: el Tokenizer de whisper es un dataclass y no se puede hashear"""
+    motor = 'ctranslate2' if getattr(modelo, 'tokenizador', None) is not None else 'whisper'
+    return motor, modelo.is_multilingual, modelo.num_languages
+
+
+def _tokens_suprimidos(modelo, vocabulario):
+    """Tokens de texto fuera del vocabulario permitido, calculados una vez por tokenizador y vocabulario"""
+    clave = (_clave_tokenizador(modelo), vocabulario)
+    suprimidos = _suprimidos.get(clave)
+    if suprimidos is None:
+        if len(_suprimidos) >= SUPRIMIDOS_MAX:
+            _suprimidos.clear()
+        suprimidos = _suprimidos[clave] = _calcular_suprimidos(_tokenizador(modelo), vocabulario)
+    return suprimidos
+
+
+def _calcular_suprimidos(tokenizer, vocabulario):
+    permitidos = set()
+    for palabra in vocabulario:
+        for variante in {palabra, palabra.lower(), palabra.capitalize()}:
+            permitidos.update(tokenizer.encode(variante))
+            permitidos.update(tokenizer.encode(" " + variante))
+    for signo in [".", ",", " ", "?", "!"]:
+        permitidos.update(tokenizer.encode(signo))
+
+    return tuple(t for t in range(tokenizer.eot) if t not in permitidos)
+
+
+def _longitud_maxima(modelo, pregunta):
+    """Presupuesto de tokens para respuestas cortas"""
+    if pregunta['tipo'] == 'numero':
+        return TOKENS_NUMERO
+    tokenizer = _tokenizador(modelo)
+    mas_larga = max(len(tokenizer.encode(" " + o)) for o in pregunta['opciones'])
+    return mas_larga + TOKENS_EXTRA_OPCION
+
+
+def opciones_decodificacion(modelo, pregunta=None, vocabulario_cerrado=None):
+    """Argumentos para model.transcribe según el tipo de pregunta"""
+    opciones = dict(OPCIONES_BASE)
+    if not pregunta or pregunta['tipo'] not in ('opcion', 'numero'):
+        return opciones
+    if pregunta['tipo'] == 'opcion' and not pregunta.get('opciones'):
+        return opciones
+
+    if vocabulario_cerrado is None:
+        vocabulario_cerrado = VOCABULARIO_CERRADO
+
+    opciones.update({
+        'initial_prompt': prompt_pregunta(pregunta),
+        'sample_len': _longitud_maxima(modelo, pregunta),
+        'without_timestamps': True,
+        'condition_on_previous_text': False
+    })
+
+    if vocabulario_cerrado:
+        suprimidos = _tokens_suprimidos(modelo, _vocabulario_pregunta(pregunta))
+        # -1 mantiene la supresión por defecto de símbolos no hablados
+        opciones['suppress_tokens'] = [-1, *suprimidos]
+
+    return opciones
+
+
+def transcribir(modelo, audio_np, pregunta=None):
+    """Transcribe un buffer float32 a 16 kHz usando la decodificación de la pregunta"""
+    opciones = opciones_decodificacion(modelo, pregunta)
+    with bloqueo_modelo(modelo):
+        return modelo.transcribe(audio_np.astype(np.float32), **opciones)
+
+
+def opciones_lote(modelo, pregunta=None):
+    """Opciones equivalentes para whisper.DecodingOptions al decodificar en lote"""
+    opciones = opciones_decodificacion(modelo, pregunta)
+    opciones.pop('condition_on_previous_text', None)
+    if opciones.get('temperature', 0.0) == 0.0:
+        # DecodingOptions no admite best_of con decodificación determinista
+        opciones.pop('best_of', None)
+    if 'initial_prompt' in opciones:
+        opciones['prompt'] = opciones.pop('initial_prompt')
+    if 'suppress_tokens' in opciones:
+        opciones['suppress_tokens'] = tuple(opciones['suppress_tokens'])
+    opciones['fp16'] = str(modelo.device) != "cpu"
+    return opciones
+
+
+# ================= ESCALADO POR CONFIANZA =================
+# Con ASR_ESCALONADO=1 se decodifica primero con el modelo rápido y solo se
+# repite con el preciso cuando el resultado es dudoso
+ESCALONADO = os.getenv('ASR_ESCALONADO', '0') == '1'
+MODELO_RAPIDO = os.getenv('ASR_MODELO_RAPIDO', 'tiny')
+MODELO_PRECISO = os.getenv('ASR_MODELO_PRECISO', 'small')
+UMBRAL_LOGPROB = float(os.getenv('ASR_UMBRAL_LOGPROB', '-0.8'))
+UMBRAL_SIN_VOZ = float(os.getenv('ASR_UMBRAL_SIN_VOZ', '0.6'))
+
+
+def confianza(resultado):
+    """avg_logprob medio y no_speech_prob máximo de un resultado"""
+    segmentos = resultado.get('segments') or [resultado]
+    logprobs = [s['avg_logprob'] for s in segmentos if s.get('avg_logprob') is not None]
+    sin_voz = [s['no_speech_prob'] for s in segmentos if s.get('no_speech_prob') is not None]
+    return (
+        sum(logprobs) / len(logprobs) if logprobs else None,
+        max(sin_voz) if sin_voz else None
+    )
+
+
+def es_dudoso(resultado, es_valida=None):
+    """Indica si conviene repetir la decodificación con el modelo preciso"""
+    texto = resultado['text'].strip()
+    if not texto:
+        return True
+    logprob, sin_voz = confianza(resultado)
+    if logprob is not None and logprob < UMBRAL_LOGPROB:
+        return True
+    if sin_voz is not None and sin_voz > UMBRAL_SIN_VOZ:
+        return True
+    return es_valida is not None and not es_valida(texto.lower())
+
+
+def transcribir_escalonado(audio_np, pregunta=None, es_valida=None, decodificar=transcribir):
+    """Decodifica con MODELO_RAPIDO y repite con MODELO_PRECISO solo si hay dudas.
+
+    es_valida(texto) comprueba si el texto es una respuesta aceptable para la
+    pregunta; decodificar(modelo, audio, pregunta) permite usar el trabajador por lotes.
+    """
+    from modelos_asr import obtener_modelo
+
+    resultado = decodificar(obtener_modelo(MODELO_RAPIDO), audio_np, pregunta)
+    resultado['modelo'] = MODELO_RAPIDO
+    resultado['escalado'] = False
+    if MODELO_PRECISO == MODELO_RAPIDO or not es_dudoso(resultado, es_valida):
+        return resultado
+
+    rapido = resultado['text'].strip()
+    resultado = decodificar(obtener_modelo(MODELO_PRECISO), audio_np, pregunta)
+    resultado['modelo'] = MODELO_PRECISO
+    resultado['escalado'] = True
+    resultado['texto_rapido'] = rapido
+    return resultado